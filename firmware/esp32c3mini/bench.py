@@ -0,0 +1,216 @@
+"""
+性能测试脚本（开发板上用 `import bench; bench.run()` 运行，电脑上可直接 `python bench.py`）
+
+测量每个触摸报告的坐标换算 + 打包耗时:
+- legacy:  原实现（浮点换算 + struct.pack 生成新对象）
+- python:  hotpath 纯Python整数实现
+- active:  当前实际使用的实现（支持时为 native/viper 编译版本）
+- lut:     GeometryMapper 查表换算
+- fixed:   GeometryMapper 定点系数换算
+
+报告布局对比（hid_report.py 的 standard / compact）：每个报告的打包+取出发送部分的耗时、
+通知数据长度，以及加上链路层/ATT开销后的空口字节数和 1M PHY 上的传输时间
+
+滑动过程中报告发送时刻的抖动（仅开发板，需要接好OLED）:
+- inline:  滑动中途整屏同步刷新（原实现，刷新可能落在滑动过程中）
+- chunked: 滑动中只重绘缓冲区，滑动之间由空闲钩子分块刷新
+
+停止到释放延迟（仅开发板）：定时器中断在随机时刻请求停止，测量到发出释放报告的时间
+"""
+import struct
+import time
+
+import hotpath
+import hid_report
+from geometry import GeometryMapper
+
+try:
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+    sleep_us = time.sleep_us
+except AttributeError:
+    # CPython
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+    def sleep_us(us):
+        time.sleep(us / 1000000)
+
+SCREEN_W = 1080
+SCREEN_H = 2168
+ITERATIONS = 2000
+# 每个通知的空口开销(字节，1M PHY，加密链路): 前导1 + 访问地址4 + LL头2 + MIC4 + CRC3 + L2CAP头4 + ATT操作码和句柄3
+NOTIFY_OVERHEAD_BYTES = 21
+
+
+def _legacy_report(x, y):
+    x = max(0, min(SCREEN_W, x))
+    y = max(0, min(SCREEN_H, y))
+    hid_x = int(x * 32767 / SCREEN_W)
+    hid_y = int(y * 32767 / SCREEN_H)
+    return struct.pack('BBBBHH', 1, 1, 1, 1, hid_x, hid_y)
+
+
+def _make_report(clamp, to_hid, pack_report, buf):
+    def report(x, y):
+        x = clamp(x, SCREEN_W)
+        y = clamp(y, SCREEN_H)
+        pack_report(buf, 1, to_hid(x, SCREEN_W), to_hid(y, SCREEN_H))
+        return buf
+    return report
+
+
+def _make_mapper_report(mapper, buf):
+    pack_report = hotpath.pack_report
+
+    def report(x, y):
+        pack_report(buf, 1, mapper.map_x(x), mapper.map_y(y))
+        return buf
+    return report
+
+
+def time_per_call(fn, n=ITERATIONS):
+    """返回每次调用的平均耗时（微秒，浮点）"""
+    start = ticks_us()
+    for i in range(n):
+        fn(i % SCREEN_W, (i * 3) % SCREEN_H)
+    return ticks_diff(ticks_us(), start) / n
+
+
+def bench_report_path(n=ITERATIONS):
+    buf = bytearray(8)
+    results = [
+        ("legacy", time_per_call(_legacy_report, n)),
+        ("python", time_per_call(_make_report(hotpath.py_clamp, hotpath.py_to_hid, hotpath.py_pack_report, buf), n)),
+        ("active", time_per_call(_make_report(hotpath.clamp, hotpath.to_hid, hotpath.pack_report, buf), n)),
+        ("lut", time_per_call(_make_mapper_report(GeometryMapper(SCREEN_W, SCREEN_H, True), buf), n)),
+        ("fixed", time_per_call(_make_mapper_report(GeometryMapper(SCREEN_W, SCREEN_H, False), buf), n)),
+    ]
+    return results
+
+
+def bench_report_layouts(n=ITERATIONS):
+    """返回 [(布局, 耗时us, 报告字节, 空口字节)]；发送部分复制到另一缓冲区，模拟协议栈取走数据"""
+    buf = bytearray(hid_report.BUFFER_SIZE)
+    pack_report = hotpath.pack_report
+    results = []
+    for layout in (hid_report.STANDARD, hid_report.COMPACT):
+        view = hid_report.report_view(buf, layout)
+        sink = bytearray(len(view))
+
+        def report(x, y):
+            pack_report(buf, 1, x, y)
+            sink[:] = view
+        size = len(view)
+        results.append((layout, time_per_call(report, n), size, size + NOTIFY_OVERHEAD_BYTES))
+    return results
+
+
+def _stroke_jitter(display, chunked, strokes, steps, step_us, gap_us):
+    """模拟若干次滑动，返回报告发送时刻相对计划时刻的 (最大, 平均) 延迟（微秒）"""
+    buf = bytearray(8)
+    worst = 0
+    total = 0
+    for _ in range(strokes):
+        due = ticks_us()
+        for i in range(steps):
+            due += step_us
+            while ticks_diff(due, ticks_us()) > 0:
+                pass
+            late = ticks_diff(ticks_us(), due)
+            hotpath.pack_report(buf, 1, i * 1000, i * 1000)
+            worst = max(worst, late)
+            total += late
+            if i == steps // 2:
+                # 滑动中途状态变化（例如倒计时/计数更新）
+                display.update_display()
+                if not chunked:
+                    display.flush_all()
+        # 两次滑动之间的空闲时间
+        start = ticks_us()
+        if chunked:
+            display.flush_step(gap_us // 1000)
+        rest = gap_us - ticks_diff(ticks_us(), start)
+        if rest > 0:
+            sleep_us(rest)
+    return worst, total // (strokes * steps)
+
+
+def bench_flush_jitter(display, strokes=5, steps=20, step_us=30000, gap_us=200000):
+    return [
+        ("inline", _stroke_jitter(display, False, strokes, steps, step_us, gap_us)),
+        ("chunked", _stroke_jitter(display, True, strokes, steps, step_us, gap_us)),
+    ]
+
+
+def bench_stop_latency(trials=20, step_ms=30):
+    """返回停止到释放的 (最大, 平均) 延迟（微秒）"""
+    import random
+    from machine import Timer
+    from cancel import CancelToken
+    from config import CANCEL_SLICE_MS
+
+    token = CancelToken(CANCEL_SLICE_MS)
+    timer = Timer(0)
+    on_timer = lambda t: token.cancel()  # noqa: E731
+    buf = bytearray(8)
+    worst = 0
+    total = 0
+    try:
+        for _ in range(trials):
+            token.reset()
+            timer.init(mode=Timer.ONE_SHOT, period=50 + random.getrandbits(8), callback=on_timer)
+            # 模拟滑动：每步打包一个报告，步间做可中断等待
+            i = 0
+            while not token.sleep_ms(step_ms):
+                hotpath.pack_report(buf, 1, i, i)
+                i += 1
+            hotpath.pack_report(buf, 0, i, i)  # 释放
+            token.released()
+            worst = max(worst, token.last_latency_us)
+            total += token.last_latency_us
+    finally:
+        timer.deinit()
+    return worst, total // trials
+
+
+def run(n=ITERATIONS, display=None):
+    print("=== 报告换算+打包 ({} 次, native={}) ===".format(n, hotpath.NATIVE))
+    results = bench_report_path(n)
+    base = results[0][1]
+    for name, us in results:
+        speedup = base / us if us else 0
+        print("{:8s} {:8.2f} us/报告  x{:.2f}".format(name, us, speedup))
+
+    print("=== 报告布局 ===")
+    for layout, us, size, air in bench_report_layouts(n):
+        # 1M PHY 每字节 8us
+        print("{:8s} {:8.2f} us/报告  {}字节  空口 {}字节 {}us".format(layout, us, size, air, air * 8))
+
+    try:
+        from config import STOP_LATENCY_MAX_MS
+        worst, mean = bench_stop_latency()
+        print("=== 停止到释放延迟 ===")
+        print("最大 {:6d} us  平均 {:6d} us  上限 {} ms {}".format(
+            worst, mean, STOP_LATENCY_MAX_MS, "OK" if worst <= STOP_LATENCY_MAX_MS * 1000 else "FAIL"))
+    except ImportError:
+        print("非开发板环境，跳过停止延迟测试")
+
+    if display is None:
+        try:
+            from oled_display import OLEDDisplay
+            display = OLEDDisplay()
+        except (ImportError, OSError):
+            print("未连接OLED，跳过刷新抖动测试")
+            return results
+    print("=== 滑动中报告发送抖动 ===")
+    for name, (worst, mean) in bench_flush_jitter(display):
+        print("{:8s} 最大 {:6d} us  平均 {:6d} us".format(name, worst, mean))
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -1,8 +1,15 @@
 import bluetooth
 import struct
-import time
+import clock
 from machine import Pin
-from config import DEVICE_NAME, LED_PIN
+from config import DEVICE_NAME, LED_PIN, BLE_CONN_INTERVAL_MS, HID_REPORT_LAYOUT
+from hotpath import pack_report
+from hid_report import BUFFER_SIZE, REPORT_SIZES, descriptor, report_view
+from watchdog import OP_REPORT, elapsed_us
+from tap_pacing import CONN_INTERVAL_UNIT_US
+from geometry import host_id
+import telemetry
+from log import info, debug, error, EV_CONNECTED, EV_DISCONNECTED, EV_GATTS_WRITE, EV_REPORT_ERROR
 
 class BLEHID:
     def __init__(self):
@@ -17,20 +24,22 @@ class BLEHID:
         # 连接状态和句柄
         self._connected = False
         self._conn_handle = None
-        
-        # HID报告描述符 - 绝对坐标触摸屏
-        self._HID_REPORT_DESCRIPTOR = bytes([
-            0x05, 0x0D, 0x09, 0x04, 0xA1, 0x01, 0x09, 0x54, 0x15, 0x00, 0x25, 0x01,
-            0x75, 0x08, 0x95, 0x01, 0x81, 0x02, 0x09, 0x55, 0x15, 0x00, 0x25, 0x01,
-            0x75, 0x08, 0x95, 0x01, 0x81, 0x02, 0x05, 0x0D, 0x09, 0x22, 0xA1, 0x02,
-            0x09, 0x51, 0x15, 0x00, 0x25, 0x01, 0x75, 0x08, 0x95, 0x01, 0x81, 0x02,
-            0x09, 0x42, 0x15, 0x00, 0x25, 0x01, 0x75, 0x01, 0x95, 0x01, 0x81, 0x02,
-            0x75, 0x07, 0x95, 0x01, 0x81, 0x03, 0x05, 0x01, 0x09, 0x30, 0x15, 0x00,
-            0x26, 0xFF, 0x7F, 0x35, 0x00, 0x46, 0xFF, 0x7F, 0x65, 0x11, 0x55, 0x00,
-            0x75, 0x10, 0x95, 0x01, 0x81, 0x02, 0x09, 0x31, 0x15, 0x00, 0x26, 0xFF,
-            0x7F, 0x35, 0x00, 0x46, 0xFF, 0x7F, 0x65, 0x11, 0x55, 0x00, 0x75, 0x10,
-            0x95, 0x01, 0x81, 0x02, 0xC0, 0xC0
-        ])
+        self.peer_addr = None   # 已连接手机的蓝牙地址(hex)
+        self.peer_id = None     # 登记屏幕参数用的手机标识（geometry.host_id，地址会轮换时为 None）
+        self.on_connect = None  # 连接回调 on_connect(peer_id)
+        self.watchdog = None    # 延迟监控 (watchdog.LatencyWatchdog)
+        self.stats = None       # 运行统计日志 (stats_log.StatsLog)
+        self.conn_interval_us = BLE_CONN_INTERVAL_MS * 1000  # 当前连接间隔（协议栈报告后更新）
+        # 遥测计数（telemetry.Telemetry 读取，耗时两项每个遥测周期清零）
+        self.reports_sent = 0
+        self.reports_failed = 0
+        self.notify_us_sum = 0
+        self.notify_us_max = 0
+        
+        # HID报告描述符 - 绝对坐标触摸屏（按配置的报告布局生成，见 hid_report.py）
+        self.report_layout = HID_REPORT_LAYOUT
+        self.report_size = REPORT_SIZES[HID_REPORT_LAYOUT]
+        self._HID_REPORT_DESCRIPTOR = descriptor(HID_REPORT_LAYOUT)
         
         # 定义HID服务UUID
         self.hid_service_uuid = bluetooth.UUID(0x1812)  # Human Interface Device
@@ -51,12 +60,15 @@ class BLEHID:
                     (self.input_report_uuid, bluetooth.FLAG_READ | bluetooth.FLAG_NOTIFY),
                     (self.protocol_mode_uuid, bluetooth.FLAG_READ | bluetooth.FLAG_WRITE_NO_RESPONSE),
                 ]
-            )
+            ),
+            telemetry.SERVICE,  # 运行遥测（自定义服务，见 telemetry.py）
         ]
         
         # 注册服务
         self.services = self._ble.gatts_register_services(services)
         self.hid_service = self.services[0]
+        self.telemetry_handle = self.services[1][0]
+        self._ble.gatts_write(self.telemetry_handle, bytes(telemetry.SIZE))
         
         # 设置报告描述符
         self._ble.gatts_write(self.hid_service[1], self._HID_REPORT_DESCRIPTOR)
@@ -67,9 +79,10 @@ class BLEHID:
         # 设置协议模式为报告模式
         self._ble.gatts_write(self.hid_service[4], struct.pack('B', 0x01))
         
-        # 设置输入报告
-        self._input_report_value = bytearray(8)
-        self._ble.gatts_write(self.hid_service[3], self._input_report_value)
+        # 设置输入报告（总是按8字节布局打包，compact 布局只发送后5字节）
+        self._input_report_value = bytearray(BUFFER_SIZE)
+        self._input_report = report_view(self._input_report_value, HID_REPORT_LAYOUT)
+        self._ble.gatts_write(self.hid_service[3], self._input_report)
         
         # 构建广告数据
         adv_data = bytearray()
@@ -101,18 +114,29 @@ class BLEHID:
             self._connected = True
             self._conn_handle = conn_handle
             self.led.on()  # 连接时点亮LED
-            print("Connected to:", bytes(addr).hex())
+            self.peer_addr = bytes(addr).hex()
+            self.peer_id = host_id(addr_type, addr)
+            self.conn_interval_us = BLE_CONN_INTERVAL_MS * 1000
+            info(EV_CONNECTED, obj=self.peer_addr)
+            if self.on_connect is not None:
+                self.on_connect(self.peer_id)
         elif event == 2:  # _IRQ_CENTRAL_DISCONNECT
             conn_handle, addr_type, addr = data
             self._connected = False
             self._conn_handle = None
             self.led.off()  # 断开时熄灭LED
-            print("Disconnected")
+            if self.stats is not None:
+                self.stats.disconnects += 1
+            info(EV_DISCONNECTED)
             # 重新开始广告
             self._ble.gap_advertise(100)
         elif event == 3:  # _IRQ_GATTS_WRITE
             conn_handle, attr_handle = data
-            print("Data written to handle:", attr_handle)
+            debug(EV_GATTS_WRITE, attr_handle)
+        elif event == 27:  # _IRQ_CONNECTION_UPDATE
+            conn_handle, conn_interval, conn_latency, supervision_timeout, status = data
+            if status == 0:
+                self.conn_interval_us = conn_interval * CONN_INTERVAL_UNIT_US
     
     def is_connected(self):
         return self._connected
@@ -120,19 +144,48 @@ class BLEHID:
     def send_touch_report(self, contact_count, contact_max, contact_id, tip_switch, x, y):
         """发送触摸报告（绝对坐标）- 参考C3_tools.py的实现"""
         if not self._connected or self._conn_handle is None:
+            self.reports_failed += 1
+            if self.stats is not None:
+                self.stats.failed += 1
             return False
         
+        start = clock.ticks_us()
+        if self.watchdog is not None:
+            self.watchdog.begin(OP_REPORT)
         try:
-            # 构建报告数据 (8字节)
-            report = struct.pack('BBBBHH', contact_count, contact_max, contact_id, tip_switch, x, y)
-            self._ble.gatts_write(self.hid_service[3], report)
+            # 构建报告数据，写入预分配的缓冲区，避免每次发送产生新对象
+            report = self._input_report_value
+            report[0] = contact_count
+            report[1] = contact_max
+            report[2] = contact_id
+            pack_report(report, tip_switch, x, y)
+            self._ble.gatts_write(self.hid_service[3], self._input_report)
             
             # 使用正确的连接句柄发送通知
             self._ble.gatts_notify(self._conn_handle, self.hid_service[3])
+            us = elapsed_us(start)
+            self.reports_sent += 1
+            self.notify_us_sum += us
+            if us > self.notify_us_max:
+                self.notify_us_max = us
+            if self.watchdog is not None:
+                self.watchdog.track(OP_REPORT, us)
             return True
         except Exception as e:
-            print("Error sending touch report:", e)
-            # 如果发送失败，标记为断开连接
-            self._connected = False
-            self._conn_handle = None
-            return False
\ No newline at end of file
+            error(EV_REPORT_ERROR, obj=e)
+            self.reports_failed += 1
+            if self.stats is not None:
+                self.stats.failed += 1
+            # 发送失败（如协议栈缓冲区暂满 ENOMEM）只算这一个报告失败；
+            # 连接状态只由 _IRQ_CENTRAL_DISCONNECT 更新，否则运行会一直等待不会到来的重连
+            return False
+        finally:
+            if self.watchdog is not None:
+                self.watchdog.end(OP_REPORT)
+    
+    def update_telemetry(self, data):
+        """更新遥测特征值，已订阅的客户端收到通知"""
+        try:
+            self._ble.gatts_write(self.telemetry_handle, data, self._connected)
+        except OSError:
+            pass
\ No newline at end of file
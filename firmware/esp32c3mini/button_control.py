@@ -1,6 +1,7 @@
 from machine import Pin
-import time
+import clock
 from config import BUTTON1_PIN, BUTTON2_PIN
+from log import info, error, debug, EV_BTN_DOUBLE, EV_STOP_REQUEST, EV_BUTTON_ERROR, EV_PROFILE_MISSING, EV_PROFILE_SELECTED, EV_BENCH_REQUEST
 
 class ButtonControl:
     def __init__(self, display, touch_controller):
@@ -26,20 +27,28 @@ class ButtonControl:
         self.pending_single_click = False
         self.btn2_click_count = 0
         
+        # 按住按钮1再按按钮2：请求设备自检（在主循环中执行）
+        self.pending_benchmark = False
+        self.index_before_btn1 = None  # 按钮1切换场景前的索引，组合键时恢复
+        
         # ✅ 修复：不再单独维护 profiles 和 current_index，使用 display 的索引
         # 菜单相关数据统一从 display 获取
     
     def debounce(self, last_time):
-        current_time = time.ticks_ms()
-        return time.ticks_diff(current_time, last_time) > self.debounce_delay
+        # 上次按下超过 ticks 半周期（约6.2天）时差值回绕为负数，同样视为已过防抖时间
+        elapsed = clock.ticks_diff(clock.ticks_ms(), last_time)
+        return elapsed > self.debounce_delay or elapsed < 0
     
     def btn1_handler(self, pin):
         if self.debounce(self.last_btn1_time):
-            self.last_btn1_time = time.ticks_ms()
+            self.last_btn1_time = clock.ticks_ms()
+            if self.display.wake() and not self.touch_controller.is_running():
+                return  # 主菜单下显示已关闭：这一下只用于唤醒（运行中的停止请求总是生效）
             
             self.touch_controller.request_stop()
             
             # ✅ 修复：直接调用 display 的方法，保持索引同步
+            self.index_before_btn1 = self.display.current_index
             self.display.next_profile()
             
             # 更新当前 profile 显示（如果未运行）
@@ -52,11 +61,24 @@ class ButtonControl:
         if not self.debounce(self.last_btn2_time):
             return
             
-        self.last_btn2_time = time.ticks_ms()
-        current_time = time.ticks_ms()
+        self.last_btn2_time = clock.ticks_ms()
+        current_time = clock.ticks_ms()
+        if self.display.wake() and not self.touch_controller.is_running():
+            return  # 主菜单下显示已关闭：这一下只用于唤醒（运行中的停止请求总是生效）
+        
+        # 组合键：按钮1仍按住（低电平）时不算单击/双击，撤销按钮1刚才的场景切换
+        if self.btn1.value() == 0:
+            info(EV_BENCH_REQUEST)
+            if self.index_before_btn1 is not None:
+                self.display.current_index = self.index_before_btn1
+                self.index_before_btn1 = None
+            self.pending_benchmark = True
+            self.pending_single_click = False
+            self.btn2_click_count = 0
+            return
         
         # 双击检测逻辑
-        if time.ticks_diff(current_time, self.last_btn2_click_time) < self.double_click_threshold:
+        if 0 <= clock.ticks_diff(current_time, self.last_btn2_click_time) < self.double_click_threshold:
             self.btn2_click_count += 1
         else:
             self.btn2_click_count = 1
@@ -66,7 +88,7 @@ class ButtonControl:
         # 处理点击
         if self.btn2_click_count == 2:
             # 双击：立即停止并返回主菜单
-            print("双击按钮2：立即停止")
+            info(EV_BTN_DOUBLE)
             self.touch_controller.stop_immediately()
             self.btn2_click_count = 0
             self.pending_single_click = False
@@ -84,26 +106,31 @@ class ButtonControl:
         profiles = self.touch_controller.profiles
         
         if current_profile not in profiles:
-            print(f"错误：场景 '{current_profile}' 不存在")
+            error(EV_PROFILE_MISSING, obj=current_profile)
             return
             
         try:
             profile_config = profiles[current_profile]
             
-            # 调试信息
-            print(f"当前场景: {current_profile}, 方向: {profile_config['direction']}")
-            
             if self.touch_controller.is_running():
                 # 请求停止（非立即停止）
-                print("请求停止操作")
+                info(EV_STOP_REQUEST)
                 self.touch_controller.request_stop()
+                return
+            # 场景级设置：间隔分布、屏幕参数（手机地址会轮换、无法按地址记住时使用）
+            self.touch_controller.apply_profile_settings(profile_config)
+            if "jobs" in profile_config:
+                # 时间线场景：多个周期任务交替执行
+                self.display.set_profile(current_profile)
+                self.display.set_running_status(True, 0, 0)
+                self.touch_controller.start_timeline(current_profile, profile_config["jobs"])
             else:
                 # ✅ 修复：启动场景时更新显示状态
                 self.display.set_profile(current_profile)  # 设置为运行状态
                 self.display.set_running_status(True, 0, 0)  # 初始化运行状态
                 
                 # 启动场景
-                print(f"启动场景: {current_profile}, 方向: {profile_config['direction']}")
+                debug(EV_PROFILE_SELECTED, obj=current_profile)
                 self.touch_controller.start_profile(
                     current_profile, 
                     profile_config["direction"],
@@ -111,7 +138,8 @@ class ButtonControl:
                     profile_config["interval"],
                     profile_config["random_interval"],
                     profile_config["infinite"],
-                    profile_config["edge_margin"]
+                    profile_config["edge_margin"],
+                    profile_config.get("trace")
                 )
         except Exception as e:
-            print(f"按钮操作错误: {e}")
\ No newline at end of file
+            error(EV_BUTTON_ERROR, obj=e)
\ No newline at end of file
@@ -2,8 +2,14 @@ import bluetooth
 import time
 import struct
 import random
+import sys
+import select
 from machine import Pin
 from micropython import const
+from live_stream import LiveStream
+from hotpath import clamp
+from geometry import GeometryMapper, GeometryRegistry, host_id
+from tap_pacing import CONN_INTERVAL_UNIT_US, report_gap_ms, run_burst, rate_text
 
 # 配置参数
 DEVICE_NAME = "ESP32 C3 HID Touch"  # 蓝牙设备名称
@@ -12,6 +18,12 @@ SCREEN_HEIGHT = 2168             # 目标屏幕高度（可根据需要调整）
 SWIPE_DURATION = 500             # 滑屏持续时间（毫秒）
 SWIPE_STEPS = 10                 # 滑屏步骤数（越多越平滑）
 RANDOM_INTERVAL_MAX = 5          # 随机间隔时间最大值（秒），全局变量
+CONSOLE_LINE_MAX = 32            # 控制台命令最大长度（字符）
+LIVE_JITTER_SLOTS = 32           # 实时坐标流抖动缓冲区帧数
+LIVE_PLAYOUT_DELAY_MS = 40       # 实时坐标流播放延迟（毫秒），吸收USB/电脑端调度抖动
+GEOMETRY_FILE = "geometry.json"  # 按手机蓝牙地址保存的屏幕参数（与main.py共用）
+BLE_CONN_INTERVAL_MS = 15        # 协议栈报告实际连接间隔之前假定的连接间隔（毫秒）
+TAP_HOLD_MS = 80                 # 点击按下保持时间（毫秒）
 
 # HID报告描述符 - 绝对坐标触摸屏
 _HID_REPORT_DESCRIPTOR = bytes([
@@ -103,6 +115,10 @@ class BLEHID:
         # 添加连接状态和句柄存储
         self._connected = False
         self._conn_handle = None
+        self.peer_addr = None   # 已连接手机的蓝牙地址(hex)
+        self.peer_id = None     # 登记屏幕参数用的手机标识（geometry.host_id，地址会轮换时为 None）
+        self.on_connect = None  # 连接回调 on_connect(peer_id)
+        self.conn_interval_us = BLE_CONN_INTERVAL_MS * 1000  # 当前连接间隔（协议栈报告后更新）
         
         # 定义HID服务UUID
         self.hid_service_uuid = bluetooth.UUID(0x1812)  # Human Interface Device
@@ -179,8 +195,13 @@ class BLEHID:
             conn_handle, addr_type, addr = data
             self._connected = True
             self._conn_handle = conn_handle
-            print("Connected to:", bytes(addr).hex())
+            self.peer_addr = bytes(addr).hex()
+            self.peer_id = host_id(addr_type, addr)
+            self.conn_interval_us = BLE_CONN_INTERVAL_MS * 1000
+            print("Connected to:", self.peer_addr)
             print("Connection handle:", conn_handle)
+            if self.on_connect is not None:
+                self.on_connect(self.peer_id)
         elif event == 2:  # _IRQ_CENTRAL_DISCONNECT
             conn_handle, addr_type, addr = data
             self._connected = False
@@ -191,6 +212,10 @@ class BLEHID:
         elif event == 3:  # _IRQ_GATTS_WRITE
             conn_handle, attr_handle = data
             print("Data written to handle:", attr_handle)
+        elif event == 27:  # _IRQ_CONNECTION_UPDATE
+            conn_handle, conn_interval, conn_latency, supervision_timeout, status = data
+            if status == 0:
+                self.conn_interval_us = conn_interval * CONN_INTERVAL_UNIT_US
     
     def is_connected(self):
         return self._connected
@@ -201,8 +226,9 @@ class BLEHID:
             return False
         
         try:
-            # 构建报告数据 (8字节)
-            report = struct.pack('BBBBHH', contact_count, contact_max, contact_id, tip_switch, x, y)
+            # 构建报告数据 (8字节)，写入预分配的缓冲区，避免每次发送产生新对象
+            report = self._input_report_value
+            struct.pack_into('BBBBHH', report, 0, contact_count, contact_max, contact_id, tip_switch, x, y)
             self._ble.gatts_write(self.hid_service[3], report)
             
             # 使用正确的连接句柄发送通知
@@ -215,23 +241,161 @@ class BLEHID:
             self._conn_handle = None
             return False
 
+class Console:
+    """非阻塞命令控制台：在手势执行期间轮询串口输入
+
+    长时间操作（连续滑动等）运行时菜单的 input() 无法执行，
+    因此在 check_stop() 和分段等待中调用 poll()，逐字符读取已到达的输入，
+    收到完整一行后立即处理，命令延迟不超过一次移动/等待分段。
+
+    运行中可用命令:
+        stop / s / 11        停止当前操作
+        status / st          显示运行状态
+        interval <秒>        修改连续滑动间隔（0=随机）
+        duration <毫秒>      修改单次滑动时间
+        count <次数>         修改连续滑动总次数
+    """
+    def __init__(self, touch_controller, stream=sys.stdin):
+        self.touch_controller = touch_controller
+        self.stream = stream
+        self.poller = select.poll()
+        self.poller.register(stream, select.POLLIN)
+        self.line = bytearray(CONSOLE_LINE_MAX)
+        self.line_len = 0
+    
+    def reset(self):
+        """丢弃未完成的输入行（返回菜单前调用）"""
+        self.line_len = 0
+    
+    def readable(self):
+        """检查输入是否有数据可读（超时为0，不阻塞）"""
+        for _ in self.poller.ipoll(0):
+            return True
+        return False
+    
+    def poll(self):
+        """读取所有已到达的字符，不阻塞；处理过命令时返回True"""
+        handled = False
+        while self.readable():
+            ch = self.stream.read(1)
+            if not ch:
+                break
+            if ch in "\r\n":
+                if self.line_len:
+                    self.handle(bytes(self.line[:self.line_len]).decode())
+                    self.line_len = 0
+                    handled = True
+            elif self.line_len < CONSOLE_LINE_MAX:
+                # 命令和场景名都是ASCII：其他字符（中文输入等）换成 '?'，行缓冲区只存单字节且可按UTF-8解码
+                code = ord(ch)
+                self.line[self.line_len] = code if code < 0x80 else 0x3F
+                self.line_len += 1
+        return handled
+    
+    def handle(self, line):
+        """解析并执行一条运行中命令"""
+        tc = self.touch_controller
+        parts = line.strip().split()
+        if not parts:
+            return
+        cmd = parts[0].lower()
+        
+        try:
+            if cmd in ("stop", "s", "11"):
+                tc.request_stop()
+            elif cmd in ("status", "st", "10"):
+                tc.print_status()
+            elif cmd == "interval" and len(parts) > 1:
+                tc.run_interval = float(parts[1])
+                print(f"间隔已修改为: {tc.run_interval}秒 (0=随机)")
+            elif cmd == "duration" and len(parts) > 1:
+                tc.run_duration = int(parts[1])
+                print(f"滑动时间已修改为: {tc.run_duration}ms")
+            elif cmd == "count" and len(parts) > 1:
+                tc.run_count = int(parts[1])
+                print(f"滑动次数已修改为: {tc.run_count}")
+            else:
+                print(f"未知命令: {line} (可用: stop, status, interval, duration, count)")
+        except ValueError:
+            print(f"参数无效: {line}")
+
 class TouchController:
     def __init__(self, ble_hid, screen_width, screen_height):
         self.ble_hid = ble_hid
         self.screen_width = screen_width
         self.screen_height = screen_height
+        self.mapper = GeometryMapper(screen_width, screen_height)
+        self.registry = GeometryRegistry(GEOMETRY_FILE, screen_width, screen_height)
+        self.pending_geometry = None
         self.current_x = screen_width // 2
         self.current_y = screen_height // 2
         self.is_touching = False
         self.stop_requested = False
+        self.console = None
+        
+        # 连续滑动的运行参数，运行中可通过控制台修改
+        self.run_active = False
+        self.run_index = 0
+        self.run_count = 0
+        self.run_interval = 1.0
+        self.run_duration = SWIPE_DURATION
     
     def request_stop(self):
         """请求停止当前操作"""
         self.stop_requested = True
         print("停止请求已发送...")
     
+    def select_geometry(self, peer_id):
+        """蓝牙连接回调：按手机标识选出屏幕参数，在下一次移动前应用（None 时使用默认值）"""
+        self.pending_geometry = self.registry.lookup(peer_id)
+    
+    def apply_geometry(self):
+        """应用待切换的屏幕参数（分辨率不变时不重建换算表）"""
+        geometry = self.pending_geometry
+        if geometry is None:
+            return
+        self.pending_geometry = None
+        width, height, offset_x, offset_y = geometry
+        self.screen_width = width
+        self.screen_height = height
+        if self.mapper.configure(width, height, offset_x, offset_y):
+            print(f"屏幕参数切换为: {width}x{height} 偏移({offset_x}, {offset_y})")
+        self.current_x = clamp(self.current_x, width)
+        self.current_y = clamp(self.current_y, height)
+    
+    def register_geometry_custom(self):
+        """为当前连接的手机登记屏幕参数"""
+        print("\n=== 登记当前手机屏幕参数 ===")
+        print(f"手机地址: {self.ble_hid.peer_addr}")
+        try:
+            width = int(input(f"屏幕宽度 ({self.screen_width}): ") or self.screen_width)
+            height = int(input(f"屏幕高度 ({self.screen_height}): ") or self.screen_height)
+            offset_x = int(input("X校准偏移 (0): ") or 0)
+            offset_y = int(input("Y校准偏移 (0): ") or 0)
+        except ValueError:
+            print("输入无效，未修改")
+            return
+        if self.ble_hid.peer_id is not None:
+            self.registry.register(self.ble_hid.peer_id, width, height, offset_x, offset_y)
+            print("已保存")
+        elif self.ble_hid.peer_addr is not None:
+            print("手机使用会轮换的私有地址，下次连接无法识别：只用于本次连接，未保存")
+        self.pending_geometry = (width, height, offset_x, offset_y)
+        self.apply_geometry()
+    
+    def print_status(self):
+        """显示当前运行状态"""
+        print(f"当前位置: ({self.current_x}, {self.current_y}) 触摸: {self.is_touching}")
+        if self.run_active:
+            interval = "随机" if self.run_interval == 0 else f"{self.run_interval}秒"
+            print(f"连续滑动: {self.run_index}/{self.run_count} 间隔: {interval} 滑动时间: {self.run_duration}ms")
+        else:
+            print("当前没有运行中的操作")
+    
     def check_stop(self):
-        """检查是否请求停止"""
+        """检查是否请求停止（同时处理控制台输入）"""
+        if self.console is not None:
+            self.console.poll()
         if self.stop_requested:
             self.stop_requested = False
             self.touch_up()  # 确保触摸被释放
@@ -242,14 +406,15 @@ class TouchController:
         """移动触摸点到指定位置（绝对坐标）"""
         if self.check_stop():
             return False
+        self.apply_geometry()
             
         # 确保坐标在屏幕范围内
-        x = max(0, min(self.screen_width, x))
-        y = max(0, min(self.screen_height, y))
+        x = clamp(x, self.screen_width)
+        y = clamp(y, self.screen_height)
         
         # 转换坐标为HID报告格式 (0-32767)
-        hid_x = int(x * 32767 / self.screen_width)
-        hid_y = int(y * 32767 / self.screen_height)
+        hid_x = self.mapper.map_x(x)
+        hid_y = self.mapper.map_y(y)
         
         # 发送触摸报告
         if self.is_touching:
@@ -276,8 +441,8 @@ class TouchController:
                 return False
         
         # 发送触摸按下报告
-        hid_x = int(self.current_x * 32767 / self.screen_width)
-        hid_y = int(self.current_y * 32767 / self.screen_height)
+        hid_x = self.mapper.map_x(self.current_x)
+        hid_y = self.mapper.map_y(self.current_y)
         self.ble_hid.send_touch_report(1, 1, 1, 1, hid_x, hid_y)
         self.is_touching = True
         time.sleep(0.05)
@@ -286,26 +451,53 @@ class TouchController:
     def touch_up(self):
         """释放触摸"""
         # 发送触摸释放报告
-        hid_x = int(self.current_x * 32767 / self.screen_width)
-        hid_y = int(self.current_y * 32767 / self.screen_height)
+        hid_x = self.mapper.map_x(self.current_x)
+        hid_y = self.mapper.map_y(self.current_y)
         self.ble_hid.send_touch_report(1, 1, 1, 0, hid_x, hid_y)
         self.is_touching = False
         time.sleep(0.05)
     
-    def tap(self, x, y):
-        """在指定位置点击"""
+    def send_tip(self, tip):
+        """在当前位置直接发送按下(1)/抬起(0)报告，不做额外等待"""
+        success = self.ble_hid.send_touch_report(1, 1, 1, tip, self.mapper.map_x(self.current_x),
+                                                 self.mapper.map_y(self.current_y))
+        self.is_touching = tip == 1
+        return success
+    
+    def pause(self, ms):
+        """分段等待（处理控制台输入），被停止时返回 True"""
+        deadline = time.ticks_add(time.ticks_ms(), ms)
+        while True:
+            if self.check_stop():
+                return True
+            remaining = time.ticks_diff(deadline, time.ticks_ms())
+            if remaining <= 0:
+                return False
+            time.sleep_ms(min(remaining, 10))
+    
+    def tap(self, x, y, hold_ms=TAP_HOLD_MS):
+        """在指定位置点击：按下保持至少一个连接间隔后抬起"""
         if self.check_stop():
             return
-            
-        if not self.move_to(x, y):
+        self.apply_geometry()
+        self.current_x = clamp(x, self.screen_width)
+        self.current_y = clamp(y, self.screen_height)
+        if not self.send_tip(1):
             return
-            
-        if not self.touch_down():
+        self.pause(max(hold_ms, report_gap_ms(self.ble_hid.conn_interval_us)))
+        self.send_tip(0)
+    
+    def tap_burst(self, x, y, rate, count):
+        """以 rate 次/秒连续点击 count 次（受连接间隔限制），打印实际频率"""
+        if self.check_stop():
             return
-            
-        time.sleep(0.1)
-        self.touch_up()
-        time.sleep(0.1)
+        self.apply_geometry()
+        self.current_x = clamp(x, self.screen_width)
+        self.current_y = clamp(y, self.screen_height)
+        gap = report_gap_ms(self.ble_hid.conn_interval_us)
+        print(f"连接间隔: {gap}ms, 最高约 {1000 // (2 * gap)} 次/秒")
+        done, elapsed = run_burst(self.send_tip, self.pause, rate, count, self.ble_hid.conn_interval_us)
+        print(f"连点完成: {done}/{count} 次 {elapsed}ms 实际 {rate_text(done, elapsed)} 次/秒")
     
     def swipe(self, start_x, start_y, end_x, end_y, duration=SWIPE_DURATION, steps=SWIPE_STEPS):
         """执行滑屏操作"""
@@ -373,29 +565,45 @@ class TouchController:
             self.swipe(start_x, center_y, end_x, center_y, duration)
     
     def continuous_swipe(self, direction, count=5, interval=1.0, distance=None, duration=SWIPE_DURATION):
-        """连续滑动指定次数"""
+        """连续滑动指定次数（运行中可通过控制台修改间隔、时间和次数）"""
         print(f"开始连续{direction}滑动 {count} 次")
+        print("提示: 运行中输入 stop / status / interval <秒> / duration <毫秒> / count <次数>")
         
-        for i in range(count):
+        self.run_active = True
+        self.run_index = 0
+        self.run_count = count
+        self.run_interval = interval
+        self.run_duration = duration
+        try:
+            self._run_continuous(direction, distance)
+        finally:
+            self.run_active = False
+            if self.console is not None:
+                self.console.reset()
+    
+    def _run_continuous(self, direction, distance):
+        while self.run_index < self.run_count:
             if self.check_stop():
                 print("连续滑动已停止")
                 return
                 
-            print(f"第 {i+1}/{count} 次滑动...")
-            self.swipe_direction(direction, distance, duration)
+            self.run_index += 1
+            print(f"第 {self.run_index}/{self.run_count} 次滑动...")
+            self.swipe_direction(direction, distance, self.run_duration)
             
             # 如果不是最后一次，等待间隔时间
-            if i < count - 1:
+            if self.run_index < self.run_count:
                 # 如果interval为0，使用随机间隔时间
-                if interval == 0:
+                if self.run_interval == 0:
                     random_interval = random.uniform(1, RANDOM_INTERVAL_MAX)
                     print(f"随机间隔: {random_interval:.1f}秒")
                     wait_time = random_interval
                 else:
-                    wait_time = interval
+                    wait_time = self.run_interval
                 
-                # 分段等待，以便可以随时停止
-                for j in range(int(wait_time * 10)):
+                # 分段等待，以便可以随时停止或修改参数
+                start = time.ticks_ms()
+                while time.ticks_diff(time.ticks_ms(), start) < wait_time * 1000:
                     if self.check_stop():
                         print("连续滑动已停止")
                         return
@@ -424,6 +632,19 @@ class TouchController:
             print("输入无效，在当前位置点击")
             self.tap(self.current_x, self.current_y)
     
+    def tap_burst_custom(self):
+        """在自定义位置连点"""
+        print("\n=== 连点测试 ===")
+        try:
+            x = int(input(f"X坐标 (0-{self.screen_width}): ") or self.current_x)
+            y = int(input(f"Y坐标 (0-{self.screen_height}): ") or self.current_y)
+            rate = int(input("目标频率(次/秒, 默认20): ") or 20)
+            count = int(input("点击次数(默认50): ") or 50)
+        except ValueError:
+            print("输入无效")
+            return
+        self.tap_burst(x, y, rate, count)
+    
     def swipe_custom(self):
         """自定义滑动"""
         print("\n=== 自定义滑动 ===")
@@ -488,11 +709,14 @@ def show_menu():
     print("11. 停止当前操作")
     print("12. 重新连接")
     print("13. 退出")
+    print("14. 实时坐标流模式（电脑端 live_stream_host.py 驱动）")
+    print("15. 登记当前手机屏幕参数")
+    print("16. 连点测试（按连接间隔的最高频率）")
     print("="*50)
     print(f"随机间隔最大值: {RANDOM_INTERVAL_MAX}秒")
     
     try:
-        choice = input("请选择操作 (1-13): ")
+        choice = input("请选择操作 (1-16): ")
         return int(choice) if choice.isdigit() else 0
     except:
         return 0
@@ -523,6 +747,10 @@ def main():
     ble = bluetooth.BLE()
     hid = BLEHID(ble, DEVICE_NAME)
     touch_controller = TouchController(hid, SCREEN_WIDTH, SCREEN_HEIGHT)
+    touch_controller.console = Console(touch_controller)
+    hid.on_connect = touch_controller.select_geometry
+    if hid.is_connected():
+        touch_controller.select_geometry(hid.peer_id)
     
     print("等待蓝牙连接...")
     print("请在安卓设备上搜索并连接: {}".format(DEVICE_NAME))
@@ -532,10 +760,11 @@ def main():
         print(".", end="")
     
     print("\n已连接! 进入调试模式...")
-    print(f"屏幕分辨率: {SCREEN_WIDTH}×{SCREEN_HEIGHT}")
+    touch_controller.apply_geometry()
+    print(f"屏幕分辨率: {touch_controller.screen_width}×{touch_controller.screen_height}")
     print(f"当前位置: ({touch_controller.current_x}, {touch_controller.current_y})")
     print(f"随机间隔时间范围: 1.0 ~ {RANDOM_INTERVAL_MAX}秒")
-    print("提示: 在任何时候可以按 11 来停止当前操作")
+    print("提示: 操作运行中可随时输入 11 或 stop 停止，status 查看状态")
     print("提示: 连续滑动时设置间隔时间为0使用随机间隔")
     
     # 主循环
@@ -572,7 +801,7 @@ def main():
         elif choice == 9:
             test_all_swipes(touch_controller)
         elif choice == 10:
-            print(f"当前位置: ({touch_controller.current_x}, {touch_controller.current_y})")
+            touch_controller.print_status()
         elif choice == 11:
             touch_controller.request_stop()
         elif choice == 12:
@@ -582,6 +811,14 @@ def main():
         elif choice == 13:
             print("退出程序...")
             break
+        elif choice == 14:
+            stream = LiveStream(hid, LIVE_JITTER_SLOTS, LIVE_PLAYOUT_DELAY_MS)
+            emitted = stream.run()
+            print(f"\n实时坐标流结束: 发送 {emitted} 帧, 迟到 {stream.late}, 欠载 {stream.underruns}, 丢弃 {stream.dropped}")
+        elif choice == 15:
+            touch_controller.register_geometry_custom()
+        elif choice == 16:
+            touch_controller.tap_burst_custom()
         else:
             print("无效选择，请重新输入")
         
@@ -0,0 +1,46 @@
+"""
+可中断的取消令牌
+
+按钮中断里调用 cancel() 只设置标志并记录时间；手势执行中的所有等待都通过
+sleep_ms() 按 slice_ms 切片休眠，每片结束检查标志，取消后立即返回。
+因此停止请求到触摸释放的延迟不超过一个切片加一次报告发送。
+"""
+import clock
+
+
+class CancelToken:
+    def __init__(self, slice_ms=10):
+        self.slice_ms = slice_ms
+        self.requested = False
+        self.released_done = False  # 本次停止是否已经释放过触摸
+        self.requested_at = 0     # 请求停止时的 ticks_us
+        self.count = 0            # 已完成的停止次数
+        self.last_latency_us = 0  # 最近一次停止到释放的延迟
+        self.max_latency_us = 0
+
+    def cancel(self):
+        """请求取消（可在中断中调用，不分配内存）"""
+        if not self.requested:
+            self.requested_at = clock.ticks_us()
+            self.released_done = False
+            self.requested = True
+
+    def reset(self):
+        self.requested = False
+        self.released_done = False
+
+    def sleep_ms(self, ms):
+        """可中断的休眠，被取消时返回 True"""
+        if self.requested:
+            return True
+        return clock.sleep_cancellable(ms, self.slice_ms, self)
+
+    def released(self):
+        """触摸已释放：记录从请求停止到释放的延迟"""
+        if self.requested and not self.released_done:
+            self.released_done = True
+            latency = clock.ticks_diff(clock.ticks_us(), self.requested_at)
+            self.last_latency_us = latency
+            if latency > self.max_latency_us:
+                self.max_latency_us = latency
+            self.count += 1
@@ -0,0 +1,52 @@
+"""
+时钟抽象
+
+固件中 TouchController、OLEDDisplay、ButtonControl 及其使用的调度/等待模块都通过
+clock.ticks_ms()/clock.sleep_ms() 等读取时间和休眠，而不是直接调用 time 模块。
+开发板上这些名字直接就是 time 模块的函数（没有额外开销）；
+电脑上的浸泡测试 (tools/soak_runner.py) 调用 install() 换成虚拟时钟，
+休眠立即返回并推进虚拟时间，一周的运行可在很短时间内跑完。
+
+调用方必须写 clock.ticks_ms()（每次调用时查找），不能 from clock import ticks_ms，
+否则 install() 之后仍会使用旧的函数。
+"""
+import time
+
+try:
+    ticks_ms = time.ticks_ms
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+    ticks_add = time.ticks_add
+    sleep_ms = time.sleep_ms
+    sleep_us = time.sleep_us
+except AttributeError:
+    # CPython：没有 ticks_* 函数，使用前必须 install() 一个时钟
+    ticks_ms = ticks_us = ticks_diff = ticks_add = sleep_ms = sleep_us = None
+
+
+def _sleep_cancellable(ms, slice_ms, token):
+    """按 slice_ms 切片休眠 ms 毫秒，每片结束检查 token.requested，被取消时返回 True"""
+    deadline = ticks_add(ticks_ms(), ms)
+    while True:
+        remaining = ticks_diff(deadline, ticks_ms())
+        if remaining <= 0:
+            return False
+        sleep_ms(min(remaining, slice_ms))
+        if token.requested:
+            return True
+
+
+sleep_cancellable = _sleep_cancellable
+
+
+def install(source):
+    """换成 source 提供的 ticks_ms/ticks_us/ticks_diff/ticks_add/sleep_ms/sleep_us
+    （以及可选的 sleep_cancellable：虚拟时钟可直接跳到下一个事件，不必逐片推进）"""
+    global ticks_ms, ticks_us, ticks_diff, ticks_add, sleep_ms, sleep_us, sleep_cancellable
+    ticks_ms = source.ticks_ms
+    ticks_us = source.ticks_us
+    ticks_diff = source.ticks_diff
+    ticks_add = source.ticks_add
+    sleep_ms = source.sleep_ms
+    sleep_us = source.sleep_us
+    sleep_cancellable = getattr(source, "sleep_cancellable", _sleep_cancellable)
@@ -8,6 +8,17 @@ ESP32 OLED 蓝牙HID滑屏控制系统 - 配置文件
 - random_interval: 随机间隔时间范围(毫秒)
 - infinite: 是否无限循环模式
 - edge_margin: 滑屏起始/结束位置距离边缘的像素值
+- trace: (可选) 轨迹文件路径，设置后回放录制的手势代替直线滑动
+- gauss_interval: (可选) 随机间隔是否改用正态分布，默认取 HUMANIZE_GAUSS_INTERVAL
+- screen: (可选) [宽, 高] 或 [宽, 高, X偏移, Y偏移]，启动场景时作为当前手机的屏幕参数
+  （手机使用轮换的私有蓝牙地址时无法按地址记住屏幕参数，用它指定；时间线场景同样适用）
+
+时间线场景（含 jobs 列表）：多个周期任务按各自间隔交替执行，直到手动停止
+- action: 任务类型 ("swipe", "tap", "long_press")
+- every: 执行间隔范围(毫秒)，每次随机取值
+- start: (可选) 第一次执行的延迟(毫秒)，默认从 every 中随机取值
+- swipe 任务使用 direction / duration / edge_margin / trace，与普通场景相同
+- tap / long_press 任务使用 x / y（参考分辨率下的像素坐标，默认屏幕中心），long_press 可设置 hold(毫秒)
 """
 # 在配置文件开头添加方向验证
 VALID_DIRECTIONS = {"up", "down", "left", "right"}
@@ -45,12 +56,34 @@ PRESET_PROFILES = {
         "random_interval": (8000, 12000),  # 8-1.2秒随机间隔
         "infinite": False,
         "edge_margin": 400
+    },
+    "Mixed Feed": {
+        "jobs": [
+            {"action": "swipe", "direction": "up", "duration": 600, "edge_margin": 400,
+             "every": (10000, 20000)},  # 10-20秒滑动一次
+            {"action": "tap", "x": 540, "y": 1084,
+             "every": (300000, 300000)},  # 每5分钟点击一次
+            {"action": "long_press", "x": 540, "y": 1084, "hold": 1500,
+             "every": (3600000, 3600000)},  # 每小时长按一次
+        ]
+    },
+    "Clicker": {
+        "jobs": [
+            {"action": "burst", "x": 540, "y": 1084, "rate": 20, "count": 50,
+             "every": (3000, 5000)},  # 每3-5秒连点50次
+            {"action": "double_tap", "x": 540, "y": 600,
+             "every": (30000, 60000)},  # 每30-60秒双击一次
+        ]
     }
 }
 
 # 屏幕配置
 SCREEN_WIDTH = 1080
 SCREEN_HEIGHT = 2168
+GEOMETRY_USE_LUT = True  # 坐标换算查表（约 2*(宽+高) 字节内存），False 时使用定点系数
+# 按手机蓝牙地址保存的屏幕参数 {地址hex: [宽, 高, X偏移, Y偏移]}，未登记的手机使用上面的默认分辨率
+# 场景的 edge_margin 按上面的默认分辨率配置，其他分辨率的手机按比例换算
+GEOMETRY_FILE = "geometry.json"
 
 # 设备名称
 DEVICE_NAME = "ESP32C3-Touch"  # 使用更简单的设备名称
@@ -61,11 +94,93 @@ HID_DEVICE_TYPE = 0x03C1  # 鼠标设备类型，兼容性更好
 SWIPE_DURATION = 600  # 毫秒
 SWIPE_STEPS = 20
 
+# 轨迹回放配置
+TRACE_CHUNK_RECORDS = 32  # 每次从闪存读取的记录数（每条6字节）
+
+# 点击/长按参数
+TAP_HOLD_MS = 80  # 点击按下保持时间(毫秒)
+LONG_PRESS_MS = 1500  # 默认长按时间(毫秒)
+DOUBLE_TAP_GAP_MS = 80  # 双击两次点击之间的间隔(毫秒)，不小于一个连接间隔
+BURST_RATE = 10  # 连点目标频率(次/秒)，实际上限由蓝牙连接间隔决定
+BURST_COUNT = 20  # 每次连点的点击次数
+BLE_CONN_INTERVAL_MS = 15  # 协议栈报告实际连接间隔之前假定的连接间隔(毫秒)
+# HID报告布局: "standard"(8字节) 或 "compact"(5字节，去掉单点触摸时不变的触点数/ID字节)，见 hid_report.py
+# 修改后需在手机上取消配对并重新连接（手机会缓存报告描述符）
+HID_REPORT_LAYOUT = "standard"
+
+# 拟人化参数（启动时生成噪声表，滑动中只查表）
+HUMANIZE_SEED = None  # 固定整数种子可复现整个运行过程，None 为每次不同
+HUMANIZE_TABLE_SIZE = 256  # 噪声表长度（2的幂）
+HUMANIZE_WOBBLE_PX = 12  # 路径横向抖动幅度(像素)，0 为直线
+HUMANIZE_SCATTER_PX = 30  # 起止点散布标准差(像素)
+HUMANIZE_SPEED_VAR = 150  # 每步速度变化标准差(千分比)
+# 随机间隔的分布：False 为均匀分布（与未做拟人化时一致），True 为正态分布（集中在区间中部）；
+# 单个场景可用 "gauss_interval" 覆盖
+HUMANIZE_GAUSS_INTERVAL = False
+
+# 运行统计日志：计数累加在内存中，空闲时每 STATS_FLUSH_S 秒追加一条记录（场景结束时也写入）
+# 文件达到 STATS_MAX_RECORDS 条（每条20字节）后改名为 .old 并重新开始
+STATS_FILE = "stats.log"
+STATS_FLUSH_S = 600
+STATS_MAX_RECORDS = 2048
+
+# 缓冲日志：低于 LOG_LEVEL 的日志调用在导入时绑定为空函数（10=DEBUG 20=INFO 30=WARN 40=ERROR）
+LOG_LEVEL = 20
+LOG_BUFFER_SIZE = 32  # 环形缓冲区条数，满时覆盖最旧的记录
+
+# 场景运行中只在不短于该时长的空闲等待里写统计日志、输出缓冲日志(毫秒)
+IDLE_IO_MIN_MS = 100
+
+# 可中断等待的切片(毫秒)：停止请求到触摸释放的延迟不超过该值加一次报告发送（约20ms以内）
+CANCEL_SLICE_MS = 10
+# 停止到释放的延迟上限(毫秒)：tools/stop_latency_check.py 和 soak_runner.py 超出时判为不通过
+STOP_LATENCY_MAX_MS = 20
+
+# 延迟预算(毫秒)：超过预算计为一次超标，最近一次超标记录保存在RTC内存中（复位后可读出）
+# report: 单个HID报告发送  flush: 一次OLED刷新  swipe: 整次滑动超出设定时长的部分（含各步固定等待）
+LATENCY_BUDGETS_MS = {"report": 20, "flush": 50, "swipe": 2000}
+# 硬件看门狗超时(毫秒)：主循环/等待循环超过该时间没有推进时自动复位，0 为不启用
+WDT_TIMEOUT_MS = 8000
+# 长等待（轨迹回放间隔、长按、连点间隔等）分段喂狗：每段最长(毫秒)，取看门狗超时的1/4
+WDT_FEED_SLICE_MS = max(WDT_TIMEOUT_MS // 4, 1000)
+
 # OLED显示配置
 OLED_WIDTH = 128
 OLED_HEIGHT = 64
 OLED_I2C_SCL = 5
 OLED_I2C_SDA = 4
+# 启动时从低到高逐级尝试的I2C时钟频率(Hz)，选取校验通过且实际更快的最高一级
+OLED_I2C_FREQS = (400000, 800000, 1000000)
+OLED_FLUSH_BUDGET_MS = 30  # 空闲时每次分块刷新屏幕最多占用的时间(毫秒)，滑动过程中不刷新
+GLYPH_CACHE_BYTES = 2048  # 文字预渲染缓存上限(字节)，超出时淘汰最久未使用的
+# OLED硬件效果（只发送几个命令字节，不重绘、不刷新整屏）
+# 运行指示: "scroll" 指示行硬件循环滚动, "invert" 运行中整屏反色, "text" 静态文字
+OLED_RUN_INDICATOR = "scroll"
+OLED_SCROLL_FRAMES = 5  # 硬件滚动每移动1列间隔的帧数，只能取 2, 3, 4, 5, 25, 64, 128, 256
+OLED_CONTRAST = 0xCF
+OLED_DIM_CONTRAST = 0x08
+OLED_DIM_S = 60   # 多久没有按钮操作后降低亮度(秒)，0 为不降低
+OLED_OFF_S = 600  # 主菜单下多久没有按钮操作后关闭显示(秒)，0 为不关闭；运行中只调暗不关闭。
+                  # 关闭期间不刷新屏幕，按任一按钮唤醒（这一下只用于唤醒）
+
+# 自动继续：运行中蓝牙断开时暂停并保持进度，重连后继续；
+# 进度写入RTC内存，看门狗复位/软复位后自动继续（上电复位不继续）
+AUTO_RESUME = True
+RESUME_CHECKPOINT_S = 10  # 等待期间每隔多少秒更新一次断点中的剩余等待时间
+RESUME_SETTLE_MS = 1000   # 重连后等待手机完成HID初始化再继续
+
+# 运行遥测：自定义GATT服务的特征值（可读/可订阅），空闲时每隔 TELEMETRY_INTERVAL_S 秒更新一次，0 为不更新
+TELEMETRY_INTERVAL_S = 5
+
+# 设备自检（按住按钮1再按按钮2）：结果追加写入文件，超过上限时轮换为 .old
+BENCH_FILE = "bench.log"
+BENCH_MAX_BYTES = 4096
+BENCH_REPORTS = 100  # 报告发送测试的报告数（按连接间隔发送）
+
+# 内存预算测试 (mem_budget.py)：各子系统稳态下单次执行允许的最大分配(字节)，净增长必须为0
+MEM_BUDGET_ITERATIONS = 100
+MEM_ALLOC_BUDGETS = {"report": 0, "move": 0, "display": 0, "idle": 0, "loop": 0, "telemetry": 0,
+                     "stroke": 0, "swipe": 0}
 
 # 按钮配置
 BUTTON1_PIN = 1  # 菜单导航/翻页
@@ -79,11 +194,25 @@ NAME_ABBREVIATIONS = {
     "Short Video": "SHT_VID",
     "Long Video": "LNG_VID", 
     "Read Book": "RD_Book",
-    "Down Browse": "Do_BRW"
+    "Down Browse": "Do_BRW",
+    "Mixed Feed": "MIX_FD",
+    "Clicker": "CLICKER"
 }
 
+# 电脑端 tools/fleet.py 下发的场景（JSON，格式与 PRESET_PROFILES 相同）：同名覆盖，新场景排在预设之后
+PROFILES_FILE = "profiles.json"
+try:
+    import json
+    with open(PROFILES_FILE) as f:
+        PRESET_PROFILES.update(json.load(f))
+except (OSError, ValueError, TypeError) as e:
+    if not isinstance(e, OSError):
+        print(f"场景文件无效 {PROFILES_FILE}: {e}")
+
 for profile_name, config in PRESET_PROFILES.items():
-    if config["direction"] not in VALID_DIRECTIONS:
-        print(f"警告: 场景 '{profile_name}' 的方向 '{config['direction']}' 无效")
-        # 默认设置为向上
-        config["direction"] = "up"
\ No newline at end of file
+    # 时间线场景逐个检查滑动任务的方向
+    for job in config.get("jobs", [config]):
+        if job.get("action", "swipe") == "swipe" and job.get("direction") not in VALID_DIRECTIONS:
+            print(f"警告: 场景 '{profile_name}' 的方向 '{job.get('direction')}' 无效")
+            # 默认设置为向上
+            job["direction"] = "up"
\ No newline at end of file
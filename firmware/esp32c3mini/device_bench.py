@@ -0,0 +1,156 @@
+"""
+设备自检性能测试（按住按钮1再按按钮2启动，不需要电脑）
+
+依次测量:
+- 报告: 按连接间隔连续发送 BENCH_REPORTS 个抬起状态的报告（停在当前位置，不产生触摸），
+  得到实际每秒报告数和单次发送（gatts_notify）的平均/最大耗时，信号差时发送会变慢或失败；
+  结果中记录报告长度（config.HID_REPORT_LAYOUT），两种布局各测一次即可在 bench.log 中对比
+- OLED: 整屏刷新耗时和 I2C 频率（接线不良时频率会退回较低一级）
+- 内存: gc.collect() 后的空闲堆
+- 滑动: PRESET_PROFILES 中每个场景执行一次滑动（时间线场景取第一个按方向滑动的任务，轨迹回放跳过），
+  实际耗时占设定时长的百分比
+蓝牙未连接时跳过报告和滑动两项。双击按钮2可中途停止，已测得的结果照常显示和保存。
+
+结果显示在 OLED 上（下次按钮操作时恢复正常界面），并以一行 JSON 追加写入 BENCH_FILE，
+文件超过 BENCH_MAX_BYTES 时改名为 <文件名>.old 后重新开始。
+"""
+import gc
+import json
+import os
+import clock
+from config import PRESET_PROFILES, NAME_ABBREVIATIONS, SWIPE_DURATION, BENCH_FILE, BENCH_MAX_BYTES, BENCH_REPORTS
+from log import info, EV_BENCH_DONE
+
+
+def _bench_reports(tc, count):
+    """返回 (每秒报告数, 平均耗时us, 最大耗时us)，中途失败或被停止返回 None"""
+    ble = tc.ble_hid
+    hid_x = tc.mapper.map_x(tc.current_x)
+    hid_y = tc.mapper.map_y(tc.current_y)
+    total_us = 0
+    worst_us = 0
+    start = clock.ticks_ms()
+    for _ in range(count):
+        if tc.check_stop():
+            return None
+        t = clock.ticks_us()
+        if not ble.send_touch_report(1, 1, 1, 0, hid_x, hid_y):
+            return None
+        us = clock.ticks_diff(clock.ticks_us(), t)
+        total_us += us
+        if us > worst_us:
+            worst_us = us
+        tc.pause(tc.report_gap_ms())
+    elapsed = clock.ticks_diff(clock.ticks_ms(), start)
+    return count * 1000 // max(1, elapsed), total_us // count, worst_us
+
+
+def _bench_flush(display):
+    """重绘并同步刷新整屏，返回耗时（微秒）"""
+    display.update_display()
+    start = clock.ticks_us()
+    display.flush_all()
+    return clock.ticks_diff(clock.ticks_us(), start)
+
+
+def _swipe_job(config):
+    """场景中用于测试的滑动参数 (方向, 边距, 时长)，没有可测的滑动返回 None"""
+    for job in config.get("jobs", [config]):
+        if job.get("action", "swipe") == "swipe" and "direction" in job and not job.get("trace"):
+            return job["direction"], job.get("edge_margin", 100), job.get("duration", SWIPE_DURATION)
+    return None
+
+
+def _bench_swipes(tc, results):
+    """每个场景滑动一次，results[名称] = [设定ms, 实际ms]；被停止或发送失败时返回 False"""
+    for name, config in PRESET_PROFILES.items():
+        job = _swipe_job(config)
+        if job is None:
+            continue
+        direction, edge_margin, duration = job
+        start = clock.ticks_ms()
+        if not tc.swipe_direction(direction, edge_margin, duration):
+            return False
+        results[name] = [duration, clock.ticks_diff(clock.ticks_ms(), start)]
+        if tc.pause(500):
+            return False
+    return True
+
+
+def measure(tc):
+    """执行全部测试，返回结果字典"""
+    display = tc.display
+    result = {"i2c_khz": display.bus.freq // 1000, "report_bytes": tc.ble_hid.report_size, "swipes": {}}
+    if tc.stats is not None:
+        result["boot"] = tc.stats.boot
+
+    result["frame_us"] = _bench_flush(display)
+    gc.collect()
+    result["heap_free"] = gc.mem_free()
+
+    if tc.ble_hid.is_connected():
+        reports = _bench_reports(tc, BENCH_REPORTS)
+        if reports is not None:
+            result["report_rate"], result["notify_avg_us"], result["notify_max_us"] = reports
+            _bench_swipes(tc, result["swipes"])
+    return result
+
+
+def summary_lines(result):
+    """OLED 显示的5行（每行不超过16个字符）"""
+    lines = []
+    if "report_rate" in result:
+        lines.append("RPT %d/s %dms" % (result["report_rate"], (result["notify_max_us"] + 999) // 1000))
+    else:
+        lines.append("RPT --")
+    lines.append("OLED %dms %dk" % ((result["frame_us"] + 999) // 1000, result["i2c_khz"]))
+    lines.append("HEAP %dk" % (result["heap_free"] // 1024))
+
+    swipes = result["swipes"]
+    if swipes:
+        pcts = [(actual * 100 // requested, name) for name, (requested, actual) in swipes.items()]
+        worst, worst_name = max(pcts)
+        lines.append("SWP avg %d%%" % (sum(p for p, _ in pcts) // len(pcts)))
+        lines.append(("%d%% %s" % (worst, NAME_ABBREVIATIONS.get(worst_name, worst_name)))[:16])
+    else:
+        lines.append("SWP --")
+    return lines
+
+
+def save(result, path=BENCH_FILE, max_bytes=BENCH_MAX_BYTES):
+    """追加一行 JSON，文件过大时先轮换"""
+    try:
+        try:
+            if os.stat(path)[6] >= max_bytes:
+                os.rename(path, path + ".old")
+        except OSError:
+            pass
+        with open(path, "a") as f:
+            f.write(json.dumps(result))
+            f.write("\n")
+    except OSError as e:
+        print(f"自检结果写入失败: {e}")
+        return False
+    return True
+
+
+def run(tc):
+    """自检入口（主循环空闲时调用）：测量、显示并保存结果"""
+    display = tc.display
+    display.show_lines(["BENCH", "running..."])
+    display.flush_all()
+
+    tc.running = True
+    tc.cancel.reset()
+    try:
+        result = measure(tc)
+    finally:
+        tc.running = False
+        tc.cancel.reset()
+
+    lines = summary_lines(result)
+    display.show_lines(lines)
+    display.flush_all()
+    save(result)
+    info(EV_BENCH_DONE, obj=" | ".join(lines))
+    return result
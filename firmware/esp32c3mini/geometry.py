@@ -0,0 +1,118 @@
+"""
+屏幕坐标 -> HID逻辑坐标映射
+
+构造时按屏幕分辨率预先计算好每个轴的换算表（array('H')，每个像素一项），
+之后每个报告只做限幅和查表，全程整数运算，不产生浮点对象。
+关闭查表（use_lut=False）时改用预先计算的14位定点系数（误差不超过1），节省内存。
+main.py 和 c3_tools.py 共用本模块。
+
+GeometryRegistry 按已连接手机的蓝牙地址保存各自的分辨率和校准偏移（闪存上的JSON文件），
+连接时选出对应条目，只有分辨率真正变化时映射器才重建换算表。
+只适用于地址不变的手机（公共地址或静态随机地址）：安卓/iOS 默认使用定期轮换的可解析私有地址，
+固件不做配对绑定，无法解析出固定的身份地址，这类连接由 host_id() 返回 None，不查表也不保存，
+可在场景配置中用 "screen" 指定屏幕参数（启动场景时应用，见 button_control.py）。
+"""
+import json
+from array import array
+from hotpath import HID_MAX, lut_map, fixed_map
+
+
+ADDR_PUBLIC = 0
+
+
+def host_id(addr_type, addr):
+    """连接地址 -> 登记用的手机标识(hex)；地址会轮换（可解析私有地址等）时返回 None"""
+    if addr_type != ADDR_PUBLIC and addr[0] & 0xC0 != 0xC0:
+        return None  # 随机地址中只有静态随机地址（最高两位为11）不变
+    return bytes(addr).hex()
+
+
+def build_lut(limit):
+    """生成 0..limit 像素到 0..32767 的换算表"""
+    lut = array('H', bytearray(2 * (limit + 1)))
+    for v in range(limit + 1):
+        lut[v] = v * HID_MAX // limit
+    return lut
+
+
+class GeometryMapper:
+    def __init__(self, width, height, use_lut=True):
+        self.use_lut = use_lut
+        self.width = 0
+        self.height = 0
+        self.offset_x = 0
+        self.offset_y = 0
+        self.lut_x = None
+        self.lut_y = None
+        self.configure(width, height)
+
+    def configure(self, width, height, offset_x=0, offset_y=0):
+        """设置屏幕分辨率和校准偏移，只有分辨率变化时才重建换算表；返回是否重建"""
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        if width == self.width and height == self.height:
+            return False
+        self.width = width
+        self.height = height
+        if self.use_lut:
+            self.lut_x = build_lut(width)
+            self.lut_y = build_lut(height)
+        # 定点系数向上取整，保证 limit 映射到 32767
+        self.factor_x = ((HID_MAX << 14) + width - 1) // width
+        self.factor_y = ((HID_MAX << 14) + height - 1) // height
+        return True
+
+    def map_x(self, x):
+        """X像素坐标（超出范围会被限幅）-> HID坐标"""
+        if self.use_lut:
+            return lut_map(self.lut_x, x + self.offset_x, self.width)
+        return fixed_map(x + self.offset_x, self.width, self.factor_x)
+
+    def map_y(self, y):
+        """Y像素坐标（超出范围会被限幅）-> HID坐标"""
+        if self.use_lut:
+            return lut_map(self.lut_y, y + self.offset_y, self.height)
+        return fixed_map(y + self.offset_y, self.height, self.factor_y)
+
+
+class GeometryRegistry:
+    """按手机蓝牙地址保存屏幕参数: {地址hex: [宽, 高, X偏移, Y偏移]}"""
+    def __init__(self, path, default_width, default_height):
+        self.path = path
+        self.default = (default_width, default_height, 0, 0)
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            for addr, entry in data.items():
+                width, height, offset_x, offset_y = entry
+                self.entries[addr] = (int(width), int(height), int(offset_x), int(offset_y))
+        except (OSError, ValueError, TypeError) as e:
+            # 文件不存在或格式错误时使用默认分辨率
+            if not isinstance(e, OSError):
+                print(f"屏幕参数文件无效 {self.path}: {e}")
+            self.entries = {}
+
+    def save(self):
+        data = {}
+        for addr, entry in self.entries.items():
+            data[addr] = list(entry)
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+
+    def lookup(self, addr):
+        """返回 (宽, 高, X偏移, Y偏移)，未登记的手机使用默认值"""
+        if addr is None:
+            return self.default
+        return self.entries.get(addr, self.default)
+
+    def register(self, addr, width, height, offset_x=0, offset_y=0):
+        """登记/更新一台手机的屏幕参数并写入闪存（参数未变时不写）"""
+        entry = (width, height, offset_x, offset_y)
+        if self.entries.get(addr) == entry:
+            return
+        self.entries[addr] = entry
+        self.save()
@@ -0,0 +1,137 @@
+"""
+文字预渲染缓存
+
+场景名称、状态栏等文字内容很少变化，每个字符串只用内置8x8字体渲染一次到小的
+FrameBuffer 中，之后刷新时直接 blit。另外提供放大的数字（倒计时大号显示），
+单个字符放大后的点阵同样缓存。缓存总字节数超过上限时淘汰最久未使用的条目。
+
+普通、加粗、各倍数放大的条目分表保存，键直接用文字本身，查找时不构造元组；
+绘制路径也不返回元组。变化的数字用 draw_number 逐位画缓存的单个数字，不生成字符串，
+刷新运行界面时不产生垃圾对象。
+"""
+import framebuf
+
+CHAR_W = 8
+CHAR_H = 8
+DIGITS = ("0", "1", "2", "3", "4", "5", "6", "7", "8", "9")
+
+# 条目为列表: [FrameBuffer, 宽, 高, 字节数, 所在的表, 键]
+_FB = 0
+_W = 1
+_H = 2
+_SIZE = 3
+_TABLE = 4
+_KEY = 5
+
+
+class GlyphCache:
+    def __init__(self, max_bytes=2048):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.labels = {}    # 文字 -> 条目
+        self.bold = {}      # 加粗文字 -> 条目
+        self.scaled = {}    # 倍数 -> {字符: 条目}
+        self.order = []     # 条目，最近使用的在末尾
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, table, key):
+        entry = table.get(key)
+        if entry is not None:
+            self.hits += 1
+            if self.order[-1] is not entry:
+                self.order.remove(entry)
+                self.order.append(entry)
+        return entry
+
+    def _store(self, table, key, fb, w, h, size):
+        while self.order and self.used + size > self.max_bytes:
+            old = self.order.pop(0)
+            del old[_TABLE][old[_KEY]]
+            self.used -= old[_SIZE]
+        entry = [fb, w, h, size, table, key]
+        table[key] = entry
+        self.order.append(entry)
+        self.used += size
+        self.misses += 1
+        return entry
+
+    @staticmethod
+    def _new_buffer(w, h):
+        # MONO_VLSB：每字节为竖直8个像素
+        size = w * ((h + 7) // 8)
+        buf = bytearray(size)
+        return framebuf.FrameBuffer(buf, w, h, framebuf.MONO_VLSB), size
+
+    def _label(self, text, bold):
+        table = self.bold if bold else self.labels
+        entry = self._lookup(table, text)
+        if entry is None:
+            w = len(text) * CHAR_W or 1
+            h = CHAR_H + 1 if bold else CHAR_H
+            fb, size = self._new_buffer(w, h)
+            fb.text(text, 0, 0, 1)
+            if bold:
+                fb.text(text, 0, 1, 1)
+            entry = self._store(table, text, fb, w, h, size)
+        return entry
+
+    def _scaled(self, ch, scale):
+        table = self.scaled.get(scale)
+        if table is None:
+            table = self.scaled[scale] = {}
+        entry = self._lookup(table, ch)
+        if entry is None:
+            src, _ = self._new_buffer(CHAR_W, CHAR_H)
+            src.text(ch, 0, 0, 1)
+            w = CHAR_W * scale
+            h = CHAR_H * scale
+            fb, size = self._new_buffer(w, h)
+            for y in range(CHAR_H):
+                for x in range(CHAR_W):
+                    if src.pixel(x, y):
+                        fb.fill_rect(x * scale, y * scale, scale, scale, 1)
+            entry = self._store(table, ch, fb, w, h, size)
+        return entry
+
+    def label(self, text, bold=False):
+        """返回 (FrameBuffer, 宽, 高)；bold 为上下偏移1像素重复绘制的加粗效果"""
+        entry = self._label(text, bold)
+        return entry[_FB], entry[_W], entry[_H]
+
+    def scaled_char(self, ch, scale):
+        """单个字符按 scale 倍放大后的点阵"""
+        entry = self._scaled(ch, scale)
+        return entry[_FB], entry[_W], entry[_H]
+
+    def draw(self, target, text, x, y, bold=False):
+        """把缓存的文字画到 target（0像素透明），返回宽度"""
+        entry = self._label(text, bold)
+        target.blit(entry[_FB], x, y, 0)
+        return entry[_W]
+
+    def draw_scaled(self, target, text, x, y, scale=2):
+        """逐字符画放大的文字，返回宽度"""
+        start = x
+        for ch in text:
+            entry = self._scaled(ch, scale)
+            target.blit(entry[_FB], x, y, 0)
+            x += entry[_W]
+        return x - start
+
+    def draw_number(self, target, value, x, y, scale=1):
+        """画非负整数（负数按0）：逐位画缓存的单个数字，返回宽度"""
+        if value < 0:
+            value = 0
+        div = 1
+        while value // div >= 10:
+            div *= 10
+        start = x
+        while True:
+            ch = DIGITS[value // div % 10]
+            entry = self._label(ch, False) if scale == 1 else self._scaled(ch, scale)
+            target.blit(entry[_FB], x, y, 0)
+            x += entry[_W]
+            if div == 1:
+                return x - start
+            div //= 10
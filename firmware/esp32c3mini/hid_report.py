@@ -0,0 +1,108 @@
+"""
+HID 触摸报告布局与报告描述符生成
+
+两种布局（config.HID_REPORT_LAYOUT 选择，启动时生成对应的描述符）:
+- standard (8字节): 触点数, 最大触点数, 触点ID, 触摸状态(bit0), X(16位), Y(16位)
+- compact  (5字节): 触摸状态(bit0), X(16位), Y(16位)
+  单点触摸时前三个字节恒为 1,1,1，去掉后每个通知少3字节
+
+两种布局的后5字节完全相同：发送时总是按 standard 布局写入同一个8字节缓冲区
+（hotpath.pack_report），compact 只发送缓冲区第3字节起的 memoryview，打包代码不变，也不产生新对象。
+X/Y 逻辑范围都是 0-32767（15位有效）。
+
+更换布局后手机需要重新读取描述符：在手机上取消配对后重新连接。
+"""
+STANDARD = "standard"
+COMPACT = "compact"
+REPORT_SIZES = {STANDARD: 8, COMPACT: 5}
+BUFFER_SIZE = 8  # 打包缓冲区总是 standard 布局
+
+# 短条目前缀（数据长度位为0，由 _item 按数值补上）
+_USAGE_PAGE = 0x04
+_USAGE = 0x08
+_LOGICAL_MIN = 0x14
+_LOGICAL_MAX = 0x24
+_PHYSICAL_MIN = 0x34
+_PHYSICAL_MAX = 0x44
+_UNIT_EXPONENT = 0x54
+_UNIT = 0x64
+_REPORT_SIZE = 0x74
+_REPORT_COUNT = 0x94
+_INPUT = 0x80
+_COLLECTION = 0xA0
+_END_COLLECTION = 0xC0
+
+_PAGE_GENERIC_DESKTOP = 0x01
+_PAGE_DIGITIZER = 0x0D
+_INPUT_DATA = 0x02      # Data, Var, Abs
+_INPUT_CONST = 0x03     # Const, Var, Abs
+HID_MAX = 32767
+
+
+def _item(out, prefix, value):
+    """追加一个短条目，数据按有符号数取1或2字节"""
+    if -128 <= value <= 127:
+        out.append(prefix | 1)
+        out.append(value & 0xFF)
+    else:
+        out.append(prefix | 2)
+        out.append(value & 0xFF)
+        out.append((value >> 8) & 0xFF)
+
+
+def _field(out, usage, bits, logical_max, physical=False):
+    _item(out, _USAGE, usage)
+    _item(out, _LOGICAL_MIN, 0)
+    _item(out, _LOGICAL_MAX, logical_max)
+    if physical:
+        _item(out, _PHYSICAL_MIN, 0)
+        _item(out, _PHYSICAL_MAX, logical_max)
+        _item(out, _UNIT, 0x11)         # SI Lin:Length
+        _item(out, _UNIT_EXPONENT, 0)
+    _item(out, _REPORT_SIZE, bits)
+    _item(out, _REPORT_COUNT, 1)
+    _item(out, _INPUT, _INPUT_DATA)
+
+
+def _padding(out, bits):
+    _item(out, _REPORT_SIZE, bits)
+    _item(out, _REPORT_COUNT, 1)
+    _item(out, _INPUT, _INPUT_CONST)
+
+
+def descriptor(layout=STANDARD):
+    """生成报告描述符（绝对坐标触摸屏），standard 与原先手写的描述符逐字节相同"""
+    if layout not in REPORT_SIZES:
+        raise ValueError("未知的报告布局: %s" % layout)
+    out = bytearray()
+    _item(out, _USAGE_PAGE, _PAGE_DIGITIZER)
+    _item(out, _USAGE, 0x04)                # Touch Screen
+    _item(out, _COLLECTION, 0x01)           # Application
+    if layout == STANDARD:
+        _field(out, 0x54, 8, 1)             # Contact Count
+        _field(out, 0x55, 8, 1)             # Contact Count Maximum
+    _item(out, _USAGE_PAGE, _PAGE_DIGITIZER)
+    _item(out, _USAGE, 0x22)                # Finger
+    _item(out, _COLLECTION, 0x02)           # Logical
+    if layout == STANDARD:
+        _field(out, 0x51, 8, 1)             # Contact Identifier
+    _field(out, 0x42, 1, 1)                 # Tip Switch
+    _padding(out, 7)
+    _item(out, _USAGE_PAGE, _PAGE_GENERIC_DESKTOP)
+    _field(out, 0x30, 16, HID_MAX, True)    # X
+    _field(out, 0x31, 16, HID_MAX, True)    # Y
+    out.append(_END_COLLECTION)
+    out.append(_END_COLLECTION)
+    return bytes(out)
+
+
+def report_view(buf, layout=STANDARD):
+    """打包缓冲区中实际发送的部分"""
+    return memoryview(buf)[BUFFER_SIZE - REPORT_SIZES[layout]:]
+
+
+def decode(data):
+    """按长度识别布局，返回 (触摸状态, X, Y)（电脑端工具使用）"""
+    start = len(data) - REPORT_SIZES[COMPACT]
+    return (data[start] & 1, data[start + 1] | (data[start + 2] << 8),
+            data[start + 3] | (data[start + 4] << 8))
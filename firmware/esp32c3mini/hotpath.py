@@ -0,0 +1,69 @@
+"""
+热点路径：坐标限幅/换算和HID报告打包
+
+每发送一个触摸报告都会执行这些函数。这里是纯Python实现（电脑上测试也用它），
+固件支持原生代码生成时自动换成 hotpath_native.py 中
+@micropython.native / @micropython.viper 编译的同名实现，两者逻辑完全一致。
+NATIVE 表示当前是否使用原生实现。
+"""
+HID_MAX = 32767
+
+
+def py_clamp(v, hi):
+    """把坐标限制在 [0, hi] 范围内"""
+    if v < 0:
+        return 0
+    if v > hi:
+        return hi
+    return v
+
+
+def py_to_hid(v, limit):
+    """像素坐标 -> HID逻辑坐标 (0-32767)，整数运算"""
+    if v < 0:
+        v = 0
+    elif v > limit:
+        v = limit
+    return v * HID_MAX // limit
+
+
+def py_lut_map(lut, v, hi):
+    """限幅后查表换算（lut 为 array('H')，长度 hi+1）"""
+    if v < 0:
+        v = 0
+    elif v > hi:
+        v = hi
+    return lut[v]
+
+
+def py_fixed_map(v, hi, factor):
+    """限幅后用定点系数换算: (v * factor) >> 14（乘积不超过2^29，保持小整数），factor 由 GeometryMapper 预先计算"""
+    if v < 0:
+        v = 0
+    elif v > hi:
+        v = hi
+    return (v * factor) >> 14
+
+
+def py_pack_report(buf, tip, x, y):
+    """把触摸状态和坐标写入报告缓冲区第3-7字节（与 struct 'BBBBHH' 布局一致）"""
+    buf[3] = tip
+    buf[4] = x & 0xFF
+    buf[5] = (x >> 8) & 0xFF
+    buf[6] = y & 0xFF
+    buf[7] = (y >> 8) & 0xFF
+
+
+clamp = py_clamp
+to_hid = py_to_hid
+lut_map = py_lut_map
+fixed_map = py_fixed_map
+pack_report = py_pack_report
+NATIVE = False
+
+try:
+    # 不支持原生代码生成的固件或CPython上导入/编译会失败，保持纯Python实现
+    from hotpath_native import clamp, to_hid, lut_map, fixed_map, pack_report
+    NATIVE = True
+except Exception:
+    pass
@@ -0,0 +1,52 @@
+"""
+热点路径的原生编译版本（仅在MicroPython上使用，逻辑与 hotpath.py 的纯Python实现相同）
+
+不要直接导入本模块，请使用 hotpath。
+"""
+import micropython
+
+
+@micropython.viper
+def clamp(v: int, hi: int) -> int:
+    if v < 0:
+        return 0
+    if v > hi:
+        return hi
+    return v
+
+
+@micropython.native
+def to_hid(v, limit):
+    if v < 0:
+        v = 0
+    elif v > limit:
+        v = limit
+    return v * 32767 // limit
+
+
+@micropython.viper
+def lut_map(lut, v: int, hi: int) -> int:
+    if v < 0:
+        v = 0
+    elif v > hi:
+        v = hi
+    return int(ptr16(lut)[v])  # noqa: F821 (viper内置)
+
+
+@micropython.native
+def fixed_map(v, hi, factor):
+    if v < 0:
+        v = 0
+    elif v > hi:
+        v = hi
+    return (v * factor) >> 14
+
+
+@micropython.viper
+def pack_report(buf, tip: int, x: int, y: int):
+    p = ptr8(buf)  # noqa: F821 (viper内置)
+    p[3] = tip
+    p[4] = x & 0xFF
+    p[5] = (x >> 8) & 0xFF
+    p[6] = y & 0xFF
+    p[7] = (y >> 8) & 0xFF
@@ -0,0 +1,112 @@
+"""
+拟人化噪声：滑动路径抖动、起止点散布、速度变化和间隔分布
+
+启动时用指定种子的随机数一次性填好固定大小的噪声表，滑动过程中只做查表和整数运算，
+不再逐步调用 random（慢且会分配对象）。种子固定时整个运行过程可复现。
+
+噪声表（长度为2的幂）:
+- gauss:    近似正态分布，单位千分之一标准差（均值0，标准差1000）
+- smooth:   平滑噪声（Perlin式：随机控制点之间平滑插值），范围约 ±1000，用于路径抖动
+- uniform:  均匀分布 0..1023，用于均匀间隔
+- envelope: 半周期正弦包络 0..1000，保证抖动在起点和终点为0
+"""
+import math
+import random
+from array import array
+
+GAUSS_SCALE = 1000
+SMOOTH_SEGMENT = 16  # 平滑噪声控制点间隔（表项数）
+
+
+class Humanizer:
+    def __init__(self, seed=None, size=256, wobble_px=12, scatter_px=30, speed_var=150, gauss_interval=False):
+        if seed is not None:
+            random.seed(seed)
+        self.size = size
+        self.mask = size - 1
+        self.wobble_px = wobble_px
+        self.scatter_px = scatter_px
+        self.speed_var = speed_var          # 每步速度变化（千分比标准差）
+        self.gauss_interval = gauss_interval
+
+        self.gauss = array('h', bytearray(2 * size))
+        self.smooth = array('h', bytearray(2 * size))
+        self.uniform = array('H', bytearray(2 * size))
+        self.envelope = array('h', bytearray(2 * (SMOOTH_SEGMENT + 1)))
+        self._fill_tables()
+
+        # 读取游标：每绕一圈换一个奇数步长，顺序不同，避免短周期重复
+        self._cursor = 0
+        self._stride = 1
+        self._smooth_pos = 0
+
+    def _gauss_sample(self):
+        # 4个均匀分布之和近似正态分布 (Irwin-Hall)，10位均匀数标准差约295.6
+        total = 0
+        for _ in range(4):
+            total += random.getrandbits(10)
+        return (total - 2046) * GAUSS_SCALE // 591
+
+    def _fill_tables(self):
+        size = self.size
+        for i in range(size):
+            self.gauss[i] = max(-32000, min(32000, self._gauss_sample()))
+            self.uniform[i] = random.getrandbits(10)
+
+        # 平滑噪声：每 SMOOTH_SEGMENT 项一个随机控制点，中间用 smoothstep 插值（首尾相接）
+        points = size // SMOOTH_SEGMENT
+        ctrl = [random.getrandbits(11) - 1024 for _ in range(points)]
+        for i in range(size):
+            seg = i // SMOOTH_SEGMENT
+            a = ctrl[seg]
+            b = ctrl[(seg + 1) % points]
+            t = (i % SMOOTH_SEGMENT) * 1000 // SMOOTH_SEGMENT
+            s = t * t * (3000 - 2 * t) // 1000000  # smoothstep, 0..1000
+            self.smooth[i] = a + (b - a) * s // 1000
+
+        for i in range(SMOOTH_SEGMENT + 1):
+            self.envelope[i] = int(1000 * math.sin(math.pi * i / SMOOTH_SEGMENT))
+
+    def _next_index(self):
+        idx = (self._cursor * self._stride) & self.mask
+        self._cursor = (self._cursor + 1) & self.mask
+        if self._cursor == 0:
+            self._stride = ((self._stride + 2) & self.mask) | 1
+        return idx
+
+    def next_gauss(self):
+        """取下一个正态噪声值（千分之一标准差）"""
+        return self.gauss[self._next_index()]
+
+    def next_uniform(self):
+        """取下一个均匀噪声值 (0..1023)"""
+        return self.uniform[self._next_index()]
+
+    def scatter(self, v):
+        """起止点散布：v 加上正态分布的偏移"""
+        return v + self.next_gauss() * self.scatter_px // GAUSS_SCALE
+
+    def begin_stroke(self):
+        """开始一次新的滑动：随机选取平滑噪声的起始位置"""
+        self._smooth_pos = self.next_gauss() & self.mask
+
+    def wobble(self, i, steps):
+        """第 i 步（0..steps）的路径横向抖动（像素），起点和终点为0"""
+        noise = self.smooth[(self._smooth_pos + i) & self.mask]
+        env = self.envelope[i * SMOOTH_SEGMENT // steps]
+        return noise * env * self.wobble_px // 1000000
+
+    def step_delay(self, base_ms):
+        """每步延迟加入速度变化（毫秒，至少1）"""
+        ms = base_ms * (GAUSS_SCALE + self.next_gauss() * self.speed_var // GAUSS_SCALE) // GAUSS_SCALE
+        return ms if ms > 0 else 1
+
+    def interval(self, min_val, max_val):
+        """在 [min_val, max_val] 中取一个间隔：正态分布（中心为区间中点，3个标准差到边界）或均匀分布"""
+        span = max_val - min_val
+        if span <= 0:
+            return min_val
+        if self.gauss_interval:
+            v = (min_val + max_val) // 2 + self.next_gauss() * (span // 2) // (3 * GAUSS_SCALE)
+            return max(min_val, min(max_val, v))
+        return min_val + span * self.next_uniform() // 1023
@@ -0,0 +1,117 @@
+"""
+OLED I2C 总线管理：确认硬件 I2C、逐级提高时钟频率并校验
+
+启动时优先使用硬件 I2C(0)，初始化失败才退回 SoftI2C（刷新会慢数倍，输出警告）。
+先扫描确认 SSD1306 在总线上，再按 OLED_I2C_FREQS 从低到高逐级尝试：每一级连续发送
+VERIFY_ROUNDS 次整屏空白数据，每次写入的字节都收到 ACK、不抛异常才算通过，同时记录整屏耗时。
+某一级失败就停止升频；更高的设定值实际没有更快（受硬件或上拉电阻限制）时保留较低的频率。
+最后按选定频率重新打开总线并再校验一次，失败则退回最低频率。
+
+校验发生在屏幕初始化之前，写入的空白数据随后会被初始化清屏覆盖。
+"""
+from machine import Pin, I2C, SoftI2C
+import clock
+from log import info, warn, EV_I2C_SOFTWARE, EV_OLED_MISSING, EV_I2C_RATE, EV_I2C_LIMIT
+
+VERIFY_ROUNDS = 3
+MIN_GAIN_PERCENT = 5  # 更高频率至少快这么多才采用
+
+
+class I2CBus:
+    def __init__(self, scl, sda, addr=0x3c, freqs=(400000,), width=128, pages=8):
+        self.scl = scl
+        self.sda = sda
+        self.addr = addr
+        self.freqs = sorted(freqs)
+        self.pages = pages
+        self.freq = self.freqs[0]
+        self.found = False
+        self.frame_us = 0       # 选定频率下整屏传输耗时（微秒），0 表示未测量
+        self.failed_freq = 0    # 第一个未通过校验的频率，0 表示全部通过
+
+        self._blank = bytearray(width + 1)
+        self._blank[0] = 0x40
+        self._cmd = bytearray(2)
+
+        self.hardware = True
+        try:
+            self.i2c = I2C(0, scl=Pin(scl), sda=Pin(sda), freq=self.freq)
+        except Exception:
+            self.hardware = False
+            self.i2c = SoftI2C(scl=Pin(scl), sda=Pin(sda), freq=self.freq)
+
+    def _open(self, freq):
+        if self.hardware:
+            return I2C(0, scl=Pin(self.scl), sda=Pin(self.sda), freq=freq)
+        return SoftI2C(scl=Pin(self.scl), sda=Pin(self.sda), freq=freq)
+
+    def _write_frame(self, i2c):
+        """按 show_page 的方式发送一整屏空白数据，全部收到 ACK 时返回耗时（微秒），否则返回 -1"""
+        cmd = self._cmd
+        start = clock.ticks_us()
+        try:
+            for page in range(self.pages):
+                for c in (0xB0 + page, 0x00, 0x10):
+                    cmd[1] = c
+                    if i2c.writeto(self.addr, cmd) != 2:
+                        return -1
+                if i2c.writeto(self.addr, self._blank) != len(self._blank):
+                    return -1
+        except OSError:
+            return -1
+        return clock.ticks_diff(clock.ticks_us(), start)
+
+    def _verify(self, i2c):
+        """连续 VERIFY_ROUNDS 次整屏传输都成功时返回最短耗时（微秒），否则返回 -1"""
+        best = -1
+        for _ in range(VERIFY_ROUNDS):
+            t = self._write_frame(i2c)
+            if t < 0:
+                return -1
+            if best < 0 or t < best:
+                best = t
+        return best
+
+    def tune(self):
+        """探测屏幕并选出最快的稳定频率，返回选定频率"""
+        if not self.hardware:
+            warn(EV_I2C_SOFTWARE)
+        try:
+            self.found = self.addr in self.i2c.scan()
+        except OSError:
+            self.found = False
+        if not self.found:
+            warn(EV_OLED_MISSING, self.addr)
+            return self.freq
+
+        base_us = self._verify(self.i2c)
+        if base_us < 0:
+            self.failed_freq = self.freq
+        else:
+            self.frame_us = base_us
+            for freq in self.freqs[1:]:
+                try:
+                    t = self._verify(self._open(freq))
+                except (OSError, ValueError):
+                    t = -1
+                if t < 0:
+                    self.failed_freq = freq
+                    break
+                if t * 100 <= self.frame_us * (100 - MIN_GAIN_PERCENT):
+                    self.freq = freq
+                    self.frame_us = t
+
+            # 硬件 I2C 只有一个外设实例，尝试过的频率会留在总线上，按选定频率重新打开
+            self.i2c = self._open(self.freq)
+            t = self._verify(self.i2c)
+            if t < 0 and self.freq != self.freqs[0]:
+                self.freq = self.freqs[0]
+                self.frame_us = base_us
+                self.i2c = self._open(self.freq)
+            elif t >= 0:
+                self.frame_us = t
+
+        info(EV_I2C_RATE, self.freq // 1000, self.frame_us)
+        if self.failed_freq:
+            info(EV_I2C_LIMIT, self.failed_freq // 1000)
+        return self.freq
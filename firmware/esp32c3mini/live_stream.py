@@ -0,0 +1,272 @@
+"""
+实时坐标流模式：电脑通过USB串口实时驱动触摸点
+
+协议（小端，二进制帧，帧头 0xA5 0x5A，最后一字节为前面所有字节之和的低8位）:
+
+电脑 -> 设备 (13字节):  '<BBBBIHHB'
+    sync1, sync2, type, flags, t_ms, x, y, checksum
+    type:  FRAME_TOUCH(0x01)  t_ms 时刻把触摸点放到 (x, y)，flags bit0 = 按下
+           FRAME_END(0x02)    结束流模式（释放触摸并返回菜单）
+           FRAME_STATS(0x03)  请求立即回报统计
+    t_ms:  电脑端时间轴（毫秒，从任意起点单调递增；设备只使用低24位计算帧间差）
+    x, y:  HID逻辑坐标 (0-32767)，坐标映射在电脑端完成
+
+设备 -> 电脑 (19字节):  '<BBBBIIHHHB'
+    sync1, sync2, FRAME_STATUS(0x81), 缓冲帧数, 已接收帧数, 已发送帧数,
+    迟到帧数, 欠载次数, 丢弃帧数, checksum
+
+设备把收到的帧放入固定大小的抖动缓冲区，按 "首帧到达时刻 + 播放延迟" 对齐电脑时间轴，
+到期时发送HID报告。收帧、缓冲、发送过程不分配内存。
+本模块的协议部分也被电脑端工具 tools/live_stream_host.py 直接使用。
+"""
+import select
+import struct
+import sys
+import time
+from array import array
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+SYNC1 = 0xA5
+SYNC2 = 0x5A
+FRAME_TOUCH = 0x01
+FRAME_END = 0x02
+FRAME_STATS = 0x03
+FRAME_STATUS = 0x81
+
+FRAME_FORMAT = '<BBBBIHHB'
+FRAME_SIZE = 13
+STATUS_FORMAT = '<BBBBIIHHHB'
+STATUS_SIZE = 19
+
+READY_MARKER = "LIVE_STREAM_READY"
+
+
+def checksum(buf, length):
+    total = 0
+    for i in range(length):
+        total += buf[i]
+    return total & 0xFF
+
+
+def pack_frame(frame_type, t_ms, x=0, y=0, contact=0):
+    """打包一帧电脑 -> 设备数据（电脑端使用）"""
+    buf = bytearray(struct.pack(FRAME_FORMAT, SYNC1, SYNC2, frame_type, 1 if contact else 0,
+                                t_ms & 0xFFFFFFFF, x, y, 0))
+    buf[FRAME_SIZE - 1] = checksum(buf, FRAME_SIZE - 1)
+    return bytes(buf)
+
+
+def unpack_status(buf):
+    """解析设备状态帧，返回字典；校验失败返回None（电脑端使用）"""
+    if len(buf) < STATUS_SIZE or checksum(buf, STATUS_SIZE - 1) != buf[STATUS_SIZE - 1]:
+        return None
+    _, _, _, level, received, emitted, late, underruns, dropped, _ = struct.unpack(STATUS_FORMAT, bytes(buf[:STATUS_SIZE]))
+    return {
+        "buffered": level,
+        "received": received,
+        "emitted": emitted,
+        "late": late,
+        "underruns": underruns,
+        "dropped": dropped,
+    }
+
+
+class LiveStream:
+    """设备端流接收器：固定大小抖动缓冲区 + 按时间表发送HID报告"""
+    def __init__(self, ble_hid, slots=32, delay_ms=40, stats_interval_ms=1000,
+                 stream_in=None, stream_out=None):
+        self.ble_hid = ble_hid
+        self.slots = slots
+        self.delay_ms = delay_ms
+        self.stats_interval_ms = stats_interval_ms
+        self.stream_in = stream_in if stream_in is not None else sys.stdin.buffer
+        self.stream_out = stream_out if stream_out is not None else sys.stdout.buffer
+
+        # 抖动缓冲区（环形队列）
+        self.due = array('i', [0] * slots)     # 本地到期时刻 (ticks_ms)
+        self.xs = array('H', [0] * slots)
+        self.ys = array('H', [0] * slots)
+        self.tips = bytearray(slots)
+        self.head = 0
+        self.count = 0
+
+        # 收帧缓冲
+        self.rx = bytearray(FRAME_SIZE)
+        self.rx_len = 0
+        self._byte = bytearray(1)
+        self.status = bytearray(STATUS_SIZE)
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.received = 0
+        self.emitted = 0
+        self.late = 0
+        self.underruns = 0
+        self.dropped = 0
+        self.base = None      # 上一个接收帧的本地到期时刻
+        self.t_prev = 0       # 上一个接收帧的电脑时间戳
+        self.period = 0       # 最近的帧间隔（用于欠载检测）
+        self.last_due = 0
+        self.starved = False
+        self.last_x = 0
+        self.last_y = 0
+        self.tip = 0
+
+    # ---------- 接收 ----------
+
+    def _on_frame(self, now):
+        """处理一个完整帧，收到结束帧时返回False"""
+        rx = self.rx
+        if checksum(rx, FRAME_SIZE - 1) != rx[FRAME_SIZE - 1]:
+            self.dropped += 1
+            return True
+        frame_type = rx[2]
+        if frame_type == FRAME_END:
+            return False
+        if frame_type == FRAME_STATS:
+            self.send_status()
+            return True
+        if frame_type != FRAME_TOUCH:
+            self.dropped += 1
+            return True
+
+        # 只取时间戳低24位（保持小整数，不分配内存），帧间差按 2^24 取模
+        t = rx[4] | (rx[5] << 8) | (rx[6] << 16)
+        self.received += 1
+        if self.base is None:
+            # 首帧：本地时刻 = 到达时刻 + 播放延迟
+            due = time.ticks_add(now, self.delay_ms)
+        else:
+            # 按与上一帧的时间差递推，避免长时间运行时差值超出ticks范围
+            due = time.ticks_add(self.base, (t - self.t_prev) & 0xFFFFFF)
+        self.base = due
+        self.t_prev = t
+        if time.ticks_diff(now, due) > 0:
+            self.late += 1
+
+        if self.count >= self.slots:
+            # 缓冲区满：丢弃最旧的帧，保证最新位置不丢
+            self.head = (self.head + 1) % self.slots
+            self.count -= 1
+            self.dropped += 1
+        idx = (self.head + self.count) % self.slots
+        self.due[idx] = due
+        self.xs[idx] = rx[8] | (rx[9] << 8)
+        self.ys[idx] = rx[10] | (rx[11] << 8)
+        self.tips[idx] = rx[3] & 0x01
+        self.count += 1
+        self.starved = False
+        return True
+
+    def _receive(self, poller, now):
+        """读取所有已到达的字节并组帧，收到结束帧时返回False"""
+        rx = self.rx
+        while True:
+            ready = False
+            for _ in poller.ipoll(0):
+                ready = True
+            if not ready:
+                return True
+            if not self.stream_in.readinto(self._byte):
+                return True
+            b = self._byte[0]
+            n = self.rx_len
+            # 帧头同步：丢弃不在帧内的字节
+            if (n == 0 and b != SYNC1) or (n == 1 and b != SYNC2):
+                self.rx_len = 1 if b == SYNC1 else 0
+                rx[0] = SYNC1
+                continue
+            rx[n] = b
+            n += 1
+            if n < FRAME_SIZE:
+                self.rx_len = n
+                continue
+            self.rx_len = 0
+            if not self._on_frame(now):
+                return False
+
+    # ---------- 发送 ----------
+
+    def _emit(self, now):
+        """发送所有已到期的帧"""
+        while self.count:
+            idx = self.head
+            due = self.due[idx]
+            if time.ticks_diff(now, due) < 0:
+                return
+            if self.emitted:
+                self.period = time.ticks_diff(due, self.last_due)
+            self.last_due = due
+            self.last_x = self.xs[idx]
+            self.last_y = self.ys[idx]
+            self.tip = self.tips[idx]
+            self.head = (idx + 1) % self.slots
+            self.count -= 1
+            if self.ble_hid.send_touch_report(1, 1, 1, self.tip, self.last_x, self.last_y):
+                self.emitted += 1
+            else:
+                self.dropped += 1
+
+        # 缓冲区已空且下一帧按节奏本应到期：记一次欠载
+        if (self.emitted and not self.starved and self.period > 0
+                and time.ticks_diff(now, time.ticks_add(self.last_due, self.period)) > 0):
+            self.underruns += 1
+            self.starved = True
+
+    def send_status(self):
+        """向电脑回报统计"""
+        st = self.status
+        struct.pack_into(STATUS_FORMAT, st, 0, SYNC1, SYNC2, FRAME_STATUS, self.count,
+                         self.received, self.emitted, self.late & 0xFFFF,
+                         self.underruns & 0xFFFF, self.dropped & 0xFFFF, 0)
+        st[STATUS_SIZE - 1] = checksum(st, STATUS_SIZE - 1)
+        self.stream_out.write(st)
+
+    def release(self):
+        """释放触摸（结束或中断时调用）"""
+        if self.tip:
+            self.ble_hid.send_touch_report(1, 1, 1, 0, self.last_x, self.last_y)
+            self.tip = 0
+
+    # ---------- 主循环 ----------
+
+    def run(self):
+        """运行流模式直到收到结束帧或蓝牙断开"""
+        if micropython is not None:
+            # 二进制数据中可能出现 0x03，关闭 Ctrl-C 中断
+            micropython.kbd_intr(-1)
+
+        poller = select.poll()
+        poller.register(self.stream_in, select.POLLIN)
+        self.reset_stats()
+        self.head = 0
+        self.count = 0
+        self.rx_len = 0
+
+        print(READY_MARKER)
+        last_stats = time.ticks_ms()
+        try:
+            while self.ble_hid.is_connected():
+                now = time.ticks_ms()
+                if not self._receive(poller, now):
+                    break
+                self._emit(now)
+
+                if time.ticks_diff(now, last_stats) >= self.stats_interval_ms:
+                    last_stats = now
+                    self.send_status()
+
+                # 休眠到下一帧到期，最长1ms以保持收帧及时
+                if not self.count or time.ticks_diff(self.due[self.head], time.ticks_ms()) > 0:
+                    time.sleep_ms(1)
+        finally:
+            self.release()
+            self.send_status()
+            if micropython is not None:
+                micropython.kbd_intr(3)
+        return self.emitted
@@ -0,0 +1,164 @@
+"""
+缓冲分级日志
+
+热路径（蓝牙中断、报告发送、按钮中断、场景启停）不直接 print()：USB串口输出可能阻塞，
+f-string 也会分配内存。日志调用只把 事件码 + 两个整数 + 一个对象引用 写入预分配的环形缓冲区，
+在空闲时由 flush() 统一格式化输出。缓冲区满时覆盖最旧的记录并计数。
+
+级别过滤在导入时完成：低于 LOG_LEVEL 的 debug()/info()... 直接绑定为空函数，
+禁用的日志调用只剩一次空函数调用。
+"""
+import clock
+from array import array
+from config import LOG_LEVEL, LOG_BUFFER_SIZE
+
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+_LEVEL_NAMES = {DEBUG: "D", INFO: "I", WARN: "W", ERROR: "E"}
+
+# 事件码（MESSAGES 中的下标），格式中 {0} {1} 为整数参数，{2} 为对象参数
+# 可选的 fmt 参数为格式化函数：输出时才以两个整数参数调用，结果作为 {2}（由整数派生的文本不在热路径上格式化）
+EV_CONNECTED = 0
+EV_DISCONNECTED = 1
+EV_GATTS_WRITE = 2
+EV_REPORT_ERROR = 3
+EV_STOP_IMMEDIATE = 4
+EV_STOP_REQUEST = 5
+EV_BTN_DOUBLE = 6
+EV_PROFILE_START = 7
+EV_PROFILE_END = 8
+EV_TIMELINE_START = 9
+EV_TIMELINE_END = 10
+EV_BUTTON_ERROR = 11
+EV_PROFILE_MISSING = 12
+EV_PROFILE_SELECTED = 13
+EV_RELEASE_FAILED = 14
+EV_RELEASE_ERROR = 15
+EV_GEOMETRY = 16
+EV_BURST_DONE = 17
+EV_I2C_SOFTWARE = 18
+EV_OLED_MISSING = 19
+EV_I2C_RATE = 20
+EV_I2C_LIMIT = 21
+EV_BENCH_REQUEST = 22
+EV_BENCH_DONE = 23
+EV_RUN_PAUSED = 24
+EV_RUN_RESUMED = 25
+EV_RUN_RESTORED = 26
+EV_GEOMETRY_TEMP = 27
+EV_BAD_DIRECTION = 28
+EV_TRACE_OPEN = 29
+EV_TRACE_ERROR = 30
+EV_UNKNOWN_JOB = 31
+EV_STOP_LATENCY = 32
+
+MESSAGES = (
+    "Connected to: {2}",
+    "Disconnected",
+    "Data written to handle: {0}",
+    "Error sending touch report: {2}",
+    "立即停止并返回主菜单",
+    "请求停止操作",
+    "双击按钮2：立即停止",
+    "开始执行场景: {2}",
+    "场景执行结束",
+    "开始执行时间线: {2} ({0} 个任务)",
+    "时间线执行结束",
+    "按钮操作错误: {2}",
+    "错误：场景 '{2}' 不存在",
+    "启动场景: {2}",
+    "触摸释放失败（蓝牙可能已断开）",
+    "触摸释放出错: {2}",
+    "屏幕参数切换为: {2} (宽, 高, X偏移, Y偏移)",
+    "连点: {0} 次 {1}ms 实际 {2} 次/秒",
+    "警告：硬件I2C初始化失败，OLED改用软件I2C（刷新慢数倍）",
+    "警告：I2C总线上未找到OLED (地址 {0})",
+    "OLED I2C: {0}kHz, 整屏刷新 {1}us",
+    "OLED I2C: {0}kHz 校验未通过，不再升频",
+    "按钮组合：开始自检",
+    "自检结果: {2}",
+    "蓝牙断开：暂停运行，等待重连 (已执行 {0} 次)",
+    "蓝牙已重连：继续运行",
+    "复位前的场景自动继续: {2} (已执行 {0} 次, 剩余等待 {1}ms)",
+    "手机使用会轮换的私有地址：屏幕参数只用于本次连接，未保存",
+    "错误的方向: {2}",
+    "无法打开轨迹文件 {2} (错误码 {0})",
+    "轨迹文件错误: {2}",
+    "未知的任务类型: {2}",
+    "停止到释放: 最近 {0}ms 最大 {1}ms ({2}次)",
+)
+
+_size = LOG_BUFFER_SIZE
+_time = array('i', [0] * _size)
+_level = bytearray(_size)
+_code = bytearray(_size)
+_a = array('i', [0] * _size)
+_b = array('i', [0] * _size)
+_obj = [None] * _size
+_fmt = [None] * _size
+_head = 0      # 下一条写入位置
+_count = 0     # 缓冲中未输出的条数
+dropped = 0    # 因缓冲区满被覆盖的条数
+
+
+def _record(level, code, a, b, obj, fmt):
+    global _head, _count, dropped
+    i = _head
+    _time[i] = clock.ticks_ms()
+    _level[i] = level
+    _code[i] = code
+    _a[i] = a
+    _b[i] = b
+    _obj[i] = obj
+    _fmt[i] = fmt
+    _head = (i + 1) % _size
+    if _count < _size:
+        _count += 1
+    else:
+        dropped += 1
+
+
+def _noop(code, a=0, b=0, obj=None, fmt=None):
+    pass
+
+
+def _logger(level):
+    if level < LOG_LEVEL:
+        return _noop
+
+    def log(code, a=0, b=0, obj=None, fmt=None):
+        _record(level, code, a, b, obj, fmt)
+    return log
+
+
+debug = _logger(DEBUG)
+info = _logger(INFO)
+warn = _logger(WARN)
+error = _logger(ERROR)
+
+
+def pending():
+    return _count
+
+
+def flush(max_entries=_size):
+    """空闲时调用：按时间顺序输出缓冲中的日志，返回输出条数"""
+    global _count, dropped
+    n = 0
+    while _count and n < max_entries:
+        i = (_head - _count) % _size
+        _count -= 1
+        obj = _obj[i]
+        _obj[i] = None
+        fmt = _fmt[i]
+        if fmt is not None:
+            _fmt[i] = None
+            obj = fmt(_a[i], _b[i])
+        print(f"[{_time[i]}] {_LEVEL_NAMES.get(_level[i], '?')} " + MESSAGES[_code[i]].format(_a[i], _b[i], obj))
+        n += 1
+    if dropped and not _count:
+        print(f"[log] 缓冲区已满，丢弃 {dropped} 条")
+        dropped = 0
+    return n
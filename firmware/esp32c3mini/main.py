@@ -1,76 +1,242 @@
 '''
 # 自动滑屏助手 v1.0
 '''
-import time
-import random
+import clock
 import gc
-from machine import Pin
-from config import PRESET_PROFILES, SCREEN_WIDTH, SCREEN_HEIGHT, SWIPE_DURATION, SWIPE_STEPS
+from machine import Pin, reset_cause, PWRON_RESET
+from config import PRESET_PROFILES, SCREEN_WIDTH, SCREEN_HEIGHT, SWIPE_DURATION, SWIPE_STEPS, TRACE_CHUNK_RECORDS, GEOMETRY_USE_LUT, GEOMETRY_FILE
+from config import TAP_HOLD_MS, LONG_PRESS_MS, DOUBLE_TAP_GAP_MS, BURST_RATE, BURST_COUNT
+from config import LATENCY_BUDGETS_MS, WDT_TIMEOUT_MS, WDT_FEED_SLICE_MS, OLED_FLUSH_BUDGET_MS, CANCEL_SLICE_MS
+from config import STATS_FILE, STATS_FLUSH_S, STATS_MAX_RECORDS, IDLE_IO_MIN_MS
+from config import AUTO_RESUME, RESUME_CHECKPOINT_S, RESUME_SETTLE_MS, TELEMETRY_INTERVAL_S
+from config import HUMANIZE_SEED, HUMANIZE_TABLE_SIZE, HUMANIZE_WOBBLE_PX, HUMANIZE_SCATTER_PX, HUMANIZE_SPEED_VAR, HUMANIZE_GAUSS_INTERVAL
 from oled_display import OLEDDisplay
 from button_control import ButtonControl
 from ble_hid import BLEHID
+from touch_trace import TraceReader, TraceError
+from hotpath import clamp
+from geometry import GeometryMapper, GeometryRegistry
+from scheduler import Timeline
+from cancel import CancelToken
+from tap_pacing import report_gap_ms, run_burst, rate_text
+from stats_log import StatsLog
+from telemetry import Telemetry
+import device_bench
+import resume
+from resume import profile_id
+import log
+from log import info, warn, error
+from log import EV_STOP_IMMEDIATE, EV_PROFILE_START, EV_PROFILE_END, EV_TIMELINE_START, EV_TIMELINE_END
+from log import EV_RELEASE_FAILED, EV_RELEASE_ERROR, EV_GEOMETRY, EV_BURST_DONE
+from log import EV_RUN_PAUSED, EV_RUN_RESUMED, EV_RUN_RESTORED, EV_GEOMETRY_TEMP
+from log import EV_BAD_DIRECTION, EV_TRACE_OPEN, EV_TRACE_ERROR, EV_UNKNOWN_JOB, EV_STOP_LATENCY
+from humanize import Humanizer
+from watchdog import LatencyWatchdog, OP_SWIPE, elapsed_us
 
 class TouchController:
     def __init__(self, ble_hid, screen_width, screen_height):
         self.ble_hid = ble_hid
         self.screen_width = screen_width
         self.screen_height = screen_height
+        self.mapper = GeometryMapper(screen_width, screen_height, GEOMETRY_USE_LUT)
+        self.registry = None
+        self.pending_geometry = None
+        self.humanizer = Humanizer(HUMANIZE_SEED, HUMANIZE_TABLE_SIZE, HUMANIZE_WOBBLE_PX,
+                                   HUMANIZE_SCATTER_PX, HUMANIZE_SPEED_VAR, HUMANIZE_GAUSS_INTERVAL)
         self.current_x = screen_width // 2
         self.current_y = screen_height // 2
         self.is_touching = False
-        self.stop_requested = False
+        self.cancel = CancelToken(CANCEL_SLICE_MS)
         self.running = False
         self.profiles = PRESET_PROFILES
+        self.run_id = None          # 正在运行的场景编号（profile_id(名称)，写入断点）
+        self.pending_resume = None  # 复位前在运行的场景 (名称, 已执行次数, 剩余等待ms)，由主循环继续
+        self.watchdog = None
+        self.stats = None  # 运行统计日志 (stats_log.StatsLog)
+        self.telemetry = None  # 运行遥测 (telemetry.Telemetry)
     
     def is_running(self):
         return self.running
     
+    def save_progress(self, count, remaining_ms=0):
+        """把运行进度写入RTC断点（复位后从这里继续）"""
+        if AUTO_RESUME and self.run_id is not None:
+            resume.save(self.run_id, count, remaining_ms)
+    
+    def end_run(self):
+        """场景结束（停止或完成）：清除断点"""
+        if not self.cancel.released_done:
+            self.check_stop()  # 停止落在两次手势之间（触摸已抬起）时也经 check_stop 释放并记录停止延迟
+        if self.is_touching:
+            # 报告发送失败结束运行时连接仍在，手机上的触摸还按着：等协议栈缓冲区空出后抬起
+            self.pause(RESUME_SETTLE_MS)
+            self.touch_up()
+        if self.run_id is not None:
+            self.run_id = None
+            resume.clear()
+    
+    def load_resume(self):
+        """读取RTC断点：非上电复位且断点有效时，记下复位前在运行的场景，由主循环自动继续"""
+        if not AUTO_RESUME or reset_cause() == PWRON_RESET:
+            return
+        state = resume.load(self.profiles)
+        if state is None:
+            resume.clear()  # 没有断点，或断点中的场景已不存在
+            return
+        self.pending_resume = state
+    
+    def resume_run(self):
+        """继续复位前在运行的场景（断点中的次数和剩余等待时间）"""
+        name, count, remaining_ms = self.pending_resume
+        self.pending_resume = None
+        config = self.profiles[name]
+        info(EV_RUN_RESTORED, count, remaining_ms, obj=name)
+        if hasattr(self, 'display'):
+            self.display.current_index = self.display.profiles.index(name)
+        self.apply_profile_settings(config)
+        if "jobs" in config:
+            self.start_timeline(name, config["jobs"], (count, remaining_ms))
+        else:
+            self.start_profile(name, config["direction"], config["duration"], config["interval"],
+                               config["random_interval"], config["infinite"], config["edge_margin"],
+                               config.get("trace"), (count, remaining_ms))
+    
+    def wait_for_link(self, count):
+        """运行中蓝牙断开：保持进度暂停，重连后返回 True，被停止或未启用自动继续时返回 False；
+        连接仍在（单个报告发送失败）时返回 False，运行结束"""
+        if not AUTO_RESUME or self.cancel.requested or self.ble_hid.is_connected():
+            return False
+        self.is_touching = False  # 断开后手机端的触摸已失效
+        self.save_progress(count)
+        warn(EV_RUN_PAUSED, count)
+        if hasattr(self, 'display'):
+            self.display.set_paused(True)
+        while not self.ble_hid.is_connected():
+            if self.check_stop():
+                return False
+            self.idle(RESUME_SETTLE_MS)
+            self.pause(RESUME_SETTLE_MS)
+        info(EV_RUN_RESUMED)
+        if hasattr(self, 'display'):
+            self.display.set_paused(False)
+        # 等手机完成HID初始化
+        return not self.pause(RESUME_SETTLE_MS)
+    
+    def select_geometry(self, peer_id):
+        """蓝牙连接回调：按手机标识选出屏幕参数，在下一次操作开始前应用（None 时使用默认值）；
+        运行中断线重连且地址已轮换时保持当前屏幕参数（多半是同一台手机）"""
+        if peer_id is None and self.is_running():
+            return
+        if self.registry is not None:
+            self.pending_geometry = self.registry.lookup(peer_id)
+    
+    def apply_geometry(self):
+        """应用待切换的屏幕参数（分辨率不变时不重建换算表）"""
+        geometry = self.pending_geometry
+        if geometry is None:
+            return
+        self.pending_geometry = None
+        width, height, offset_x, offset_y = geometry
+        self.screen_width = width
+        self.screen_height = height
+        if self.mapper.configure(width, height, offset_x, offset_y):
+            info(EV_GEOMETRY, obj=geometry)
+        self.current_x = clamp(self.current_x, width)
+        self.current_y = clamp(self.current_y, height)
+    
+    def register_geometry(self, width, height, offset_x=0, offset_y=0):
+        """为当前连接的手机登记屏幕参数并立即生效；
+        手机地址不变时保存到闪存，使用轮换私有地址时只用于本次连接（见 geometry.host_id）"""
+        if self.registry is not None and self.ble_hid.peer_id is not None:
+            self.registry.register(self.ble_hid.peer_id, width, height, offset_x, offset_y)
+        elif self.ble_hid.is_connected():
+            info(EV_GEOMETRY_TEMP)
+        self.pending_geometry = (width, height, offset_x, offset_y)
+        self.apply_geometry()
+    
+    def apply_profile_settings(self, config):
+        """启动/继续场景前应用场景级设置：随机间隔的分布（"gauss_interval"），
+        以及配置了 "screen" 时把它登记为当前手机的屏幕参数"""
+        self.humanizer.gauss_interval = config.get("gauss_interval", HUMANIZE_GAUSS_INTERVAL)
+        screen = config.get("screen")
+        if screen:
+            self.register_geometry(*screen)
+    
     def request_stop(self):
-        """请求停止当前操作"""
-        self.stop_requested = True
+        """请求停止当前操作（正在进行的等待会在一个切片内返回）"""
+        self.cancel.cancel()
     
     def stop_immediately(self):
-        """立即停止并返回主菜单 - 修复版本"""
-        print("立即停止并返回主菜单")
-        self.stop_requested = True
+        """立即停止并返回主菜单：触摸由正在执行的手势在一个切片内释放"""
+        info(EV_STOP_IMMEDIATE)
+        self.cancel.cancel()
         self.running = False
         
-        # 确保触摸被释放
-        try:
-            self.touch_up()
-        except Exception as e:
-            print(f"触摸释放错误: {e}")
-        
         # 立即返回主菜单
         if hasattr(self, 'display'):
             self.display.set_profile(None)
-        
-        # 重置状态
-        self.stop_requested = False
+    
+    def pause(self, ms):
+        """可被停止请求打断的等待，被打断时返回 True；
+        每段先喂狗，超过 WDT_FEED_SLICE_MS 的等待分段进行（轨迹间隔、长按等可能超过看门狗超时）"""
+        while True:
+            if self.watchdog is not None:
+                self.watchdog.kick()
+            step = ms if ms < WDT_FEED_SLICE_MS else WDT_FEED_SLICE_MS
+            if self.cancel.sleep_ms(step):
+                return True
+            ms -= step
+            if ms <= 0:
+                return False
     
     def check_stop(self):
         """检查是否请求停止"""
-        if self.stop_requested:
-            self.stop_requested = False
+        if self.watchdog is not None:
+            self.watchdog.kick()  # 各循环都经过这里，正常推进时喂狗
+        if self.cancel.requested:
             self.running = False
-            self.touch_up()  # 确保触摸被释放
-            if hasattr(self, 'display'):
-                self.display.set_profile(None)  # 返回主菜单
+            if not self.cancel.released_done:
+                self.touch_up()  # 确保触摸被释放（每次停止只释放一次）
+                if hasattr(self, 'display'):
+                    self.display.set_profile(None)  # 返回主菜单
             return True
         return False
     
+    def idle(self, budget_ms):
+        """空闲钩子：没有触摸接触时分块刷新屏幕，最多占用 budget_ms 毫秒"""
+        if self.is_touching:
+            return
+        # 较长的空闲时间里输出缓冲日志、按需写入统计日志
+        if budget_ms >= IDLE_IO_MIN_MS:
+            log.flush()
+            if self.stats is not None:
+                self.stats.maybe_flush()
+            if self.telemetry is not None:
+                self.telemetry.maybe_update()
+        if not hasattr(self, 'display'):
+            return
+        if budget_ms >= IDLE_IO_MIN_MS:
+            self.display.power_step()
+        # 每次只刷一个切片，保证停止请求能及时得到响应
+        cancel = self.cancel
+        end = clock.ticks_add(clock.ticks_ms(), min(budget_ms, OLED_FLUSH_BUDGET_MS))
+        while not cancel.requested:
+            left = clock.ticks_diff(end, clock.ticks_ms())
+            if left <= 0 or not self.display.flush_step(min(left, cancel.slice_ms)):
+                break
+    
     def move_to(self, x, y):
         """移动触摸点 - 参考C3_tools.py的实现"""
         if self.check_stop():
             return False
             
         # 确保坐标在屏幕范围内
-        x = max(0, min(self.screen_width, x))
-        y = max(0, min(self.screen_height, y))
+        x = clamp(x, self.screen_width)
+        y = clamp(y, self.screen_height)
         
         # 转换坐标为HID报告格式 (0-32767)
-        hid_x = int(x * 32767 / self.screen_width)
-        hid_y = int(y * 32767 / self.screen_height)
+        hid_x = self.mapper.map_x(x)
+        hid_y = self.mapper.map_y(y)
         
         # 发送触摸报告
         if self.is_touching:
@@ -82,7 +248,7 @@ class TouchController:
             self.current_x = x
             self.current_y = y
         
-        time.sleep(0.05)
+        self.pause(50)
         return success
     
     def touch_down(self, x=None, y=None):
@@ -93,177 +259,516 @@ class TouchController:
             if not self.move_to(x, y):
                 return False
         
-        hid_x = int(self.current_x * 32767 / self.screen_width)
-        hid_y = int(self.current_y * 32767 / self.screen_height)
+        hid_x = self.mapper.map_x(self.current_x)
+        hid_y = self.mapper.map_y(self.current_y)
         self.ble_hid.send_touch_report(1, 1, 1, 1, hid_x, hid_y)
         self.is_touching = True
-        time.sleep(0.05)
+        self.pause(50)
         return True
 
     def touch_up(self):
         """释放触摸 - 参考C3_tools.py的实现"""
         try:
-            hid_x = int(self.current_x * 32767 / self.screen_width)
-            hid_y = int(self.current_y * 32767 / self.screen_height)
+            hid_x = self.mapper.map_x(self.current_x)
+            hid_y = self.mapper.map_y(self.current_y)
             success = self.ble_hid.send_touch_report(1, 1, 1, 0, hid_x, hid_y)
             if not success:
-                print("触摸释放失败（蓝牙可能已断开）")
+                warn(EV_RELEASE_FAILED)
         except Exception as e:
-            print(f"触摸释放出错: {e}")
+            error(EV_RELEASE_ERROR, obj=e)
         
         self.is_touching = False
-        time.sleep(0.05)
+        self.cancel.released()
+        self.pause(50)
     
     def swipe(self, start_x, start_y, end_x, end_y, duration=SWIPE_DURATION, steps=SWIPE_STEPS):
-        if self.check_stop():
-            return False
+        watchdog = self.watchdog
+        if watchdog is not None:
+            watchdog.begin(OP_SWIPE)
+        try:
+            if self.check_stop():
+                return False
+            self.apply_geometry()
+            start = clock.ticks_us()
             
-        if not self.move_to(start_x, start_y):
-            return False
+            if not self.move_to(start_x, start_y):
+                return False
             
-        time.sleep(0.1)
+            self.pause(100)
         
-        if not self.touch_down():
-            return False
+            if not self.touch_down():
+                return False
             
-        time.sleep(0.1)
+            self.pause(100)
         
-        step_delay = duration / steps / 1000
-        dx_step = (end_x - start_x) / steps
-        dy_step = (end_y - start_y) / steps
+            # 整数插值；拟人化：垂直于滑动方向的平滑抖动 + 每步速度变化（查表）
+            humanizer = self.humanizer
+            humanizer.begin_stroke()
+            step_delay = duration // steps
+            dx = end_x - start_x
+            dy = end_y - start_y
+            horizontal = abs(dx) >= abs(dy)
         
-        for i in range(steps):
-            if self.check_stop():
-                return False
+            for i in range(1, steps + 1):
+                if self.check_stop():
+                    return False
                 
-            target_x = int(start_x + dx_step * (i + 1))
-            target_y = int(start_y + dy_step * (i + 1))
-            if not self.move_to(target_x, target_y):
-                return False
-            time.sleep(step_delay)
+                target_x = start_x + dx * i // steps
+                target_y = start_y + dy * i // steps
+                if horizontal:
+                    target_y += humanizer.wobble(i, steps)
+                else:
+                    target_x += humanizer.wobble(i, steps)
+                if not self.move_to(target_x, target_y):
+                    return False
+                self.pause(humanizer.step_delay(step_delay))
         
+            self.touch_up()
+            self.pause(100)
+            if watchdog is not None:
+                watchdog.track(OP_SWIPE, max(0, elapsed_us(start) - duration * 1000))
+            if self.stats is not None:
+                self.stats.swipes += 1
+            return True
+        finally:
+            if watchdog is not None:
+                watchdog.end(OP_SWIPE)
+    
+    def press(self, x, y, hold_ms):
+        """在指定位置按下并保持 hold_ms 毫秒后抬起"""
+        if self.check_stop():
+            return False
+        self.apply_geometry()
+        if not self.touch_down(x, y):
+            return False
+        stopped = self.wait_with_stop_check(hold_ms)
         self.touch_up()
-        time.sleep(0.1)
-        return True
+        return not stopped
+    
+    def send_tip(self, tip):
+        """在当前位置直接发送按下(1)/抬起(0)报告，不做额外等待"""
+        success = self.ble_hid.send_touch_report(1, 1, 1, tip, self.mapper.map_x(self.current_x),
+                                                 self.mapper.map_y(self.current_y))
+        self.is_touching = tip == 1
+        if not tip:
+            self.cancel.released()
+        return success
+    
+    def report_gap_ms(self):
+        """两个状态变化报告之间的最小间隔（按当前连接间隔）"""
+        return report_gap_ms(self.ble_hid.conn_interval_us)
+    
+    def tap(self, x, y, hold_ms=TAP_HOLD_MS):
+        """在指定位置点击：按下保持至少一个连接间隔后抬起"""
+        if self.check_stop():
+            return False
+        self.apply_geometry()
+        self.current_x = clamp(x, self.screen_width)
+        self.current_y = clamp(y, self.screen_height)
+        if not self.send_tip(1):
+            return False
+        stopped = self.pause(max(hold_ms, self.report_gap_ms()))
+        self.send_tip(0)
+        if self.stats is not None:
+            self.stats.taps += 1
+        return not stopped
+    
+    def double_tap(self, x, y):
+        """双击：两次快速点击，间隔 DOUBLE_TAP_GAP_MS"""
+        gap = self.report_gap_ms()
+        if not self.tap(x, y, gap):
+            return False
+        if self.pause(max(DOUBLE_TAP_GAP_MS, gap)):
+            return False
+        return self.tap(x, y, gap)
+    
+    def tap_burst(self, x, y, rate=BURST_RATE, count=BURST_COUNT):
+        """以 rate 次/秒连续点击 count 次（受连接间隔限制），打印实际频率"""
+        if self.check_stop():
+            return False
+        self.apply_geometry()
+        self.current_x = clamp(x, self.screen_width)
+        self.current_y = clamp(y, self.screen_height)
+        done, elapsed = run_burst(self.send_tip, self.pause, rate, count, self.ble_hid.conn_interval_us)
+        if self.stats is not None:
+            self.stats.taps += done
+        info(EV_BURST_DONE, done, elapsed, fmt=rate_text)  # 频率文本在输出日志时才生成
+        return done == count
+    
+    def long_press(self, x, y, hold_ms=LONG_PRESS_MS):
+        """在指定位置长按"""
+        return self.press(x, y, hold_ms)
     
     def swipe_direction(self, direction, edge_margin=100, duration=SWIPE_DURATION):
         if self.check_stop():
             return False
+        self.apply_geometry()
             
         center_x = self.screen_width // 2
         center_y = self.screen_height // 2
         
+        # edge_margin 按 config 中的参考分辨率配置，按当前手机分辨率等比换算
+        margin_x = edge_margin * self.screen_width // SCREEN_WIDTH
+        margin_y = edge_margin * self.screen_height // SCREEN_HEIGHT
+        
         # 修复方向判断逻辑
         if direction == "up":
-            start_x, start_y = center_x, self.screen_height - edge_margin
-            end_x, end_y = center_x, edge_margin
+            start_x, start_y = center_x, self.screen_height - margin_y
+            end_x, end_y = center_x, margin_y
         elif direction == "down":
-            start_x, start_y = center_x, edge_margin
-            end_x, end_y = center_x, self.screen_height - edge_margin
+            start_x, start_y = center_x, margin_y
+            end_x, end_y = center_x, self.screen_height - margin_y
         elif direction == "left":
-            start_x, start_y = self.screen_width - edge_margin, center_y
-            end_x, end_y = edge_margin, center_y
+            start_x, start_y = self.screen_width - margin_x, center_y
+            end_x, end_y = margin_x, center_y
         elif direction == "right":
-            start_x, start_y = edge_margin, center_y
-            end_x, end_y = self.screen_width - edge_margin, center_y
+            start_x, start_y = margin_x, center_y
+            end_x, end_y = self.screen_width - margin_x, center_y
         else:
-            print(f"错误的方向: {direction}")
+            error(EV_BAD_DIRECTION, obj=direction)
             return False
+        
+        # 拟人化：起止点随机散布
+        humanizer = self.humanizer
+        start_x = humanizer.scatter(start_x)
+        start_y = humanizer.scatter(start_y)
+        end_x = humanizer.scatter(end_x)
+        end_y = humanizer.scatter(end_y)
             
         return self.swipe(start_x, start_y, end_x, end_y, duration)
     
-    def wait_with_stop_check(self, wait_time):
-        """等待指定时间，但可以随时被停止"""
-        wait_steps = int(wait_time * 10)  # 每0.1秒检查一次
-        for i in range(wait_steps):
+    def play_trace(self, path, speed_pct=100):
+        """按录制时的时间回放轨迹文件（分块读取，不整体载入内存），speed_pct为回放速度百分比"""
+        if self.check_stop():
+            return False
+        
+        try:
+            f = open(path, 'rb')
+        except OSError as e:
+            error(EV_TRACE_OPEN, e.args[0] if e.args else 0, obj=path)
+            return False
+        
+        self.apply_geometry()
+        try:
+            reader = TraceReader(f, TRACE_CHUNK_RECORDS)
+            # 录制分辨率与当前屏幕不同时按比例缩放
+            src_w = reader.width or self.screen_width
+            src_h = reader.height or self.screen_height
+            
+            due = clock.ticks_ms()
+            while reader.next():
+                # 按绝对时间表调度，避免逐条累积误差
+                due = clock.ticks_add(due, reader.dt * 100 // speed_pct)
+                while True:
+                    if self.check_stop():
+                        return False
+                    remaining = clock.ticks_diff(due, clock.ticks_ms())
+                    if remaining <= 0:
+                        break
+                    self.idle(remaining)
+                    remaining = clock.ticks_diff(due, clock.ticks_ms())
+                    if remaining > 0:
+                        self.pause(remaining)
+                
+                x = clamp(reader.x * self.screen_width // src_w, self.screen_width)
+                y = clamp(reader.y * self.screen_height // src_h, self.screen_height)
+                hid_x = self.mapper.map_x(x)
+                hid_y = self.mapper.map_y(y)
+                if not self.ble_hid.send_touch_report(1, 1, 1, reader.contact, hid_x, hid_y):
+                    return False
+                self.current_x = x
+                self.current_y = y
+                self.is_touching = reader.contact == 1
+            if self.stats is not None:
+                self.stats.swipes += 1
+            return True
+        except TraceError as e:
+            error(EV_TRACE_ERROR, obj=e)
+            return False
+        finally:
+            f.close()
+            # 回放结束或中断时确保触摸被释放
+            if self.is_touching:
+                self.touch_up()
+    
+    def wait_with_stop_check(self, wait_ms, checkpoint=False):
+        """等待指定时间（毫秒），但可以随时被停止；按截止时间等待，倒计时每秒刷新一次；
+        checkpoint 为 True 时每 RESUME_CHECKPOINT_S 秒把剩余时间写入断点"""
+        deadline = clock.ticks_add(clock.ticks_ms(), wait_ms)
+        last_shown = -1
+        while True:
             if self.check_stop():
                 return True  # 被停止
+            remaining = clock.ticks_diff(deadline, clock.ticks_ms())
+            if remaining <= 0:
+                return False  # 正常完成等待
             
-            # 更新倒计时显示
-            if hasattr(self, 'display'):
-                remaining = wait_time - (i * 0.1)
-                self.display.set_running_status(True, round(remaining, 1), getattr(self, 'swipe_count', 0))
+            # 更新倒计时显示（整秒变化时才重绘）
+            seconds = (remaining + 999) // 1000
+            if seconds != last_shown:
+                last_shown = seconds
+                if hasattr(self, 'display'):
+                    self.display.set_running_status(True, seconds, getattr(self, 'swipe_count', 0))
+                if checkpoint and seconds % RESUME_CHECKPOINT_S == 0:
+                    self.save_progress(getattr(self, 'swipe_count', 0), remaining)
             
-            time.sleep(0.1)
+            self.idle(remaining)
+            remaining = clock.ticks_diff(deadline, clock.ticks_ms())
+            if remaining > 0:
+                # 睡到下一个整秒边界（停止请求在一个切片内打断）
+                self.pause(remaining % 1000 or 1000)
+    
+    def run_job(self, job):
+        """执行时间线中的一个任务，坐标按参考分辨率配置并等比换算"""
+        action = job["action"]
+        x = job.get("x", SCREEN_WIDTH // 2) * self.screen_width // SCREEN_WIDTH
+        y = job.get("y", SCREEN_HEIGHT // 2) * self.screen_height // SCREEN_HEIGHT
+        if action == "swipe":
+            if job.get("trace"):
+                return self.play_trace(job["trace"])
+            return self.swipe_direction(job["direction"], job.get("edge_margin", 100),
+                                        job.get("duration", SWIPE_DURATION))
+        if action == "tap":
+            return self.tap(x, y)
+        if action == "double_tap":
+            return self.double_tap(x, y)
+        if action == "burst":
+            return self.tap_burst(x, y, job.get("rate", BURST_RATE), job.get("count", BURST_COUNT))
+        if action == "long_press":
+            return self.long_press(x, y, job.get("hold", LONG_PRESS_MS))
+        error(EV_UNKNOWN_JOB, obj=action)
+        return True
+    
+    def wait_until_next(self, timeline, count):
+        """精确休眠到最早任务到期，返回是否被停止；
+        每次睡到下一个整秒边界（刷新倒计时）或到期时刻，停止请求由 pause() 在一个切片内打断"""
+        last_shown = -1
+        while True:
+            if self.check_stop():
+                return True
+            remaining = timeline.next_delay()
+            if remaining is None or remaining <= 0:
+                return False
+            seconds = (remaining + 999) // 1000  # 与 wait_with_stop_check 相同，向上取整
+            if seconds != last_shown:
+                last_shown = seconds
+                if hasattr(self, 'display'):
+                    self.display.set_running_status(True, seconds, count)
+                if seconds % RESUME_CHECKPOINT_S == 0:
+                    self.save_progress(count, remaining)
+            self.idle(remaining)
+            remaining = timeline.next_delay()
+            if remaining:
+                # 睡到下一个整秒边界；最后一段只休眠剩余时间，保证准时到期
+                self.pause(remaining % 1000 or 1000)
+    
+    def report_stop_latency(self):
+        cancel = self.cancel
+        if cancel.count:
+            info(EV_STOP_LATENCY, cancel.last_latency_us // 1000, cancel.max_latency_us // 1000, obj=cancel.count)
+    
+    def start_timeline(self, profile_name, jobs, resume=None):
+        """按时间线交替执行多个周期任务，直到被停止；resume 为断点 (已执行次数, 剩余等待ms)"""
+        count, remaining_ms = resume or (0, 0)
+        if hasattr(self, 'display'):
+            self.display.set_profile(profile_name)
+            self.display.set_running_status(True, 0, count)
+        
+        self.running = True
+        self.cancel.reset()
+        if self.stats is not None:
+            self.stats.run_started()
+        info(EV_TIMELINE_START, len(jobs), obj=profile_name)
+        
+        delays = []
+        for job in jobs:
+            min_val, max_val = job["every"]
+            delays.append(job.get("start", self.humanizer.interval(min_val, max_val)))
+        # 断点继续：整体平移初始延迟，最早的任务在复位前剩余的等待时间后到期
+        shift = min(delays) - remaining_ms if resume else 0
+        timeline = Timeline()
+        for job, delay in zip(jobs, delays):
+            timeline.schedule(job, max(0, delay - shift))
+        
+        self.swipe_count = count
+        self.run_id = profile_id(profile_name)
+        self.save_progress(count, remaining_ms)
+        while self.running:
+            if self.wait_until_next(timeline, count):
+                break
+            entry = timeline.pop_due()
+            if entry is None:
+                continue
+            job = entry[2]
+            
+            # 先安排下一次再执行（执行耗时不影响节奏）
+            min_val, max_val = job["every"]
+            timeline.reschedule(entry, self.humanizer.interval(min_val, max_val))
+            
+            if not self.run_job(job):
+                # 蓝牙断开：暂停到重连后按时间线继续，否则结束
+                if self.wait_for_link(count):
+                    continue
+                break
+            count += 1
+            self.swipe_count = count
+            self.save_progress(count, timeline.next_delay() or 0)
         
-        return False  # 正常完成等待
+        self.end_run()
+        self.running = False
+        self.cancel.reset()
+        if self.stats is not None:
+            self.stats.run_stopped()
+            self.stats.flush()
+        if hasattr(self, 'display'):
+            self.display.set_running_status(False)
+            self.display.set_profile(None)
+        info(EV_TIMELINE_END)
+        self.report_stop_latency()
     
-    def start_profile(self, profile_name, direction, duration, interval, random_interval, infinite, edge_margin):
+    def start_profile(self, profile_name, direction, duration, interval, random_interval, infinite, edge_margin, trace=None, resume=None):
+        # resume 为断点 (已执行次数, 剩余等待ms)：先等完复位前剩余的时间，再从该次数继续
+        swipe_count, wait_ms = resume or (0, 0)
         # ✅ 修复：启动时确保显示状态正确
         if hasattr(self, 'display'):
             self.display.set_profile(profile_name)
-            self.display.set_running_status(True, 0, 0)
+            self.display.set_running_status(True, 0, swipe_count)
         
         self.running = True
-        self.stop_requested = False
+        self.cancel.reset()
+        if self.stats is not None:
+            self.stats.run_started()
         
-        swipe_count = 0
-        print(f"开始执行场景: {profile_name}")
+        self.swipe_count = swipe_count
+        self.run_id = profile_id(profile_name)
+        self.save_progress(swipe_count, wait_ms)
+        info(EV_PROFILE_START, obj=profile_name)
         
         while self.running:
+            # 等待，但可以随时被停止（期间定时写入断点）
+            if wait_ms > 0 and self.wait_with_stop_check(wait_ms, True):
+                break
+            wait_ms = 0
             if self.check_stop():
                 break
                 
-            # 执行滑屏操作
-            success = self.swipe_direction(direction, edge_margin, duration)
+            # 执行滑屏操作（配置了轨迹文件时回放录制的手势）
+            if trace:
+                success = self.play_trace(trace)
+            else:
+                success = self.swipe_direction(direction, edge_margin, duration)
             
             if not success:
+                # 蓝牙断开：暂停到重连后重做这一次，否则结束
+                if self.wait_for_link(swipe_count):
+                    continue
                 break
                 
             swipe_count += 1
             self.swipe_count = swipe_count
             
-            # 更新显示信息
-            if hasattr(self, 'display'):
-                countdown = 0
-                if interval > 0:
-                    countdown = interval / 1000
-                elif random_interval:
-                    min_val, max_val = random_interval
-                    next_interval = random.randint(min_val, max_val)
-                    countdown = next_interval / 1000
-                
-                self.display.set_running_status(True, round(countdown, 1), swipe_count)
-            
-            # 检查是否达到非无限模式的次数限制
-            if not infinite and interval > 0 and swipe_count >= (interval // 1000):
-                break
-                
-            # 计算等待时间
+            # 计算等待时间（随机间隔只取一次，倒计时显示与实际等待一致；全程整数毫秒，不产生浮点对象）
             if interval > 0:
-                wait_time = interval / 1000
+                wait_ms = interval
             elif random_interval:
                 min_val, max_val = random_interval
-                wait_time = random.randint(min_val, max_val) / 1000
+                wait_ms = self.humanizer.interval(min_val, max_val)
             else:
-                wait_time = 1.0
+                wait_ms = 1000
+            
+            # 更新显示信息（倒计时为整秒）
+            if hasattr(self, 'display'):
+                self.display.set_running_status(True, (wait_ms + 999) // 1000, swipe_count)
             
-            # 等待，但可以随时被停止
-            stopped = self.wait_with_stop_check(wait_time)
-            if stopped:
+            # 检查是否达到非无限模式的次数限制
+            if not infinite and interval > 0 and swipe_count >= (interval // 1000):
                 break
+            self.save_progress(swipe_count, wait_ms)
         
         # 清理状态
+        self.end_run()
         self.running = False
-        self.stop_requested = False
+        self.cancel.reset()
+        if self.stats is not None:
+            self.stats.run_stopped()
+            self.stats.flush()
         
         # ✅ 修复：场景结束时正确返回主菜单
         if hasattr(self, 'display'):
             self.display.set_running_status(False)
             self.display.set_profile(None)  # 返回主菜单
         
-        print("场景执行结束")
+        info(EV_PROFILE_END)
+        self.report_stop_latency()
+        if self.watchdog is not None:
+            self.watchdog.report()
 
-def main():
-    gc.enable()
+def setup():
+    """创建并连接各组件，返回 (touch_controller, button_control)"""
+    watchdog = LatencyWatchdog(LATENCY_BUDGETS_MS, WDT_TIMEOUT_MS)
+    watchdog.report()
+    
+    stats = StatsLog(STATS_FILE, STATS_FLUSH_S, STATS_MAX_RECORDS)
     
     ble_hid = BLEHID()
+    ble_hid.watchdog = watchdog
+    ble_hid.stats = stats
     touch_controller = TouchController(ble_hid, SCREEN_WIDTH, SCREEN_HEIGHT)
+    touch_controller.watchdog = watchdog
+    touch_controller.stats = stats
+    touch_controller.registry = GeometryRegistry(GEOMETRY_FILE, SCREEN_WIDTH, SCREEN_HEIGHT)
+    ble_hid.on_connect = touch_controller.select_geometry
     display = OLEDDisplay()
+    display.watchdog = watchdog
     display.set_bt_status(ble_hid.is_connected())
     touch_controller.display = display
+    touch_controller.telemetry = Telemetry(ble_hid, stats, display, TELEMETRY_INTERVAL_S)
+    touch_controller.load_resume()
     
     button_control = ButtonControl(display, touch_controller)
+    return touch_controller, button_control
+
+def loop_once(touch_controller, button_control):
+    """主循环的一次迭代（不含休眠和垃圾回收，内存预算测试直接调用）"""
+    display = touch_controller.display
+    touch_controller.watchdog.kick()
+    display.set_bt_status(touch_controller.ble_hid.is_connected())
+    display.power_step()
+    display.flush_step(OLED_FLUSH_BUDGET_MS)
+    log.flush()
+    touch_controller.stats.maybe_flush()
+    touch_controller.telemetry.maybe_update()
+    
+    # 处理待定的单击 - 使用正确的变量名
+    if button_control.pending_single_click:
+        current_time = clock.ticks_ms()
+        elapsed = clock.ticks_diff(current_time, button_control.last_btn2_click_time)
+        
+        # 等待双击超时后再执行单击
+        if elapsed >= button_control.double_click_threshold:
+            button_control.btn2_short_press()
+            button_control.pending_single_click = False
+            button_control.btn2_click_count = 0  # 重置计数
+    
+    # 组合键请求的设备自检
+    if button_control.pending_benchmark:
+        button_control.pending_benchmark = False
+        device_bench.run(touch_controller)
+    
+    # 复位前在运行的场景：自动从断点继续
+    if touch_controller.pending_resume is not None:
+        touch_controller.resume_run()
+
+def run(touch_controller, button_control):
+    """主循环"""
+    while True:
+        loop_once(touch_controller, button_control)
+        clock.sleep_ms(50)  # 缩短等待时间，提高响应性
+        touch_controller.telemetry.collect()  # gc.collect()，耗时计入遥测
+
+def main():
+    gc.enable()
+    touch_controller, button_control = setup()
     
     print("系统初始化完成")
     print("等待蓝牙连接...")
@@ -271,21 +776,7 @@ def main():
     print("按钮2双击: 立即停止并返回主菜单") 
     print("按钮1: 切换场景")
     
-    while True:
-        display.set_bt_status(ble_hid.is_connected())
-        
-        # 处理待定的单击 - 使用正确的变量名
-        if button_control.pending_single_click:
-            current_time = time.ticks_ms()
-            elapsed = time.ticks_diff(current_time, button_control.last_btn2_click_time)
-            
-            # 等待双击超时后再执行单击
-            if elapsed >= button_control.double_click_threshold:
-                button_control.btn2_short_press()
-                button_control.pending_single_click = False
-                button_control.btn2_click_count = 0  # 重置计数
-        
-        time.sleep(0.05)  # 缩短等待时间，提高响应性
-        gc.collect()
+    run(touch_controller, button_control)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+内存预算测试（开发板上用 `import mem_budget; mem_budget.run()` 运行，
+电脑上用 tools/mem_budget_host.py 在模拟环境中运行）
+
+长时间运行最终会被堆碎片拖垮，稳态循环中不应产生任何垃圾对象。对各子系统分别重复执行 N 次:
+- report:  发送一个触摸报告（蓝牙未连接时跳过）
+- move:    move_to 一步（换算、发送、等待）
+- display: 运行界面更新倒计时和次数并整屏刷新
+- idle:    空闲钩子（日志、统计、分块刷新）
+- loop:    主循环一次（main.loop_once，不含休眠和 gc.collect）
+- telemetry: 打包遥测计数并更新特征值
+- stroke:  拟人化笔画计算（begin_stroke + 每步抖动和速度变化，不发送）
+- swipe:   完整的一次方向滑动（起止点散布、笔画、逐步发送和等待），耗时较长，只执行 1/10 的次数
+
+先预热几次（填充文字缓存等一次性分配），gc.collect() 后记下基准；测量期间关闭自动回收，
+每次执行前后读 gc.mem_alloc() 得到单次分配量。全部执行完再 gc.collect()，与基准相比即为净增长。
+单次最大分配超过 MEM_ALLOC_BUDGETS 中的预算，或净增长大于0，即为不通过。
+
+输出各子系统的单次最大分配、平均分配、测量期间堆的高水位（相对基准）和净增长。
+"""
+import gc
+from config import MEM_BUDGET_ITERATIONS, MEM_ALLOC_BUDGETS, IDLE_IO_MIN_MS, SWIPE_DURATION, SWIPE_STEPS
+
+WARMUP = 10  # 覆盖0-9各个数字，倒计时/次数用到的数字点阵在预热时进入缓存
+COLLECT_ABOVE = 16384  # 测量期间累计垃圾超过该值时手动回收一次，避免关闭自动回收后内存耗尽
+SWIPE_MS = 100  # swipe 测试的滑动时长（另有约300ms固定停顿）
+SWIPE_DIRECTIONS = ("up", "down")
+
+
+def measure(fn, iterations, warmup=WARMUP):
+    """重复执行 fn(i)，返回 (单次最大分配, 平均分配, 高水位, 净增长)，单位字节"""
+    for i in range(warmup):
+        fn(i)
+    gc.collect()
+    base = gc.mem_alloc()
+    worst = 0
+    total = 0
+    peak = 0
+    gc.disable()
+    try:
+        for i in range(iterations):
+            before = gc.mem_alloc()
+            fn(i)
+            after = gc.mem_alloc()
+            used = after - before
+            if used > 0:
+                total += used
+                if used > worst:
+                    worst = used
+            if after - base > peak:
+                peak = after - base
+            if after - base > COLLECT_ABOVE:
+                gc.collect()
+    finally:
+        gc.enable()
+    gc.collect()
+    return worst, total // iterations, peak, gc.mem_alloc() - base
+
+
+def run(touch_controller=None, button_control=None, iterations=MEM_BUDGET_ITERATIONS, warmup=WARMUP, check_alloc=True):
+    """测量各子系统并打印结果，全部在预算内返回 True（未传入组件时调用 main.setup() 创建）；
+    check_alloc=False 时只按净增长判断（电脑上单次分配不准确）"""
+    import main
+    if touch_controller is None:
+        touch_controller, button_control = main.setup()
+    tc = touch_controller
+    ble = tc.ble_hid
+    display = tc.display
+    watchdog = tc.watchdog
+    hid_x = tc.mapper.map_x(tc.current_x)
+    hid_y = tc.mapper.map_y(tc.current_y)
+    width = tc.screen_width
+
+    def report(i):
+        watchdog.kick()
+        ble.send_touch_report(1, 1, 1, 0, hid_x, hid_y)
+
+    def move(i):
+        tc.move_to(width // 4 + (i & 1) * (width // 2), tc.current_y)
+
+    def show(i):
+        watchdog.kick()
+        display.set_running_status(True, i % 100, i)
+        display.flush_all()
+
+    def idle(i):
+        watchdog.kick()
+        tc.idle(IDLE_IO_MIN_MS)
+
+    def loop(i):
+        main.loop_once(tc, button_control)
+
+    def telemetry(i):
+        tc.telemetry.update()
+
+    humanizer = tc.humanizer
+    step_ms = SWIPE_DURATION // SWIPE_STEPS
+
+    def stroke(i):
+        humanizer.begin_stroke()
+        for step in range(1, SWIPE_STEPS + 1):
+            humanizer.wobble(step, SWIPE_STEPS)
+            humanizer.step_delay(step_ms)
+
+    def swipe(i):
+        watchdog.kick()
+        tc.swipe_direction(SWIPE_DIRECTIONS[i & 1], 100, SWIPE_MS)
+
+    tests = (("report", report), ("move", move), ("display", show), ("idle", idle), ("loop", loop),
+             ("telemetry", telemetry), ("stroke", stroke), ("swipe", swipe))
+
+    tc.cancel.reset()
+    display.set_profile(display.get_current_profile_name())
+    print(f"内存预算测试: 每项 {iterations} 次, 空闲堆 {gc.mem_free()} 字节")
+    print("子系统     单次最大  平均  高水位  净增长  预算")
+    ok = True
+    for name, fn in tests:
+        if name in ("report", "swipe") and not ble.is_connected():
+            print(f"{name:<9}  蓝牙未连接，跳过")
+            continue
+        count = max(iterations // 10, 1) if name == "swipe" else iterations
+        worst, avg, peak, growth = measure(fn, count, warmup)
+        budget = MEM_ALLOC_BUDGETS.get(name, 0)
+        passed = growth <= 0 and (worst <= budget or not check_alloc)
+        ok = ok and passed
+        print(f"{name:<9}  {worst:>8}  {avg:>4}  {peak:>6}  {growth:>6}  {budget:>4}  {'OK' if passed else 'FAIL'}")
+
+    display.set_running_status(False)
+    display.set_profile(None)
+    display.flush_all()
+    print("通过" if ok else "未通过")
+    return ok
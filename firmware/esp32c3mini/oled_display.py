@@ -1,9 +1,21 @@
-import time
-from machine import Pin, I2C, SoftI2C
+import clock
 import framebuf
-from config import OLED_WIDTH, OLED_HEIGHT, OLED_I2C_SCL, OLED_I2C_SDA, NAME_ABBREVIATIONS, PRESET_PROFILES
+from config import OLED_WIDTH, OLED_HEIGHT, OLED_I2C_SCL, OLED_I2C_SDA, OLED_I2C_FREQS, NAME_ABBREVIATIONS, PRESET_PROFILES, GLYPH_CACHE_BYTES
+from config import OLED_RUN_INDICATOR, OLED_SCROLL_FRAMES, OLED_CONTRAST, OLED_DIM_CONTRAST, OLED_DIM_S, OLED_OFF_S
+from glyph_cache import GlyphCache, CHAR_W
+from i2c_bus import I2CBus
+from watchdog import OP_FLUSH, elapsed_us
 
-# SSD1306驱动类（保持不变）
+# 硬件水平滚动：每移动1列间隔的帧数 -> 命令中的间隔编码
+SCROLL_INTERVALS = {2: 7, 3: 4, 4: 5, 5: 0, 25: 6, 64: 1, 128: 2, 256: 3}
+
+# 按页对齐的界面布局（硬件滚动以页为单位）
+_MENU_LINE_PAGES = (3, 5)  # 主菜单场景名称两行
+_RUN_NAME_PAGE = 2         # 运行界面：场景名称
+_RUN_INDICATOR_PAGE = 3    # 运行界面：运行指示
+_RUN_VALUES_PAGE = 4       # 运行界面：倒计时和次数（第4页到底部），每秒只重绘这一块
+
+# SSD1306驱动类
 class SSD1306:
     def __init__(self, width, height, i2c, addr=0x3c):
         self.width = width
@@ -12,6 +24,14 @@ class SSD1306:
         self.addr = addr
         self.buffer = bytearray(self.height * self.width // 8)
         self.framebuf = framebuf.FrameBuffer(self.buffer, self.width, self.height, framebuf.MVLSB)
+        # 预分配发送缓冲：命令为 [0x00, cmd]；每页数据为 (0x40 前缀, 帧缓冲中该页的 memoryview)，
+        # 用 writevto 一次发送，刷新时不切片、不拼接
+        self._cmd = bytearray(2)
+        buffer = memoryview(self.buffer)
+        self._pages = [(b'\x40', buffer[page * width:(page + 1) * width]) for page in range(height // 8)]
+        # 滚动设置 + 启动滚动，一次发送: 控制字节, 方向, 0, 起始页, 间隔, 结束页, 0, 0xFF, 0x2F
+        self._scroll_cmd = bytearray((0x00, 0x27, 0x00, 0, 0, 0, 0x00, 0xFF, 0x2F))
+        self.scrolling = False
         self.init_display()
     
     def init_display(self):
@@ -27,7 +47,8 @@ class SSD1306:
         self.show()
     
     def write_cmd(self, cmd):
-        self.i2c.writeto(self.addr, b'\x00' + bytearray([cmd]))
+        self._cmd[1] = cmd
+        self.i2c.writeto(self.addr, self._cmd)
     
     def write_data(self, data):
         self.i2c.writeto(self.addr, b'\x40' + data)
@@ -41,49 +62,148 @@ class SSD1306:
     def fill_rect(self, x, y, w, h, color):
         self.framebuf.fill_rect(x, y, w, h, color)
     
+    def blit(self, fbuf, x, y, key=-1):
+        self.framebuf.blit(fbuf, x, y, key)
+    
+    def show_page(self, page):
+        """只刷新一页（8行像素）；滚动期间不能写显存，先停止滚动"""
+        if self.scrolling:
+            self.stop_scroll()
+        self.write_cmd(0xB0 + page)
+        self.write_cmd(0x00)
+        self.write_cmd(0x10)
+        self.i2c.writevto(self.addr, self._pages[page])
+    
     def show(self):
         for page in range(0, self.height // 8):
-            self.write_cmd(0xB0 + page)
-            self.write_cmd(0x00)
-            self.write_cmd(0x10)
-            start = page * self.width
-            end = start + self.width
-            self.write_data(self.buffer[start:end])
+            self.show_page(page)
+    
+    # 以下效果只发送几个命令字节，不改动显存
+    def contrast(self, value):
+        self.write_cmd(0x81)
+        self.write_cmd(value)
+    
+    def invert(self, on):
+        self.write_cmd(0xA7 if on else 0xA6)
+    
+    def power(self, on):
+        """开关显示（关闭时显存保持，仍可写入）"""
+        self.write_cmd(0xAF if on else 0xAE)
+    
+    def scroll(self, start_page, end_page, left=True, frames=5):
+        """硬件水平滚动 start_page..end_page：这几页的128列循环移动，每 frames 帧移动1列"""
+        if self.scrolling:
+            self.stop_scroll()
+        cmd = self._scroll_cmd
+        cmd[1] = 0x27 if left else 0x26
+        cmd[3] = start_page
+        cmd[4] = SCROLL_INTERVALS[frames]
+        cmd[5] = end_page
+        self.i2c.writeto(self.addr, cmd)
+        self.scrolling = True
+    
+    def stop_scroll(self):
+        """停止滚动；滚动过的页保持当前移动到的位置"""
+        self.write_cmd(0x2E)
+        self.scrolling = False
 
 
 class OLEDDisplay:
     def __init__(self):
-        try:
-            self.i2c = I2C(0, scl=Pin(OLED_I2C_SCL), sda=Pin(OLED_I2C_SDA), freq=400000)
-        except:
-            self.i2c = SoftI2C(scl=Pin(OLED_I2C_SCL), sda=Pin(OLED_I2C_SDA), freq=400000)
+        # 确认硬件I2C并选出最快的稳定频率（结果写入日志）
+        self.bus = I2CBus(OLED_I2C_SCL, OLED_I2C_SDA, freqs=OLED_I2C_FREQS,
+                          width=OLED_WIDTH, pages=OLED_HEIGHT // 8)
+        self.bus.tune()
+        self.i2c = self.bus.i2c
         
         self.oled = SSD1306(OLED_WIDTH, OLED_HEIGHT, self.i2c)
+        self.oled.contrast(OLED_CONTRAST)
+        self.glyphs = GlyphCache(GLYPH_CACHE_BYTES)
         
         # 显示状态变量
         self.current_profile = None  # 当前运行的 profile 名称
         self.bt_connected = False
         self.running = False
+        self.paused = False  # 运行中蓝牙断开，等待重连
         self.countdown = 0
         self.swipe_count = 0
+        self.lines = None  # 自检结果等文字页面，显示期间代替主菜单，下次按钮操作时清除
+        self.watchdog = None  # 延迟监控 (watchdog.LatencyWatchdog)
+        
+        # 分块刷新：update_display 只重绘缓冲区并标记所有页待刷新，
+        # 由空闲钩子调用 flush_step 逐页发送，中断后从下一页继续
+        self.pages = OLED_HEIGHT // 8
+        self.dirty = 0          # 待刷新页的位掩码
+        self.flush_cursor = 0   # 下一个要检查的页
+        self.page_flushes = 0   # 启动以来刷新的页数（遥测使用）
+        self.values_mask = self.dirty_from(_RUN_VALUES_PAGE)
+        
+        # 硬件效果：重绘时记下需要滚动的页，整屏发送完后再开启滚动（滚动期间不能写显存）
+        self.scroll_mask = 0
+        self.inverted = False
+        # 空闲降低亮度/关闭显示：按钮中断里只记录时间，命令在主循环中发送
+        self.dim_ms = OLED_DIM_S * 1000
+        self.off_ms = OLED_OFF_S * 1000
+        self.last_activity = clock.ticks_ms()
+        self.woken = False
+        self.dimmed = False
+        self.sleeping = False   # 显示已关闭，期间不刷新（待刷新页保留到唤醒）
+        # 最近一页的刷新耗时（毫秒），用于判断剩余时间是否够刷一页；初值取总线校验时测得的整屏耗时
+        self.page_ms = self.bus.frame_us // self.pages // 1000 + 1 if self.bus.frame_us else 4
         
         # ✅ 场景列表和索引：从 PRESET_PROFILES 获取全称
         self.profiles = list(PRESET_PROFILES.keys())
         self.current_index = 0  # 当前选中的场景索引
+        # 菜单中每个场景分两行显示的文字，启动时拆好，重绘时不再分割/拼接字符串
+        self.menu_lines = [self._split_name(name) for name in self.profiles]
+        # 超出屏幕宽度的名称改由硬件滚动显示。滚动只是循环移动显存中已有的128列，
+        # 所以取放得下的整字符（留一个字符的间隔）画成循环带，启动时截好，重绘时不再切片
+        self.marquee = {}
+        ring_chars = OLED_WIDTH // CHAR_W - 1
+        for text in [line for lines in self.menu_lines for line in lines] + \
+                [NAME_ABBREVIATIONS.get(name, name) for name in self.profiles]:
+            if len(text) * CHAR_W > OLED_WIDTH:
+                self.marquee[text] = text[:ring_chars]
         
         self.set_profile(None)
         self.update_display()
+        self.flush_all()
     
     def clear(self):
         self.oled.fill(0)
     
     def show_text(self, text, x, y):
-        self.oled.text(text, x, y, 1)
+        """显示固定文字（预渲染缓存）"""
+        self.glyphs.draw(self.oled, text, x, y)
+    
+    def show_value(self, value, x, y):
+        """显示变化的文字（直接渲染，不进缓存）"""
+        self.oled.text(str(value), x, y, 1)
+    
+    def show_number(self, value, x, y):
+        """显示变化的非负整数（逐位画缓存的数字，不生成字符串），返回宽度"""
+        return self.glyphs.draw_number(self.oled, value, x, y)
     
     def show_large_text(self, text, x, y):
-        """模拟大号字体：显示两次略微偏移"""
-        self.oled.text(text, x, y, 1)
-        self.oled.text(text, x, y+1, 1)
+        """模拟大号字体：显示两次略微偏移（预渲染缓存）"""
+        self.glyphs.draw(self.oled, text, x, y, True)
+    
+    def show_large_digits(self, value, x, y):
+        """2倍放大的非负整数（倒计时），返回宽度"""
+        return self.glyphs.draw_number(self.oled, value, x, y, 2)
+    
+    def show_line(self, text, page):
+        """在第 page 页画一行大字：放得下时居中，超出屏幕宽度时画成循环带并标记该页硬件滚动"""
+        ring = self.marquee.get(text)
+        if ring is None:
+            self.show_large_text(text, (OLED_WIDTH - len(text) * CHAR_W) // 2, page * 8)
+        else:
+            self.show_large_text(ring, 0, page * 8)
+            self.scroll_mask |= 1 << page
+    
+    def dirty_from(self, page):
+        """第 page 页到最后一页的位掩码"""
+        return ((1 << self.pages) - 1) & ~((1 << page) - 1)
 
     def update_status_bar(self):
         """更新顶部状态栏"""
@@ -98,6 +218,13 @@ class OLEDDisplay:
     def update_main_display(self):
         """更新主显示区域 - 修复版本"""
         self.oled.fill_rect(0, 12, OLED_WIDTH, OLED_HEIGHT - 12, 0)
+        self.scroll_mask = 0
+        
+        if self.lines is not None:
+            # 文字页面：每行10像素，最多5行
+            for i, line in enumerate(self.lines[:5]):
+                self.show_value(line, 0, 14 + i * 10)
+            return
         
         # ✅ 修复：简化显示逻辑
         if self.running and self.current_profile is not None:
@@ -105,64 +232,143 @@ class OLEDDisplay:
             abbreviated_name = NAME_ABBREVIATIONS.get(self.current_profile, self.current_profile)
             
             # 场景名称（大字体）
-            text_width = len(abbreviated_name) * 6
-            x_pos = max(0, (OLED_WIDTH - text_width) // 2)
-            self.show_large_text(abbreviated_name, x_pos, 16)
+            self.show_line(abbreviated_name, _RUN_NAME_PAGE)
             
-            # 状态信息
-            countdown_text = f"Next:{self.countdown}s"
-            self.show_text(countdown_text, 2, 40)
-            count_text = f"Count:{self.swipe_count}"
-            self.show_text(count_text, 2, 50)
+            # 运行指示器（断开等待重连时显示 PAUSED）；scroll 模式下这一行由硬件循环滚动，不再重绘
+            y = _RUN_INDICATOR_PAGE * 8
+            if self.paused:
+                self.show_text(">>> PAUSED <<<", 8, y)
+            else:
+                self.show_text(">>> RUNNING <<<", 4, y)
+                if OLED_RUN_INDICATOR == "scroll":
+                    self.scroll_mask |= 1 << _RUN_INDICATOR_PAGE
             
-            # 运行指示器
-            self.show_text(">>> RUNNING <<<", 20, 30)
+            self.draw_run_values()
             
         else:
-            # 主菜单界面：显示当前选中的场景
+            # 主菜单界面：显示当前选中的场景（分两行）
             try:
-                current_full_name = self.profiles[self.current_index]
+                line1, line2 = self.menu_lines[self.current_index]
             except (IndexError, TypeError):
-                current_full_name = "SELECT PROFILE"
+                line1, line2 = "SELECT", "PROFILE"
             
-            # 分两行显示场景名称
-            words = current_full_name.split()
-            if len(words) == 0:
-                line1, line2 = "NO", "PROFILE"
-            elif len(words) == 1:
-                w = words[0]
-                mid = len(w) // 2
-                line1, line2 = w[:mid], w[mid:]
-            else:
-                split_idx = (len(words) + 1) // 2
-                line1 = " ".join(words[:split_idx])
-                line2 = " ".join(words[split_idx:])
-            
-            # 计算居中位置
-            width1 = len(line1) * 6
-            width2 = len(line2) * 6
-            x1 = (OLED_WIDTH - width1) // 2
-            x2 = (OLED_WIDTH - width2) // 2
-            
-            # 垂直居中
-            char_h = 16
-            total_h = char_h * 2
-            start_y = 12 + (OLED_HEIGHT - 12 - total_h) // 2
-            y1 = start_y
-            y2 = start_y + char_h
+            # 两行分别占一页（按页对齐，过长的一行可以单独硬件滚动），水平居中
+            self.show_line(line1, _MENU_LINE_PAGES[0])
+            self.show_line(line2, _MENU_LINE_PAGES[1])
             
-            self.show_large_text(line1, x1, y1)
-            self.show_large_text(line2, x2, y2)
-            
-            # 添加选择指示器
-            self.show_text("^", OLED_WIDTH // 2 - 3, y2 + 5)
+            # 添加选择指示器（放在最后一页，不随名称滚动）
+            self.show_text("^", OLED_WIDTH // 2 - 3, OLED_HEIGHT - 8)
+    
+    def draw_run_values(self):
+        """运行界面下半部分：倒计时用2倍数字显示，以及滑动次数"""
+        self.show_text("Next:", 2, 40)
+        width = self.show_large_digits(self.countdown, 42, 35)
+        self.show_text("s", 42 + width + 2, 43)
+        self.show_text("Count:", 2, 55)
+        self.show_number(self.swipe_count, 50, 55)
+
+    @staticmethod
+    def _split_name(name):
+        """场景名称拆成两行: 多个单词时前后各一半，单个单词从中间断开"""
+        words = name.split()
+        if len(words) == 0:
+            return "NO", "PROFILE"
+        if len(words) == 1:
+            w = words[0]
+            mid = len(w) // 2
+            return w[:mid], w[mid:]
+        split_idx = (len(words) + 1) // 2
+        return " ".join(words[:split_idx]), " ".join(words[split_idx:])
 
     def update_display(self):
-        """刷新整个屏幕"""
+        """重绘整个屏幕缓冲区，实际发送由 flush_step/flush_all 完成"""
         #print(self.current_profile)
         self.update_status_bar()
         self.update_main_display()
-        self.oled.show()
+        self.dirty = (1 << self.pages) - 1
+    
+    def _flush_next_page(self):
+        page = self.flush_cursor
+        while not self.dirty & (1 << page):
+            page = (page + 1) % self.pages
+        start = clock.ticks_us()
+        self.dirty &= ~(1 << page)
+        watchdog = self.watchdog
+        if watchdog is not None:
+            watchdog.begin(OP_FLUSH)
+        try:
+            self.oled.show_page(page)
+        finally:
+            if watchdog is not None:
+                watchdog.end(OP_FLUSH)
+        self.flush_cursor = (page + 1) % self.pages
+        self.page_flushes += 1
+        if not self.dirty:
+            self.apply_effects()
+        us = elapsed_us(start)
+        self.page_ms = us // 1000 + 1
+        return us
+    
+    def apply_effects(self):
+        """所有页发送完后：按当前界面开启硬件滚动，同步运行反色（只在主循环中调用）"""
+        mask = self.scroll_mask
+        if mask and not self.oled.scrolling:
+            start = 0
+            while not mask & (1 << start):
+                start += 1
+            end = self.pages - 1
+            while not mask & (1 << end):
+                end -= 1
+            self.oled.scroll(start, end, True, OLED_SCROLL_FRAMES)
+        invert = self.running and not self.paused and OLED_RUN_INDICATOR == "invert"
+        if invert != self.inverted:
+            self.inverted = invert
+            self.oled.invert(invert)
+    
+    def flush_step(self, budget_ms):
+        """空闲时调用：在 budget_ms 毫秒内尽量多刷新几页，返回刷新的页数（显示关闭期间不刷新）"""
+        pages = 0
+        used_us = 0
+        while self.dirty and not self.sleeping and used_us // 1000 + self.page_ms <= budget_ms:
+            used_us += self._flush_next_page()
+            pages += 1
+        if pages and self.watchdog is not None:
+            self.watchdog.track(OP_FLUSH, used_us)
+        return pages
+    
+    def flush_all(self):
+        """立即刷新所有待刷新的页"""
+        while self.dirty:
+            self._flush_next_page()
+    
+    def wake(self):
+        """记录一次按钮操作（可在中断中调用，不访问I2C），返回显示是否处于关闭状态"""
+        self.last_activity = clock.ticks_ms()
+        self.woken = True
+        return self.sleeping
+    
+    def power_step(self):
+        """空闲时调用：按钮操作后恢复亮度和显示；长时间没有操作时降低亮度，
+        不在运行时再关闭显示（运行中只调暗，按钮按下总是直接生效）"""
+        oled = self.oled
+        if self.woken:
+            self.woken = False
+            if self.sleeping:
+                self.sleeping = False
+                oled.power(True)
+            if self.dimmed:
+                self.dimmed = False
+                oled.contrast(OLED_CONTRAST)
+            return
+        if self.sleeping:
+            return  # 保持关闭直到下次按钮操作（不受 ticks 回绕影响）
+        idle_ms = clock.ticks_diff(clock.ticks_ms(), self.last_activity)
+        if self.off_ms and idle_ms >= self.off_ms and not self.running:
+            self.sleeping = True
+            oled.power(False)
+        elif self.dim_ms and not self.dimmed and idle_ms >= self.dim_ms:
+            self.dimmed = True
+            oled.contrast(OLED_DIM_CONTRAST)
 
     # -------------------------------
     # ✅ 新增：外部控制接口
@@ -178,35 +384,61 @@ class OLEDDisplay:
             profile_name = None
 
         self.current_profile = profile_name
+        self.lines = None
         # ✅ 修复：只有在主菜单时才更新索引显示
         if profile_name is None:
             self.update_display()
 
     def set_bt_status(self, connected):
-        """设置蓝牙连接状态并刷新显示"""
-        self.bt_connected = connected
-        self.update_display()
+        """设置蓝牙连接状态，变化时重绘"""
+        if connected != self.bt_connected:
+            self.bt_connected = connected
+            self.update_display()
 
     def set_running_status(self, running, countdown=0, swipe_count=0):
         """设置运行状态、倒计时、滑动次数"""
+        if running and self.running and self.lines is None and self.current_profile is not None:
+            # 运行中只有倒计时和次数变化：只重绘并发送下半屏，名称和滚动中的指示行不动
+            self.countdown = countdown
+            self.swipe_count = swipe_count
+            self.oled.fill_rect(0, _RUN_VALUES_PAGE * 8, OLED_WIDTH, OLED_HEIGHT - _RUN_VALUES_PAGE * 8, 0)
+            self.draw_run_values()
+            self.dirty |= self.values_mask
+            return
         self.running = running
+        if not running:
+            self.paused = False
         self.countdown = countdown
         self.swipe_count = swipe_count
+        self.lines = None
         # ✅ 修复：运行状态变化时立即更新显示
         self.update_display()
 
+    def set_paused(self, paused):
+        """运行中蓝牙断开/重连，变化时重绘"""
+        if paused != self.paused:
+            self.paused = paused
+            self.update_display()
+
     def next_profile(self):
         """切换到下一个场景（用于按钮1）"""
         self.current_index = (self.current_index + 1) % len(self.profiles)
+        self.lines = None
         if self.current_profile is None:  # 只有在主菜单才立即刷新
             self.update_display()
 
     def previous_profile(self):
         """切换到上一个场景"""
         self.current_index = (self.current_index - 1) % len(self.profiles)
+        self.lines = None
         if self.current_profile is None:
             self.update_display()
 
+    def show_lines(self, lines):
+        """在主区域显示若干行文字（自检结果），下次切换场景或启动时恢复"""
+        self.lines = lines
+        self.update_display()
+
     def get_current_profile_name(self):
         """获取当前选中的场景名称（全称）"""
         return self.profiles[self.current_index]
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""
+运行断点（RTC内存）
+
+场景运行期间把 场景编号、已执行次数、剩余等待时间 写入RTC内存的 RESUME 分区:
+场景开始、每次执行完、等待期间每隔 RESUME_CHECKPOINT_S 秒更新一次。
+看门狗复位或软复位后读出，主循环自动从断点继续；用户停止或场景正常结束时清除。
+RTC内存不经过闪存，频繁写入没有磨损。
+
+场景编号是场景名称的 CRC32：profiles.json 合并后场景顺序会变，按序号保存会在复位后继续错误的场景。
+"""
+import binascii
+import struct
+import rtc_store
+
+_RECORD_FORMAT = '<4sIII'  # 魔数, 场景编号(名称CRC32), 已执行次数, 剩余等待(ms)
+_RECORD_MAGIC = b'RSM2'
+_CLEARED = bytes(rtc_store.RESUME_SIZE)
+
+
+def profile_id(name):
+    """场景名称 -> 断点中保存的场景编号（场景开始时计算一次）"""
+    return binascii.crc32(name.encode())
+
+
+def save(profile_id, count, remaining_ms):
+    rtc_store.write(rtc_store.RESUME_OFFSET,
+                    struct.pack(_RECORD_FORMAT, _RECORD_MAGIC, profile_id, count, max(0, remaining_ms)))
+
+
+def clear():
+    rtc_store.write(rtc_store.RESUME_OFFSET, _CLEARED)
+
+
+def load(names):
+    """返回 (场景名称, 已执行次数, 剩余等待ms)，没有有效断点或 names 中没有该场景时返回 None"""
+    try:
+        data = rtc_store.read(rtc_store.RESUME_OFFSET, struct.calcsize(_RECORD_FORMAT))
+        magic, saved_id, count, remaining_ms = struct.unpack(_RECORD_FORMAT, data)
+    except (ValueError, OSError):
+        return None
+    if magic != _RECORD_MAGIC:
+        return None
+    for name in names:
+        if profile_id(name) == saved_id:
+            return name, count, remaining_ms
+    return None
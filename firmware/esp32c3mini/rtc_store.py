@@ -0,0 +1,52 @@
+"""
+RTC内存分区读写
+
+RTC内存在软复位和看门狗复位后保留（断电后丢失）。各模块按固定偏移使用其中一段:
+- WATCHDOG: 最近一次延迟超标记录 (watchdog.py)
+- RESUME:   运行断点，复位后自动继续 (resume.py)
+- INFLIGHT: 正在进行的操作（报告发送/屏幕刷新/滑动）及开始时间，看门狗复位后可知卡在哪里 (watchdog.py)
+
+启动时读入一份镜像，写入先改镜像再整体写回RTC内存；高频写入可直接改 buffer() 再调用 commit()，不产生新对象。
+"""
+from machine import RTC
+
+RTC_SIZE = 128  # 本项目使用的总长度（ESP32 RTC用户内存最大2KB）
+
+WATCHDOG_OFFSET = 0
+WATCHDOG_SIZE = 16
+RESUME_OFFSET = 16
+RESUME_SIZE = 16
+INFLIGHT_OFFSET = 32
+INFLIGHT_SIZE = 16
+
+_rtc = RTC()
+_mirror = bytearray(RTC_SIZE)
+
+
+def _load():
+    data = _rtc.memory()[:RTC_SIZE]
+    _mirror[:len(data)] = data
+
+
+_load()
+
+
+def buffer():
+    """RTC内存镜像（bytearray），改完后调用 commit() 写回"""
+    return _mirror
+
+
+def commit():
+    """把镜像整体写回RTC内存"""
+    _rtc.memory(_mirror)
+
+
+def read(offset, size):
+    """读取一段RTC内存"""
+    return bytes(_mirror[offset:offset + size])
+
+
+def write(offset, data):
+    """写入一段RTC内存（其余分区保持不变）"""
+    _mirror[offset:offset + len(data)] = data
+    _rtc.memory(_mirror)
@@ -0,0 +1,70 @@
+"""
+时间线调度器：多个周期任务按下一次到期时间排队执行
+
+任务保存在按到期时间排序的堆中，每次取出最早到期的任务执行，执行后按其间隔重新入堆。
+到期时间相同的任务按入队顺序依次执行。时间使用调度器自己维护的单调毫秒数，
+定期整体回拨以保持小整数（MicroPython 上不分配大整数对象）。
+"""
+import clock
+import heapq
+
+REBASE_MS = 1 << 28  # 约3.1天整体回拨一次
+
+
+class Timeline:
+    def __init__(self):
+        self.heap = []
+        self.seq = 0
+        self._now = 0
+        self._last = clock.ticks_ms()
+
+    def now(self):
+        """单调毫秒时间"""
+        t = clock.ticks_ms()
+        self._now += clock.ticks_diff(t, self._last)
+        self._last = t
+        if self._now >= REBASE_MS:
+            self._rebase()
+        return self._now
+
+    def _rebase(self):
+        # 所有到期时间同时减去同一个值，堆顺序不变
+        shift = self._now
+        for entry in self.heap:
+            entry[0] -= shift
+        self._now = 0
+
+    def schedule(self, job, delay_ms, base=None):
+        """在 base（默认当前时间）之后 delay_ms 毫秒执行 job"""
+        if base is None:
+            base = self.now()
+        self.seq += 1
+        heapq.heappush(self.heap, [base + delay_ms, self.seq, job])
+
+    def pop_due(self):
+        """取出一个已到期的任务 [到期时间, 序号, job]，没有则返回 None"""
+        now = self.now()  # 先读时间（可能触发回拨）再比较
+        if self.heap and self.heap[0][0] <= now:
+            return heapq.heappop(self.heap)
+        return None
+
+    def reschedule(self, entry, interval_ms):
+        """刚取出的任务重新入队：按原到期时间保持节奏，落后超过一个间隔时从当前时间重新计时"""
+        deadline = entry[0]
+        now = self._now  # 与 pop_due 使用同一时间基准
+        base = deadline if now - deadline < interval_ms else now
+        self.seq += 1
+        entry[0] = base + interval_ms
+        entry[1] = self.seq
+        heapq.heappush(self.heap, entry)
+
+    def next_delay(self):
+        """距最早任务到期的毫秒数（已到期为0，没有任务为 None）"""
+        now = self.now()
+        if not self.heap:
+            return None
+        return max(0, self.heap[0][0] - now)
+
+    def clear(self):
+        self.heap = []
+        self.seq = 0
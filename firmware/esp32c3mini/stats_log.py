@@ -0,0 +1,155 @@
+"""
+运行统计日志（追加写入闪存）
+
+计数先累加在内存中，每隔 flush_s 秒（且有变化时）在空闲时追加一条固定长度记录，
+滑动过程中不写文件，写入次数少，闪存磨损和写入卡顿可以忽略。
+文件达到 max_records 条后改名为 <文件名>.old（覆盖上一份）并重新开始，总大小有上限。
+
+记录格式 (20字节, 小端):
+    seq        uint32  记录序号（跨文件递增）
+    boot       uint16  启动序号（每次复位加1）
+    uptime_s   uint32  本次启动后的秒数
+    run_s      uint16  本批次内场景运行的秒数
+    swipes     uint16  本批次滑动次数
+    taps       uint16  本批次点击次数
+    failed     uint16  本批次发送失败的报告数
+    disconnects uint16 本批次蓝牙断开次数
+
+设备上 `import stats_log; stats_log.summarize()` 打印汇总；
+电脑上用 tools/stats_summary.py 汇总从设备取回的文件。
+"""
+import os
+import struct
+import clock
+
+RECORD_FORMAT = '<IHIHHHHH'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+FIELDS = ("seq", "boot", "uptime_s", "run_s", "swipes", "taps", "failed", "disconnects")
+
+
+class StatsLog:
+    def __init__(self, path="stats.log", flush_s=600, max_records=2048):
+        self.path = path
+        self.old_path = path + ".old"
+        self.flush_ms = flush_s * 1000
+        self.max_records = max_records
+
+        # 本批次计数（中断里只做整数加1）
+        self.swipes = 0
+        self.taps = 0
+        self.failed = 0
+        self.disconnects = 0
+        self.run_ms = 0
+        self._run_start = None
+        self.total_swipes = 0  # 启动以来已写入记录的滑动次数（遥测使用）
+
+        last = self._last_record()
+        self.seq = last[0] + 1 if last else 0
+        self.boot = (last[1] + 1) & 0xFFFF if last else 0
+        # 运行时间在每次写入时累加（ticks 约6.2天后回绕，不能直接与启动时刻相减）
+        self.uptime_s = 0
+        self._uptime_ms = 0
+        self._last_flush = clock.ticks_ms()
+
+    def _last_record(self):
+        for path in (self.path, self.old_path):
+            try:
+                with open(path, "rb") as f:
+                    size = f.seek(0, 2)
+                    if size >= RECORD_SIZE:
+                        f.seek(size - size % RECORD_SIZE - RECORD_SIZE)
+                        return struct.unpack(RECORD_FORMAT, f.read(RECORD_SIZE))
+            except OSError:
+                pass
+        return None
+
+    def run_started(self):
+        self._run_start = clock.ticks_ms()
+
+    def run_stopped(self):
+        self._accrue_run()
+        self._run_start = None
+
+    def _accrue_run(self):
+        if self._run_start is not None:
+            now = clock.ticks_ms()
+            self.run_ms += clock.ticks_diff(now, self._run_start)
+            self._run_start = now
+
+    def maybe_flush(self):
+        """空闲时调用：距上次写入超过 flush_s 秒才写"""
+        if clock.ticks_diff(clock.ticks_ms(), self._last_flush) >= self.flush_ms:
+            self.flush()
+
+    def flush(self):
+        """写入本批次记录（没有任何变化时不写）"""
+        self._accrue_run()
+        now = clock.ticks_ms()
+        self._uptime_ms += clock.ticks_diff(now, self._last_flush)
+        self.uptime_s += self._uptime_ms // 1000
+        self._uptime_ms %= 1000
+        self._last_flush = now
+        if not (self.swipes or self.taps or self.failed or self.disconnects or self.run_ms >= 1000):
+            return False
+        run_s = min(self.run_ms // 1000, 0xFFFF)
+        record = struct.pack(RECORD_FORMAT, self.seq, self.boot,
+                             self.uptime_s, run_s,
+                             min(self.swipes, 0xFFFF), min(self.taps, 0xFFFF),
+                             min(self.failed, 0xFFFF), min(self.disconnects, 0xFFFF))
+        try:
+            self._rotate()
+            with open(self.path, "ab") as f:
+                f.write(record)
+        except OSError as e:
+            print(f"统计日志写入失败: {e}")
+            return False
+        self.seq += 1
+        self.total_swipes += self.swipes
+        self.swipes = self.taps = self.failed = self.disconnects = 0
+        self.run_ms -= run_s * 1000
+        return True
+
+    def _rotate(self):
+        try:
+            size = os.stat(self.path)[6]
+        except OSError:
+            return
+        if size >= self.max_records * RECORD_SIZE:
+            try:
+                os.remove(self.old_path)
+            except OSError:
+                pass
+            os.rename(self.path, self.old_path)
+
+
+def read_records(path):
+    """逐条读取记录，返回字段字典（不完整的末尾记录忽略）"""
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(RECORD_SIZE)
+            if len(data) < RECORD_SIZE:
+                break
+            yield dict(zip(FIELDS, struct.unpack(RECORD_FORMAT, data)))
+
+
+def summarize(paths=("stats.log.old", "stats.log")):
+    """汇总统计文件并打印，返回汇总字典"""
+    total = {"records": 0, "boots": 0, "run_s": 0, "swipes": 0, "taps": 0, "failed": 0, "disconnects": 0}
+    boots = set()
+    for path in paths:
+        try:
+            for rec in read_records(path):
+                total["records"] += 1
+                boots.add(rec["boot"])
+                for key in ("run_s", "swipes", "taps", "failed", "disconnects"):
+                    total[key] += rec[key]
+        except OSError:
+            continue
+    total["boots"] = len(boots)
+
+    hours = total["run_s"] / 3600
+    print(f"记录 {total['records']} 条, 启动 {total['boots']} 次, 运行 {hours:.1f} 小时")
+    print(f"滑动 {total['swipes']} 次, 点击 {total['taps']} 次, 发送失败 {total['failed']} 次, 断开 {total['disconnects']} 次")
+    if hours > 0:
+        print(f"平均每小时: 滑动 {total['swipes'] / hours:.1f} 次, 点击 {total['taps'] / hours:.1f} 次")
+    return total
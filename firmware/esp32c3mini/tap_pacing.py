@@ -0,0 +1,64 @@
+"""
+连点节奏：按连接间隔安排按下/抬起报告
+
+BLE通知只在连接事件中发出，同一个连接事件里的按下和抬起会被手机合并处理。
+因此按下保持和两次点击之间的间隔都至少为一个连接间隔；连接间隔取协议栈
+报告的实际值（_IRQ_CONNECTION_UPDATE），而不是固定的休眠时间。
+"""
+import clock
+
+CONN_INTERVAL_UNIT_US = 1250  # 连接间隔单位 1.25ms
+
+
+def report_gap_ms(conn_interval_us):
+    """两个状态变化报告之间的最小间隔（毫秒，向上取整）"""
+    return (conn_interval_us + 999) // 1000
+
+
+def tap_timing(rate, conn_interval_us):
+    """按目标频率（次/秒）计算 (周期, 按下保持) 毫秒，受连接间隔限制"""
+    gap = report_gap_ms(conn_interval_us)
+    period = 1000 // rate if rate > 0 else 0
+    if period < 2 * gap:
+        period = 2 * gap
+    hold = period // 2
+    if hold < gap:
+        hold = gap
+    return period, hold
+
+
+def run_burst(send_tip, pause, rate, count, conn_interval_us):
+    """
+    连续点击 count 次，返回 (完成次数, 耗时ms)
+    send_tip(tip) 发送按下(1)/抬起(0)报告，失败返回 False；
+    pause(ms) 等待，返回 True 表示被停止
+    """
+    period, hold = tap_timing(rate, conn_interval_us)
+    start = clock.ticks_ms()
+    due = start
+    done = 0
+    while done < count:
+        if not send_tip(1):
+            break
+        stopped = pause(hold)
+        send_tip(0)
+        if stopped:
+            break
+        done += 1
+        # 按绝对时间表安排下一次；落后超过一个周期时不追赶，避免连续补点
+        due = clock.ticks_add(due, period)
+        wait = clock.ticks_diff(due, clock.ticks_ms())
+        if wait > 0:
+            if pause(wait):
+                break
+        elif wait < -period:
+            due = clock.ticks_ms()
+    return done, clock.ticks_diff(clock.ticks_ms(), start)
+
+
+def rate_text(done, elapsed_ms):
+    """实际点击频率文本（次/秒，两位小数）"""
+    if elapsed_ms <= 0:
+        return "0.00"
+    rate = done * 100000 // elapsed_ms
+    return f"{rate // 100}.{rate % 100:02d}"
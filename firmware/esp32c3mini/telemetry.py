@@ -0,0 +1,90 @@
+"""
+运行遥测（自定义GATT服务，与HID服务并列）
+
+特征值可读、可订阅通知。每隔 TELEMETRY_INTERVAL_S 秒在空闲时打包一次计数写入特征值，
+已订阅的手机/电脑收到通知（gatts_write 的 send_update，未订阅时不占用空口）；滑动过程中不更新。
+打包进预分配的缓冲区，不产生新对象。
+
+特征值格式 (20字节, 小端；正好是默认 MTU 下一次通知的最大长度):
+    reports_sent   uint32  启动以来发送成功的HID报告数
+    reports_failed uint16  启动以来发送失败的报告数（到65535封顶）
+    notify_avg_us  uint16  本周期内单个报告发送的平均耗时(us)
+    notify_max_us  uint16  本周期内单个报告发送的最大耗时(us)
+    swipes         uint16  启动以来的滑动次数（按65536回绕）
+    flushes        uint16  启动以来OLED刷新的页数（按65536回绕）
+    heap_free      uint16  空闲堆，以GC块(16字节)为单位
+    gc_max_us      uint16  本周期内主循环 gc.collect() 的最大耗时(us)
+    conn_interval  uint16  当前连接间隔（1.25ms 为单位，与协议栈相同）
+耗时字段超过65535时封顶；"本周期"的字段在每次更新后清零。
+
+电脑端用 decode() 解析读到的特征值。
+"""
+import gc
+import struct
+import bluetooth
+import clock
+from tap_pacing import CONN_INTERVAL_UNIT_US
+
+SERVICE_UUID = bluetooth.UUID("5f3a0001-8c1e-4d6b-9a57-2e6c1b7d4f10")
+CHAR_UUID = bluetooth.UUID("5f3a0002-8c1e-4d6b-9a57-2e6c1b7d4f10")
+SERVICE = (SERVICE_UUID, ((CHAR_UUID, bluetooth.FLAG_READ | bluetooth.FLAG_NOTIFY),))
+
+FORMAT = '<IHHHHHHHH'
+SIZE = struct.calcsize(FORMAT)
+FIELDS = ("reports_sent", "reports_failed", "notify_avg_us", "notify_max_us", "swipes",
+          "flushes", "heap_free", "gc_max_us", "conn_interval")
+GC_BLOCK_BYTES = 16
+_U16 = 0xFFFF
+
+
+class Telemetry:
+    def __init__(self, ble_hid, stats=None, display=None, interval_s=5):
+        self.ble_hid = ble_hid
+        self.stats = stats
+        self.display = display
+        self.interval_ms = interval_s * 1000  # 0 为不更新
+        self.buf = bytearray(SIZE)
+        self.gc_max_us = 0
+        self._sent_base = 0
+        self._last = clock.ticks_ms()
+
+    def collect(self):
+        """gc.collect() 并记录耗时（主循环调用）"""
+        start = clock.ticks_us()
+        gc.collect()
+        us = clock.ticks_diff(clock.ticks_us(), start)
+        if us > self.gc_max_us:
+            self.gc_max_us = us
+
+    def maybe_update(self):
+        """空闲时调用：距上次更新超过 interval_s 秒才更新"""
+        if self.interval_ms and clock.ticks_diff(clock.ticks_ms(), self._last) >= self.interval_ms:
+            self.update()
+
+    def update(self):
+        """打包当前计数写入特征值，并开始新的统计周期"""
+        self._last = clock.ticks_ms()
+        ble = self.ble_hid
+        count = ble.reports_sent - self._sent_base
+        avg_us = ble.notify_us_sum // count if count else 0
+        swipes = 0
+        if self.stats is not None:
+            swipes = self.stats.total_swipes + self.stats.swipes
+        flushes = self.display.page_flushes if self.display is not None else 0
+        struct.pack_into(FORMAT, self.buf, 0, ble.reports_sent,
+                         min(ble.reports_failed, _U16), min(avg_us, _U16), min(ble.notify_us_max, _U16),
+                         swipes & _U16, flushes & _U16, min(gc.mem_free() // GC_BLOCK_BYTES, _U16),
+                         min(self.gc_max_us, _U16), ble.conn_interval_us // CONN_INTERVAL_UNIT_US)
+        self._sent_base = ble.reports_sent
+        ble.notify_us_sum = 0
+        ble.notify_us_max = 0
+        self.gc_max_us = 0
+        ble.update_telemetry(self.buf)
+
+
+def decode(data):
+    """解析特征值，返回字段字典（heap_free 换算为字节，conn_interval 换算为微秒）"""
+    values = dict(zip(FIELDS, struct.unpack(FORMAT, bytes(data[:SIZE]))))
+    values["heap_free"] *= GC_BLOCK_BYTES
+    values["conn_interval"] *= CONN_INTERVAL_UNIT_US
+    return values
@@ -0,0 +1,121 @@
+"""
+触摸轨迹文件格式（录制/回放）
+
+文件结构（小端）:
+- 文件头 10 字节: 魔数 b'TTRC', 版本(1B), 保留(1B), 录制屏幕宽(2B), 录制屏幕高(2B)
+- 记录 6 字节, 依次排列:
+    word0 (uint16): bit15 = 触摸状态(1按下/0抬起), bit0-14 = 距上一条记录的时间差(毫秒)
+    dx    (int16):  X坐标增量(像素)
+    dy    (int16):  Y坐标增量(像素)
+
+时间差超过 32767ms 时拆分为多条坐标增量为0的记录。
+记录定长，回放时可按块读入复用缓冲区，不需要把整个文件载入内存。
+本模块只依赖 struct，主机端转换工具也直接使用。
+"""
+import struct
+
+TRACE_MAGIC = b'TTRC'
+TRACE_VERSION = 1
+HEADER_FORMAT = '<4sBBHH'
+HEADER_SIZE = 10
+RECORD_SIZE = 6
+MAX_DT = 0x7FFF
+CONTACT_BIT = 0x8000
+
+
+class TraceError(Exception):
+    pass
+
+
+class TraceWriter:
+    """写入轨迹文件：传入绝对坐标和时间，自动做增量编码"""
+    def __init__(self, stream, width, height):
+        self.stream = stream
+        self.last_t = None
+        self.last_x = 0
+        self.last_y = 0
+        self.last_contact = 0
+        self.count = 0
+        self._record = bytearray(RECORD_SIZE)
+        stream.write(struct.pack(HEADER_FORMAT, TRACE_MAGIC, TRACE_VERSION, 0, width, height))
+
+    def _write(self, dt, contact, dx, dy):
+        word0 = dt | (CONTACT_BIT if contact else 0)
+        struct.pack_into('<Hhh', self._record, 0, word0, dx, dy)
+        self.stream.write(self._record)
+        self.count += 1
+
+    def add(self, t_ms, x, y, contact):
+        """添加一个采样点（t_ms为毫秒时间戳，必须单调不减）"""
+        if self.last_t is None:
+            self.last_t = t_ms
+        dt = t_ms - self.last_t
+        if dt < 0:
+            raise TraceError("时间戳必须单调递增")
+        # 超长间隔拆分为保持上一状态的空记录
+        while dt > MAX_DT:
+            self._write(MAX_DT, self.last_contact, 0, 0)
+            dt -= MAX_DT
+        dx = x - self.last_x
+        dy = y - self.last_y
+        if not (-32768 <= dx <= 32767 and -32768 <= dy <= 32767):
+            raise TraceError("坐标增量超出16位范围")
+        self._write(dt, contact, dx, dy)
+        self.last_t = t_ms
+        self.last_x = x
+        self.last_y = y
+        self.last_contact = contact
+
+
+class TraceReader:
+    """分块读取轨迹文件
+
+    每次 fill() 把最多 chunk_records 条记录读入复用的缓冲区，
+    next() 逐条解码并更新 dt/contact/x/y 属性（不产生新对象）。
+    """
+    def __init__(self, stream, chunk_records=32):
+        self.stream = stream
+        header = stream.read(HEADER_SIZE)
+        if header is None or len(header) < HEADER_SIZE:
+            raise TraceError("轨迹文件头不完整")
+        magic, version, _, width, height = struct.unpack(HEADER_FORMAT, header)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise TraceError("不是有效的轨迹文件")
+        self.width = width
+        self.height = height
+
+        self.buf = bytearray(RECORD_SIZE * chunk_records)
+        self._pos = 0
+        self._end = 0
+
+        # 当前记录（绝对坐标）
+        self.dt = 0
+        self.contact = 0
+        self.x = 0
+        self.y = 0
+
+    def _fill(self):
+        n = self.stream.readinto(self.buf)
+        self._pos = 0
+        self._end = (n or 0) - (n or 0) % RECORD_SIZE
+        return self._end > 0
+
+    def next(self):
+        """读取下一条记录，文件结束时返回False"""
+        if self._pos >= self._end and not self._fill():
+            return False
+        buf = self.buf
+        o = self._pos
+        word0 = buf[o] | (buf[o + 1] << 8)
+        dx = buf[o + 2] | (buf[o + 3] << 8)
+        dy = buf[o + 4] | (buf[o + 5] << 8)
+        if dx & 0x8000:
+            dx -= 0x10000
+        if dy & 0x8000:
+            dy -= 0x10000
+        self.dt = word0 & MAX_DT
+        self.contact = 1 if word0 & CONTACT_BIT else 0
+        self.x += dx
+        self.y += dy
+        self._pos = o + RECORD_SIZE
+        return True
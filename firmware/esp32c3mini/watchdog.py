@@ -0,0 +1,139 @@
+"""
+延迟预算监控与硬件看门狗
+
+- 记录各操作（报告发送、屏幕刷新、整次滑动）的耗时，超过预算时计数，
+  并把最近一次超标记录写入RTC内存，复位后仍可读出
+- 操作开始前在RTC内存中标记"进行中"（操作位 + 开始时间），完成后清除；
+  操作卡死导致看门狗复位时，启动后读出标记即可知道卡在哪个操作
+- 只在主循环和各等待循环推进时调用 kick() 喂硬件看门狗；
+  gatts_notify 或 I2C 传输卡死时不会再喂狗，看门狗超时后自动复位
+- 硬件看门狗启动后无法关闭，Ctrl-C 打断程序后仍在计时：REPL 中的代码（tools/fleet.py 的文件传输等）
+  需调用模块级 kick() 喂狗，否则长时间操作会被看门狗复位打断
+"""
+import struct
+import clock
+from array import array
+import machine
+import rtc_store
+
+OP_REPORT = 0   # 单个HID报告发送
+OP_FLUSH = 1    # 一次OLED刷新
+OP_SWIPE = 2    # 整次滑动超出设定时长的部分
+OP_NAMES = ("report", "flush", "swipe")
+
+_RECORD_FORMAT = '<4sBxHII'  # 魔数, 操作, 预算(ms), 耗时(ms), 累计超标次数
+_RECORD_MAGIC = b'LWD1'
+
+# 进行中标记: 魔数(2), 进行中操作位(1), 填充(1), 各操作开始时间 ticks_ms (uint32 x 3)
+_INFLIGHT_FORMAT = '<2sBx3I'
+_INFLIGHT_MAGIC = b'IF'
+_INFLIGHT_MASK = rtc_store.INFLIGHT_OFFSET + 2
+_INFLIGHT_TICKS = rtc_store.INFLIGHT_OFFSET + 4
+
+active = None  # 已启动硬件看门狗的 LatencyWatchdog（程序被打断后仍可经 kick() 喂狗）
+
+
+def kick():
+    """喂硬件看门狗（供 REPL 中的代码调用；看门狗未启动时什么也不做）"""
+    if active is not None:
+        active.kick()
+
+
+class LatencyWatchdog:
+    def __init__(self, budgets_ms, wdt_timeout_ms=0):
+        n = len(OP_NAMES)
+        self.budgets_us = array('I', [budgets_ms.get(name, 0) * 1000 for name in OP_NAMES])
+        self.counts = array('I', [0] * n)
+        self.violations = array('I', [0] * n)
+        self.max_us = array('I', [0] * n)
+        self.total_violations = 0
+
+        # 上次运行（复位前）留下的超标记录
+        self.previous = self.load_last_violation()
+        self.hung = self.load_inflight()
+        self.reset_cause = machine.reset_cause()
+        self.rtc = rtc_store.buffer()
+        rtc_store.write(rtc_store.INFLIGHT_OFFSET, struct.pack(_INFLIGHT_FORMAT, _INFLIGHT_MAGIC, 0, 0, 0, 0))
+
+        # 硬件看门狗一旦启动无法关闭，超时时间必须大于最长的阻塞操作
+        self.wdt = machine.WDT(timeout=wdt_timeout_ms) if wdt_timeout_ms > 0 else None
+        if self.wdt is not None:
+            global active
+            active = self
+
+    def kick(self):
+        """主循环/等待循环每推进一次调用一次：喂硬件看门狗"""
+        if self.wdt is not None:
+            self.wdt.feed()
+
+    def begin(self, op):
+        """操作开始：在RTC内存中标记进行中并记下开始时间（不产生新对象）"""
+        rtc = self.rtc
+        rtc[_INFLIGHT_MASK] |= 1 << op
+        struct.pack_into('<I', rtc, _INFLIGHT_TICKS + 4 * op, clock.ticks_ms())
+        rtc_store.commit()
+
+    def end(self, op):
+        """操作完成（或出错返回）：清除进行中标记"""
+        self.rtc[_INFLIGHT_MASK] &= ~(1 << op)
+        rtc_store.commit()
+
+    def track(self, op, elapsed_us):
+        """记录一次操作耗时（微秒），超过预算返回True"""
+        self.counts[op] += 1
+        if elapsed_us > self.max_us[op]:
+            self.max_us[op] = elapsed_us
+        budget = self.budgets_us[op]
+        if budget and elapsed_us > budget:
+            self.violations[op] += 1
+            self.total_violations += 1
+            self.save_violation(op, elapsed_us)
+            return True
+        return False
+
+    def save_violation(self, op, elapsed_us):
+        record = struct.pack(_RECORD_FORMAT, _RECORD_MAGIC, op, self.budgets_us[op] // 1000,
+                             elapsed_us // 1000, self.total_violations)
+        rtc_store.write(rtc_store.WATCHDOG_OFFSET, record)
+
+    def load_last_violation(self):
+        """读取RTC内存中的最近一次超标记录，返回 (操作名, 预算ms, 耗时ms, 累计次数) 或 None"""
+        try:
+            data = rtc_store.read(rtc_store.WATCHDOG_OFFSET, struct.calcsize(_RECORD_FORMAT))
+            magic, op, budget_ms, elapsed_ms, total = struct.unpack(_RECORD_FORMAT, data)
+        except (ValueError, OSError):
+            return None
+        if magic != _RECORD_MAGIC or op >= len(OP_NAMES):
+            return None
+        return OP_NAMES[op], budget_ms, elapsed_ms, total
+
+    def load_inflight(self):
+        """读取复位前仍在进行的操作，返回 [(操作名, 开始时间ticks_ms), ...]（内层操作在前）或 None"""
+        try:
+            data = rtc_store.read(rtc_store.INFLIGHT_OFFSET, struct.calcsize(_INFLIGHT_FORMAT))
+            values = struct.unpack(_INFLIGHT_FORMAT, data)
+        except (ValueError, OSError):
+            return None
+        magic, mask = values[0], values[1]
+        if magic != _INFLIGHT_MAGIC or not mask:
+            return None
+        return [(name, values[2 + op]) for op, name in enumerate(OP_NAMES) if mask & (1 << op)]
+
+    def report(self):
+        """打印各操作的统计"""
+        wdt_reset = self.reset_cause == machine.WDT_RESET
+        if self.hung is not None and wdt_reset:
+            name, start_ms = self.hung[0]
+            outer = "".join(f", {n} 进行中" for n, _ in self.hung[1:])
+            print(f"看门狗复位: hung in {name} (开始于 ticks_ms {start_ms}{outer})")
+        if self.previous is not None:
+            name, budget_ms, elapsed_ms, total = self.previous
+            print(f"上次超标: {name} {elapsed_ms}ms > {budget_ms}ms (累计{total}次){' [看门狗复位]' if wdt_reset else ''}")
+        for op, name in enumerate(OP_NAMES):
+            print(f"{name}: 次数 {self.counts[op]} 最大 {self.max_us[op] // 1000}ms "
+                  f"预算 {self.budgets_us[op] // 1000}ms 超标 {self.violations[op]}")
+
+
+def elapsed_us(start_us):
+    """从 start_us（clock.ticks_us()）到现在的微秒数"""
+    return clock.ticks_diff(clock.ticks_us(), start_us)
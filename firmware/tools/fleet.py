@@ -0,0 +1,414 @@
+"""
+多开发板批量管理（在电脑上运行，asyncio 并发操作所有串口，仅依赖标准库）
+
+每块开发板通过各自的USB串口连接。工具先发 Ctrl-C 打断正在运行的程序（main.py 或 c3_tools.py），
+进入 MicroPython 原始 REPL（Ctrl-A）执行命令、读写文件，完成后软复位（Ctrl-D）恢复运行；
+被打断的场景按RTC断点自动继续（config.AUTO_RESUME）。所有开发板同时操作，总耗时约等于最慢的一块。
+固件的硬件看门狗启动后无法关闭，打断后仍在计时：每段代码执行前先喂狗（watchdog.kick()），
+读文件时每传一块再喂一次，传输大文件也不会被看门狗复位。
+
+命令:
+    list                     列出开发板（芯片ID、空闲堆、是否有下发的场景文件）
+    push-profiles FILE       下发场景文件（JSON，格式同 config.PRESET_PROFILES），复位后生效
+    stats                    取回统计日志，按开发板汇总运行时长和每小时滑动次数
+    traces                   取回全部轨迹文件(.trc)
+    exec CODE                在所有开发板上执行一段代码并打印输出
+    reset                    软复位
+
+端口默认扫描 /dev/ttyACM* 和 /dev/ttyUSB*，也可用 --port 指定（可重复）。
+取回的文件保存在 --out 目录下以芯片ID命名的子目录中。
+
+用法示例:
+    python fleet.py list
+    python fleet.py push-profiles profiles.json
+    python fleet.py --out fleet_data stats
+    python fleet.py --port /dev/ttyACM0 --port /dev/ttyACM3 exec "import gc; print(gc.mem_free())"
+    python fleet.py --emulate 8 stats      # 对 fleet_emulator.py 模拟的8块板运行
+    python fleet.py --emulate 2 --emulate-hours 682 stats   # 统计日志写满（2×40KB），传输超过看门狗超时
+"""
+import argparse
+import asyncio
+import binascii
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "esp32c3mini"))
+
+from serial_port import open_serial, read_available, write_all  # noqa: E402
+from stats_log import read_records  # noqa: E402
+from touch_trace import HEADER_SIZE, RECORD_SIZE  # noqa: E402
+
+PORT_PATTERNS = ("/dev/ttyACM*", "/dev/ttyUSB*")
+PROFILES_FILE = "profiles.json"  # 与 config.PROFILES_FILE 相同
+STATS_FILES = ("stats.log.old", "stats.log")
+VALID_DIRECTIONS = {"up", "down", "left", "right"}
+
+RAW_PROMPT = b"raw REPL; CTRL-B to exit\r\n>"
+WRITE_CHUNK = 256       # 原始 REPL 输入缓冲较小，分块写入
+WRITE_GAP_S = 0.01
+FILE_CHUNK = 256        # 读写文件时每行的字节数（十六进制传输）
+TIMEOUT_S = 10
+
+# 每段代码之前执行：取固件已启动的看门狗（watchdog.py 的模块级 kick()）并喂一次；
+# 打断的不是主固件（没有导入 watchdog）时 _kick 什么也不做
+_FEED_WDT = """import sys
+_wd = sys.modules.get('watchdog')
+_kick = _wd.kick if _wd is not None else (lambda: None)
+_kick()
+"""
+_READ_FILE = """import binascii
+try:
+    f = open({path!r}, 'rb')
+except OSError:
+    print('-')
+else:
+    while True:
+        b = f.read({chunk})
+        if not b:
+            break
+        print(binascii.hexlify(b).decode())
+        _kick()
+    f.close()
+"""
+_BOARD_INFO = """import binascii, gc, os, machine
+gc.collect()
+print(binascii.hexlify(machine.unique_id()).decode())
+print(gc.mem_free())
+print({profiles!r} in os.listdir())
+"""
+_LIST_TRACES = """import os
+for name in os.listdir():
+    if name.endswith('.trc'):
+        print(name)
+"""
+
+
+class FleetError(Exception):
+    pass
+
+
+class Board:
+    """一块开发板的串口连接和原始 REPL 操作"""
+    def __init__(self, port, baud):
+        self.port = port
+        self.baud = baud
+        self.name = port[5:] if port.startswith("/dev/") else port
+        self.board_id = None
+        self.fd = None
+        self.buf = bytearray()
+        self.data_event = asyncio.Event()
+
+    def open(self):
+        self.fd = open_serial(self.port, self.baud)
+        asyncio.get_running_loop().add_reader(self.fd, self._on_readable)
+
+    def close(self):
+        if self.fd is not None:
+            asyncio.get_running_loop().remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = None
+
+    def _on_readable(self):
+        try:
+            data = read_available(self.fd)
+        except OSError:
+            data = b""
+        if data:
+            self.buf.extend(data)
+            self.data_event.set()
+
+    async def write(self, data):
+        for i in range(0, len(data), WRITE_CHUNK):
+            write_all(self.fd, data[i:i + WRITE_CHUNK])
+            await asyncio.sleep(WRITE_GAP_S)
+
+    async def read_until(self, marker, timeout=TIMEOUT_S):
+        """返回 marker 之前的数据（marker 本身丢弃）"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            idx = self.buf.find(marker)
+            if idx >= 0:
+                data = bytes(self.buf[:idx])
+                del self.buf[:idx + len(marker)]
+                return data
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise FleetError(f"等待 {marker!r} 超时")
+            self.data_event.clear()
+            try:
+                await asyncio.wait_for(self.data_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def enter_raw(self):
+        """打断正在运行的程序并进入原始 REPL"""
+        await self.write(b"\r\x03\x03")
+        await asyncio.sleep(0.2)
+        self.buf.clear()
+        await self.write(b"\r\x01")
+        await self.read_until(RAW_PROMPT)
+
+    async def exec(self, code, timeout=TIMEOUT_S):
+        """执行代码（先喂看门狗），返回标准输出；设备上抛出异常时引发 FleetError"""
+        await self.write(_FEED_WDT.encode() + code.encode() + b"\x04")
+        await self.read_until(b"OK", timeout)
+        out = await self.read_until(b"\x04", timeout)
+        err = await self.read_until(b"\x04", timeout)
+        await self.read_until(b">", timeout)
+        if err:
+            raise FleetError(err.decode(errors="replace").strip().splitlines()[-1])
+        return out.decode(errors="replace").replace("\r\n", "\n")
+
+    async def restart(self):
+        """退出原始 REPL 并软复位，重新运行 main.py"""
+        await self.write(b"\x02")
+        await self.read_until(b">>> ")
+        await self.write(b"\x04")
+        await self.read_until(b"soft reboot")
+
+    async def read_file(self, path):
+        """读取设备上的文件，不存在时返回 None"""
+        out = await self.exec(_READ_FILE.format(path=path, chunk=FILE_CHUNK), timeout=TIMEOUT_S * 6)
+        lines = out.split()
+        if lines == ["-"]:
+            return None
+        return b"".join(binascii.unhexlify(line) for line in lines)
+
+    async def write_file(self, path, data):
+        await self.exec(f"import binascii\nf = open({path!r}, 'wb')")
+        try:
+            for i in range(0, len(data), FILE_CHUNK):
+                await self.exec(f"f.write(binascii.unhexlify({binascii.hexlify(data[i:i + FILE_CHUNK]).decode()!r}))")
+        finally:
+            await self.exec("f.close()")
+
+    async def identify(self):
+        out = (await self.exec(_BOARD_INFO.format(profiles=PROFILES_FILE))).split()
+        self.board_id = out[0]
+        return {"id": out[0], "heap_free": int(out[1]), "profiles": out[2] == "True"}
+
+
+# ---- 各命令在单块开发板上的操作，返回结果字典 ----
+
+async def do_list(board, args):
+    return await board.identify()
+
+
+async def do_push_profiles(board, args):
+    await board.identify()
+    await board.write_file(PROFILES_FILE, args.payload)
+    return {"bytes": len(args.payload)}
+
+
+async def do_stats(board, args):
+    await board.identify()
+    board_dir = os.path.join(args.out, board.board_id)
+    os.makedirs(board_dir, exist_ok=True)
+    paths = []
+    for name in STATS_FILES:
+        data = await board.read_file(name)
+        if data is None:
+            continue
+        path = os.path.join(board_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return summarize_stats(paths)
+
+
+async def do_traces(board, args):
+    await board.identify()
+    board_dir = os.path.join(args.out, board.board_id)
+    os.makedirs(board_dir, exist_ok=True)
+    traces = {}
+    for name in (await board.exec(_LIST_TRACES)).split():
+        data = await board.read_file(name)
+        if data is None:
+            continue
+        with open(os.path.join(board_dir, name), "wb") as f:
+            f.write(data)
+        traces[name] = max(0, len(data) - HEADER_SIZE) // RECORD_SIZE
+    return {"traces": traces}
+
+
+async def do_exec(board, args):
+    return {"output": await board.exec(args.code, timeout=args.timeout)}
+
+
+async def do_reset(board, args):
+    return {}
+
+
+COMMANDS = {
+    "list": do_list,
+    "push-profiles": do_push_profiles,
+    "stats": do_stats,
+    "traces": do_traces,
+    "exec": do_exec,
+    "reset": do_reset,
+}
+
+
+def summarize_stats(paths):
+    """汇总一块板的统计文件：各次启动的运行时间取最大值相加"""
+    total = {"records": 0, "run_s": 0, "swipes": 0, "taps": 0, "failed": 0, "disconnects": 0}
+    uptime = {}
+    for path in paths:
+        for rec in read_records(path):
+            total["records"] += 1
+            uptime[rec["boot"]] = max(uptime.get(rec["boot"], 0), rec["uptime_s"])
+            for key in ("run_s", "swipes", "taps", "failed", "disconnects"):
+                total[key] += rec[key]
+    total["boots"] = len(uptime)
+    total["uptime_s"] = sum(uptime.values())
+    return total
+
+
+async def run_board(port, args):
+    """在一块开发板上执行命令，返回 (Board, 结果或异常)"""
+    board = Board(port, args.baud)
+    try:
+        board.open()
+        await board.enter_raw()
+        result = await COMMANDS[args.command](board, args)
+        if not args.no_restart:
+            await board.restart()
+        return board, result
+    except (FleetError, OSError, ValueError, IndexError) as e:
+        return board, e
+    finally:
+        board.close()
+
+
+def print_results(args, results):
+    failed = 0
+    for board, result in results:
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{board.name:<10} 失败: {result}")
+    ok = [(board, result) for board, result in results if not isinstance(result, Exception)]
+
+    if args.command == "list":
+        print(f"{'端口':<10} {'芯片ID':<14} {'空闲堆':>8} 场景文件")
+        for board, r in ok:
+            print(f"{board.name:<10} {r['id']:<14} {r['heap_free']:>8} {'有' if r['profiles'] else '-'}")
+    elif args.command == "push-profiles":
+        for board, r in ok:
+            print(f"{board.name:<10} {board.board_id:<14} 已写入 {r['bytes']} 字节")
+    elif args.command == "stats":
+        print(f"{'端口':<10} {'芯片ID':<14} {'开机(h)':>8} {'运行(h)':>8} {'滑动':>8} {'滑动/h':>8} "
+              f"{'点击':>6} {'失败':>6} {'断开':>6} {'启动':>4}")
+        fleet = {"uptime_s": 0, "run_s": 0, "swipes": 0, "taps": 0, "failed": 0, "disconnects": 0}
+        for board, r in ok:
+            run_h = r["run_s"] / 3600
+            rate = r["swipes"] / run_h if run_h else 0
+            print(f"{board.name:<10} {board.board_id:<14} {r['uptime_s'] / 3600:>8.1f} {run_h:>8.1f} "
+                  f"{r['swipes']:>8} {rate:>8.1f} {r['taps']:>6} {r['failed']:>6} {r['disconnects']:>6} {r['boots']:>4}")
+            for key in fleet:
+                fleet[key] += r[key]
+        if ok:
+            run_h = fleet["run_s"] / 3600
+            rate = fleet["swipes"] / run_h if run_h else 0
+            print(f"{'合计':<10} {len(ok):<14} {fleet['uptime_s'] / 3600:>8.1f} {run_h:>8.1f} "
+                  f"{fleet['swipes']:>8} {rate:>8.1f} {fleet['taps']:>6} {fleet['failed']:>6} {fleet['disconnects']:>6}")
+            print(f"文件已保存到 {args.out}")
+    elif args.command == "traces":
+        for board, r in ok:
+            names = ", ".join(f"{name}({count}条)" for name, count in sorted(r["traces"].items()))
+            print(f"{board.name:<10} {board.board_id:<14} {names or '无轨迹文件'}")
+    elif args.command == "exec":
+        for board, r in ok:
+            for line in r["output"].splitlines() or [""]:
+                print(f"{board.name:<10} {line}")
+    elif args.command == "reset":
+        for board, r in ok:
+            print(f"{board.name:<10} 已复位")
+    return failed
+
+
+def load_profiles(path):
+    """读取并检查要下发的场景文件，返回文件内容"""
+    with open(path, "rb") as f:
+        payload = f.read()
+    profiles = json.loads(payload)
+    if not isinstance(profiles, dict):
+        raise ValueError("场景文件应为 {名称: 配置} 对象")
+    for name, profile in profiles.items():
+        if not isinstance(profile, dict):
+            raise ValueError(f"场景 '{name}' 的配置应为对象")
+        screen = profile.get("screen")
+        if screen is not None and not (isinstance(screen, list) and 2 <= len(screen) <= 4
+                                       and all(isinstance(v, int) for v in screen)):
+            raise ValueError(f"场景 '{name}' 的 screen 应为 [宽, 高] 或 [宽, 高, X偏移, Y偏移]")
+        if not isinstance(profile.get("gauss_interval", False), bool):
+            raise ValueError(f"场景 '{name}' 的 gauss_interval 应为 true/false")
+        for job in profile.get("jobs", [profile]):
+            if job.get("action", "swipe") == "swipe" and job.get("direction") not in VALID_DIRECTIONS:
+                raise ValueError(f"场景 '{name}' 的方向 '{job.get('direction')}' 无效")
+    return payload
+
+
+async def run_fleet(ports, args):
+    return await asyncio.gather(*(run_board(port, args) for port in ports))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多开发板批量管理")
+    parser.add_argument("--port", action="append", help="串口设备（可重复，默认自动扫描）")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--out", default="fleet_data", help="取回文件的保存目录")
+    parser.add_argument("--no-restart", action="store_true", help="完成后停在 REPL，不软复位")
+    parser.add_argument("--emulate", type=int, default=0, metavar="N",
+                        help="启动N块模拟板（fleet_emulator.py）代替真实串口")
+    parser.add_argument("--emulate-hours", type=int, default=24, metavar="H",
+                        help="模拟板预先生成多少小时的统计记录")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出开发板")
+    push = sub.add_parser("push-profiles", help="下发场景文件")
+    push.add_argument("file")
+    sub.add_parser("stats", help="取回并汇总统计日志")
+    sub.add_parser("traces", help="取回轨迹文件")
+    run = sub.add_parser("exec", help="执行代码")
+    run.add_argument("code")
+    run.add_argument("--timeout", type=float, default=TIMEOUT_S)
+    sub.add_parser("reset", help="软复位")
+    args = parser.parse_args(argv)
+
+    if args.command == "push-profiles":
+        try:
+            args.payload = load_profiles(args.file)
+        except (OSError, ValueError) as e:
+            print(f"场景文件无效: {e}")
+            return 1
+
+    procs = []
+    tmp = None
+    if args.emulate:
+        from fleet_emulator import start_boards, stop_boards
+        tmp = tempfile.TemporaryDirectory()
+        procs, ports = start_boards(args.emulate, tmp.name, args.emulate_hours)
+    else:
+        ports = args.port or sorted(p for pattern in PORT_PATTERNS for p in glob.glob(pattern))
+    if not ports:
+        print("没有找到串口设备（可用 --port 指定）")
+        return 1
+
+    start = time.monotonic()
+    try:
+        results = asyncio.run(run_fleet(ports, args))
+    finally:
+        if procs:
+            stop_boards(procs)
+            tmp.cleanup()
+    failed = print_results(args, results)
+    print(f"{len(ports)} 块开发板, 失败 {failed}, 耗时 {time.monotonic() - start:.1f} 秒")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
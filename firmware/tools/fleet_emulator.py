@@ -0,0 +1,304 @@
+"""
+多开发板伪终端模拟（在电脑上运行，供 fleet.py 测试）
+
+每块模拟板是一个子进程，打开一对伪终端，模拟开发板USB串口上的 MicroPython 控制台:
+- 上电后模拟 main.py 运行，输出启动信息
+- Ctrl-C 打断后进入 REPL；Ctrl-A 进入原始 REPL，收到 Ctrl-D 时执行之前收到的代码
+  （CPython exec，已安装 mpsim 的 machine 等模拟模块，工作目录为该板的目录，全局变量保留到软复位），
+  回复 "OK" + 输出 + 0x04 + 错误信息 + 0x04 + ">"，与开发板相同
+- Ctrl-B 返回普通 REPL，普通 REPL 中 Ctrl-D 软复位，重新"运行" main.py
+- 板目录中预先生成 stats.log（每块板的每小时滑动次数不同；超过 config.STATS_MAX_RECORDS 条时
+  与固件一样轮换出 stats.log.old）和一个示例轨迹文件 swipe.trc
+- 按 --baud 限制输出速率，模拟串口的传输时间（0 为不限速）
+- 模拟硬件看门狗：main.py 启动时按 config.WDT_TIMEOUT_MS 启动（固件的 watchdog.LatencyWatchdog），
+  运行中由主循环喂狗；Ctrl-C 打断后仍按真实时间计时，超时即复位（输出复位信息后重新运行 main.py），
+  REPL 中的代码需调用 watchdog.kick() 喂狗。原始 REPL 的输出边执行边发送，与开发板一样占用传输时间
+
+用法:
+    python fleet_emulator.py --boards 8 --dir /tmp/fleet
+    （打印各板的伪终端路径，Ctrl-C 结束；再用 fleet.py --port <路径> 操作）
+    python fleet.py --emulate 8 stats
+    （fleet.py 自己启动模拟板）
+"""
+import argparse
+import contextlib
+import os
+import random
+import select
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import tty
+
+from mpsim import VirtualClock, install
+
+RAW_BANNER = b"raw REPL; CTRL-B to exit\r\n>"
+FRIENDLY_BANNER = b"\r\nMicroPython v1.23.0 on 2024-06-02; ESP32C3 module with ESP32C3\r\nType \"help()\" for more information.\r\n>>> "
+BATCH_S = 600  # 生成的统计记录间隔（与 STATS_FLUSH_S 默认值相同）
+WDT_RESET_BANNER = b"\r\nESP-ROM:esp32c3-api1-20210207\r\nrst:0x7 (TG0WDT_SYS_RST),boot:0xc (SPI_FAST_FLASH_BOOT)\r\n"
+
+RUNNING = 0
+FRIENDLY = 1
+RAW = 2
+
+
+def seed_files(board_dir, index, hours):
+    """生成 hours 小时的统计日志和一个示例轨迹文件"""
+    from config import STATS_MAX_RECORDS
+    from stats_log import RECORD_FORMAT
+    from touch_trace import TraceWriter
+    rng = random.Random(index)
+    rate = rng.randint(60, 240)  # 每运行小时滑动次数
+    reboot_at = rng.randint(1, max(1, hours * 3600 // BATCH_S - 1)) if index % 3 == 0 else -1
+    boot = 0
+    uptime_s = 0
+    records = []
+    for seq in range(hours * 3600 // BATCH_S):
+        if seq == reboot_at:
+            boot += 1
+            uptime_s = 0
+        uptime_s += BATCH_S
+        run_s = BATCH_S if rng.random() < 0.9 else rng.randint(0, BATCH_S)
+        swipes = max(0, int(rate * run_s / 3600 + rng.gauss(0, 2)))
+        failed = 1 if rng.random() < 0.02 else 0
+        records.append(struct.pack(RECORD_FORMAT, seq, boot, uptime_s, run_s, swipes, 0, failed, failed))
+    # 与 StatsLog 相同：当前文件写满 STATS_MAX_RECORDS 条后改名为 .old，更早的记录被覆盖
+    current = (len(records) - 1) % STATS_MAX_RECORDS + 1 if records else 0
+    old = records[max(0, len(records) - current - STATS_MAX_RECORDS):len(records) - current]
+    if old:
+        with open(os.path.join(board_dir, "stats.log.old"), "wb") as f:
+            f.write(b"".join(old))
+    with open(os.path.join(board_dir, "stats.log"), "wb") as f:
+        f.write(b"".join(records[len(records) - current:]))
+    with open(os.path.join(board_dir, "swipe.trc"), "wb") as f:
+        writer = TraceWriter(f, 1080, 2168)
+        for step in range(21):
+            writer.add(step * 30, 540, 1800 - step * 60, 1 if step < 20 else 0)
+
+
+class WatchdogReset(BaseException):
+    """看门狗超时（BaseException：不被原始 REPL 执行代码时的 except Exception 捕获）"""
+
+
+class RealTimeWDT:
+    """按真实时间计时的 machine.WDT（模拟板运行在真实时间上，不用虚拟时钟）"""
+    instance = None
+
+    def __init__(self, id=0, timeout=5000):
+        self.timeout_s = timeout / 1000
+        self.last_feed = time.monotonic()
+        self.expired = False
+        RealTimeWDT.instance = self
+
+    def feed(self):
+        now = time.monotonic()
+        if now - self.last_feed > self.timeout_s:
+            self.expired = True
+        self.last_feed = now
+
+    def check(self):
+        """已超时时引发 WatchdogReset"""
+        if self.expired or time.monotonic() - self.last_feed > self.timeout_s:
+            raise WatchdogReset()
+
+
+class _LiveOutput:
+    """原始 REPL 的标准输出：边执行边发送"""
+    def __init__(self, board):
+        self.board = board
+
+    def write(self, text):
+        self.board.send(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class EmulatedBoard:
+    def __init__(self, index, baud):
+        self.index = index
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.byte_s = 10 / baud if baud else 0  # 8N1 每字节10位
+        self.unique_id = bytes([0x34, 0x85, 0x18, 0x00, index >> 8, index & 0xFF])
+        self.mode = RUNNING
+        self.code = bytearray()
+        self.namespace = {}
+        self.start = time.monotonic()
+        self.wdt = None
+        self.wdt_resets = 0
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.replace("\n", "\r\n").encode()
+        view = memoryview(data)
+        while view:
+            if self.wdt is not None and self.mode != RUNNING:
+                self.wdt.check()
+            n = os.write(self.master, view[:256])
+            view = view[n:]
+            if self.byte_s:
+                time.sleep(n * self.byte_s)
+
+    def ms(self):
+        return int((time.monotonic() - self.start) * 1000)
+
+    def boot(self):
+        """模拟 main.py 启动（与固件一样启动看门狗）"""
+        from config import LATENCY_BUDGETS_MS, WDT_TIMEOUT_MS
+        from watchdog import LatencyWatchdog
+        self.mode = RUNNING
+        self.namespace = {}
+        self.send(f"[{self.ms()}] I OLED I2C: 1000kHz, 整屏刷新 10008us\n系统初始化完成\n等待蓝牙连接...\n")
+        self.wdt = LatencyWatchdog(LATENCY_BUDGETS_MS, WDT_TIMEOUT_MS).wdt
+
+    def watchdog_reset(self):
+        """看门狗复位：REPL 状态丢失，重新运行 main.py"""
+        self.wdt = None
+        self.wdt_resets += 1
+        self.code = bytearray()
+        self.send(WDT_RESET_BANNER)
+        self.boot()
+
+    def run_code(self):
+        code = self.code.decode(errors="replace")
+        self.code = bytearray()
+        err = ""
+        self.send(b"OK")
+        try:
+            with contextlib.redirect_stdout(_LiveOutput(self)):
+                exec(compile(code, "<stdin>", "exec"), self.namespace)
+        except Exception:
+            err = traceback.format_exc()
+        self.send(b"\x04")
+        self.send(err)
+        self.send(b"\x04>")
+
+    def feed(self, data):
+        for ch in data:
+            if self.mode == RAW:
+                if ch == 0x04:
+                    if self.code:
+                        self.run_code()
+                    else:
+                        self.send(b"OK\r\nMPY: soft reboot\r\n" + RAW_BANNER)
+                        self.namespace = {}
+                elif ch == 0x02:
+                    self.mode = FRIENDLY
+                    self.send(FRIENDLY_BANNER)
+                elif ch == 0x01:
+                    self.code = bytearray()
+                    self.send(RAW_BANNER)
+                elif ch != 0x03:
+                    self.code.append(ch)
+            elif ch == 0x03:
+                if self.mode == RUNNING:
+                    self.send("Traceback (most recent call last):\n  File \"main.py\", line 1, in <module>\n"
+                              "KeyboardInterrupt: ")
+                    self.send(FRIENDLY_BANNER)
+                else:
+                    self.send(b"\r\n>>> ")
+                self.mode = FRIENDLY
+            elif self.mode == FRIENDLY:
+                if ch == 0x01:
+                    self.mode = RAW
+                    self.code = bytearray()
+                    self.send(b"\r\n" + RAW_BANNER)
+                elif ch == 0x04:
+                    self.send(b"MPY: soft reboot\r\n")
+                    self.boot()
+                elif ch == 0x0D:
+                    self.send(b"\r\n>>> ")
+
+    def serve(self):
+        self.boot()
+        while True:
+            try:
+                if self.mode == RUNNING and self.wdt is not None:
+                    self.wdt.feed()  # main.py 主循环喂狗
+                readable, _, _ = select.select([self.master], [], [], 0.5)
+                if readable:
+                    try:
+                        data = os.read(self.master, 4096)
+                    except OSError:
+                        data = b""
+                    if data:
+                        self.feed(data)
+                if self.wdt is not None and self.mode != RUNNING:
+                    self.wdt.check()
+            except WatchdogReset:
+                self.watchdog_reset()
+
+
+def start_boards(count, workdir, hours=24, baud=115200):
+    """启动 count 块模拟板（子进程），返回 (子进程列表, 伪终端路径列表)"""
+    procs = []
+    ports = []
+    for index in range(count):
+        board_dir = os.path.join(workdir, f"board{index}")
+        os.makedirs(board_dir, exist_ok=True)
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", board_dir,
+                                 "--index", str(index), "--hours", str(hours), "--baud", str(baud)],
+                                stdout=subprocess.PIPE, text=True)
+        procs.append(proc)
+        ports.append(proc.stdout.readline().strip())
+    return procs, ports
+
+
+def stop_boards(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.wait()
+
+
+def serve_one(board_dir, index, hours, baud):
+    machine, _ = install(VirtualClock())
+    os.chdir(board_dir)
+    seed_files(board_dir, index, hours)
+    board = EmulatedBoard(index, baud)
+    machine.unique_id = lambda: board.unique_id
+    machine.reset_cause = lambda: machine.SOFT_RESET
+    machine.WDT = RealTimeWDT
+    print(board.port, flush=True)
+    try:
+        board.serve()
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多开发板伪终端模拟")
+    parser.add_argument("--boards", type=int, default=4, help="模拟板数量")
+    parser.add_argument("--dir", help="各板文件所在目录（默认临时目录）")
+    parser.add_argument("--hours", type=int, default=24, help="预先生成多少小时的统计记录")
+    parser.add_argument("--baud", type=int, default=115200, help="模拟的串口速率（0为不限速）")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--index", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve_one(args.serve, args.index, args.hours, args.baud)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        procs, ports = start_boards(args.boards, args.dir or tmp, args.hours, args.baud)
+        for index, port in enumerate(ports):
+            print(f"board{index}: {port}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop_boards(procs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+实时坐标流电脑端（在电脑上运行）
+
+通过USB串口连接运行 c3_tools.py 的开发板，进入菜单14的实时坐标流模式，
+按时间发送坐标帧（协议见 esp32c3mini/live_stream.py），并打印设备回报的
+缓冲、迟到、欠载、丢弃统计。
+
+坐标来源:
+- --demo:        内置的往返滑动演示
+- --trace FILE:  轨迹文件（tools/trace_convert.py 生成）
+- --csv FILE:    每行 t_ms,x,y,contact（像素坐标，'-' 表示标准输入，可由其他程序实时写入）
+
+用法示例:
+    python live_stream_host.py /dev/ttyACM0 --demo --rate 120
+    python live_stream_host.py /dev/ttyACM0 --trace swipe.trc
+"""
+import argparse
+import math
+import os
+import select
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "esp32c3mini"))
+
+from live_stream import (FRAME_END, FRAME_STATS, FRAME_STATUS, FRAME_TOUCH, READY_MARKER,  # noqa: E402
+                         STATUS_SIZE, SYNC1, SYNC2, pack_frame, unpack_status)
+from serial_port import open_serial, read_available, write_all  # noqa: E402
+from touch_trace import TraceReader  # noqa: E402
+
+HID_MAX = 32767
+MENU_CHOICE = b"14\r\n"
+
+
+def demo_frames(width, height, rate, seconds):
+    """往返竖直滑动：每个周期按下 -> 滑动 -> 抬起"""
+    period_ms = 1000 // rate
+    stroke_ms = 600
+    cycle_ms = 1500
+    t = 0
+    while t < seconds * 1000:
+        phase = t % cycle_ms
+        contact = 1 if phase < stroke_ms else 0
+        progress = min(phase, stroke_ms) / stroke_ms
+        y = int(height * (0.8 - 0.6 * (0.5 - 0.5 * math.cos(math.pi * progress))))
+        yield t, width // 2, y, contact
+        t += period_ms
+
+
+def trace_frames(path):
+    with open(path, "rb") as f:
+        reader = TraceReader(f)
+        t = 0
+        while reader.next():
+            t += reader.dt
+            yield t, reader.x, reader.y, reader.contact
+
+
+def csv_frames(path):
+    f = sys.stdin if path == "-" else open(path, "r")
+    for line in f:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        t_ms, x, y, contact = (int(float(v)) for v in line.split(",")[:4])
+        yield t_ms, x, y, contact
+
+
+class StatusParser:
+    """从串口字节流中提取状态帧，其余字节作为文本输出"""
+    def __init__(self):
+        self.buf = bytearray()
+
+    def feed(self, data):
+        self.buf.extend(data)
+        results = []
+        header = bytes([SYNC1, SYNC2, FRAME_STATUS])
+        while True:
+            idx = self.buf.find(header)
+            if idx < 0:
+                # 末尾两个字节可能是下一个帧头的开始，暂不输出
+                self._print_text(len(self.buf) - 2)
+                break
+            self._print_text(idx)
+            if len(self.buf) < STATUS_SIZE:
+                break
+            status = unpack_status(self.buf[:STATUS_SIZE])
+            if status is not None:
+                results.append(status)
+                del self.buf[:STATUS_SIZE]
+            else:
+                del self.buf[:1]
+        return results
+
+    def _print_text(self, n):
+        if n > 0:
+            sys.stdout.write(bytes(self.buf[:n]).decode(errors="replace"))
+            del self.buf[:n]
+
+
+def wait_ready(fd, timeout=5.0):
+    """发送菜单选择并等待设备进入流模式"""
+    write_all(fd, MENU_CHOICE)
+    deadline = time.monotonic() + timeout
+    seen = b""
+    while time.monotonic() < deadline:
+        select.select([fd], [], [], 0.05)
+        seen += read_available(fd)
+        if READY_MARKER.encode() in seen:
+            return True
+    return False
+
+
+def stream(fd, frames, width, height, speed=1.0):
+    parser = StatusParser()
+    last_status = None
+    start = time.monotonic()
+    t_first = None
+    sent = 0
+    for t_ms, x, y, contact in frames:
+        if t_first is None:
+            t_first = t_ms
+        send_at = start + (t_ms - t_first) / 1000.0 / speed
+        # 等待发送时刻，同时读取设备回报
+        while True:
+            delay = send_at - time.monotonic()
+            readable, _, _ = select.select([fd], [], [], max(0.0, delay))
+            if readable:
+                for status in parser.feed(read_available(fd)):
+                    last_status = status
+                    print_status(status, sent)
+            if delay <= 0:
+                break
+        hid_x = max(0, min(HID_MAX, x * HID_MAX // width))
+        hid_y = max(0, min(HID_MAX, y * HID_MAX // height))
+        write_all(fd, pack_frame(FRAME_TOUCH, int((t_ms - t_first) / speed), hid_x, hid_y, contact))
+        sent += 1
+
+    write_all(fd, pack_frame(FRAME_STATS, 0))
+    write_all(fd, pack_frame(FRAME_END, 0))
+    deadline = time.monotonic() + 1.0
+    while time.monotonic() < deadline:
+        select.select([fd], [], [], 0.05)
+        for status in parser.feed(read_available(fd)):
+            last_status = status
+            print_status(status, sent)
+    return sent, last_status
+
+
+def print_status(status, sent):
+    print("[设备] 已发送 {sent} 接收 {received} 输出 {emitted} 缓冲 {buffered} "
+          "迟到 {late} 欠载 {underruns} 丢弃 {dropped}".format(sent=sent, **status))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="实时坐标流电脑端")
+    parser.add_argument("port", help="串口设备，例如 /dev/ttyACM0")
+    parser.add_argument("--baud", type=int, default=115200)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--demo", action="store_true", help="内置往返滑动演示")
+    source.add_argument("--trace", help="轨迹文件")
+    source.add_argument("--csv", help="t_ms,x,y,contact 文件，'-' 为标准输入")
+    parser.add_argument("--width", type=int, default=1080, help="坐标来源的屏幕宽度(像素)")
+    parser.add_argument("--height", type=int, default=2168, help="坐标来源的屏幕高度(像素)")
+    parser.add_argument("--rate", type=int, default=100, help="演示模式帧率(帧/秒)")
+    parser.add_argument("--seconds", type=int, default=10, help="演示模式时长(秒)")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放速度倍率")
+    args = parser.parse_args(argv)
+
+    width, height = args.width, args.height
+    if args.demo:
+        frames = demo_frames(width, height, args.rate, args.seconds)
+    elif args.trace:
+        with open(args.trace, "rb") as f:
+            header = TraceReader(f)
+            width, height = header.width or width, header.height or height
+        frames = trace_frames(args.trace)
+    else:
+        frames = csv_frames(args.csv)
+
+    fd = open_serial(args.port, args.baud)
+    try:
+        if not wait_ready(fd):
+            print("设备未进入实时坐标流模式（请确认运行的是 c3_tools.py 且蓝牙已连接）")
+            return 1
+        sent, status = stream(fd, frames, width, height, args.speed)
+        print(f"完成: 发送 {sent} 帧")
+        if status:
+            print_status(status, sent)
+    finally:
+        os.close(fd)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
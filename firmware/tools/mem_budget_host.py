@@ -0,0 +1,191 @@
+"""
+在电脑上运行内存预算测试（mpsim 模拟硬件）
+
+CPython 的临时对象在引用计数归零时立即释放，只看仍被持有的内存会漏掉热路径上的临时分配。
+这里按字节码逐条统计：固件代码（不含 mem_budget.py 本身）的帧开启逐指令跟踪，
+每条指令执行前后读 tracemalloc 的已跟踪内存，增加的部分计为这条指令的分配
+（固件调用模拟层时，模拟层留下的内存也计在调用指令上）。mem_budget 看到的 gc 换成 HostGC:
+- gc.mem_alloc(): 上次回收后仍被固件持有的内存（tracemalloc 快照，只计固件文件）+ 此后累计的分配，
+  与开发板上关闭自动回收时的 gc.mem_alloc() 一致，单次分配、高水位和净增长都有意义
+- gc.collect(): 真正回收后重新取快照
+与开发板的差别:
+- CPython 中整数也是堆对象（28-32字节），开发板上 2^30 以内是不分配的小整数，单条指令增长不超过32字节的不计入
+- CPython 的元组、列表、字典有空闲链表，复用时不经过分配器：创建它们的指令（BUILD_TUPLE 等）
+  每执行一次至少按一个 GC 块（16字节）计入；浮点数同样走空闲链表，这里看不到，以开发板上的结果为准
+- for 循环头中的 range() 在 MicroPython 中编译为计数循环，不创建对象，这一行的 range 调用不计入
+
+用法:
+    python mem_budget_host.py
+    python mem_budget_host.py --iterations 500
+    python mem_budget_host.py --where      # 同时列出有分配的代码行
+返回码: 0 通过（各子系统预热后不再分配、净增长为0）, 1 未通过
+"""
+import argparse
+import dis
+import gc
+import linecache
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from mpsim import FIRMWARE_DIR, VirtualClock, install
+
+FILTERS = [
+    tracemalloc.Filter(True, os.path.join(FIRMWARE_DIR, "*")),
+    tracemalloc.Filter(False, os.path.join(FIRMWARE_DIR, "mem_budget.py")),
+]
+SMALL_INT_BYTES = 32  # CPython 单个整数对象的最大分配（30位以内的整数在开发板上是小整数）
+RANGE_OPS = {"PRECALL", "CALL", "GET_ITER"}
+BUILD_OPS = {"BUILD_TUPLE", "BUILD_LIST", "BUILD_MAP", "BUILD_CONST_KEY_MAP", "BUILD_SET", "BUILD_SLICE",
+             "MAKE_FUNCTION"}
+GC_BLOCK_BYTES = 16  # MicroPython 堆的最小分配单位
+_traced_memory = tracemalloc.get_traced_memory
+
+
+def firmware_alloc():
+    snapshot = tracemalloc.take_snapshot().filter_traces(FILTERS)
+    return sum(trace.size for trace in snapshot.traces)
+
+
+class AllocTracer:
+    """逐指令统计固件代码的分配（sys.settrace 的全局跟踪函数为 trace）"""
+
+    def __init__(self):
+        self.allocated = 0     # 累计分配字节
+        self.lines = {}        # (文件名, 行号) -> 累计分配字节
+        # 上一次读数和上一条指令；用预先分配的列表保存，跟踪函数自身在两次读数之间不产生净分配
+        self.state = [0, None, 0]
+        self.offsets = {}      # 代码对象 -> (不计入的指令偏移: for 循环头的 range, 创建容器的指令偏移)
+
+    def trace(self, frame, event, arg):
+        code = frame.f_code
+        path = code.co_filename
+        if not path.startswith(FIRMWARE_DIR) or path.endswith("mem_budget.py"):
+            return None
+        if code not in self.offsets:
+            self.offsets[code] = scan(code)
+        frame.f_trace_opcodes = True
+        frame.f_trace_lines = False
+        state = self.state
+        # 进入新帧时重新取读数：调用方（测量代码或模拟层）的分配、跟踪时生成的帧对象都不计入
+        state[1] = None
+        state[0] = _traced_memory()[0]
+        return self.step
+
+    def step(self, frame, event, arg):
+        state = self.state
+        grown = _traced_memory()[0] - state[0]
+        code = state[1]
+        if code is not None:
+            skip, build = self.offsets[code]
+            if state[2] in build:
+                if grown < GC_BLOCK_BYTES:
+                    grown = GC_BLOCK_BYTES
+            elif grown <= SMALL_INT_BYTES or state[2] in skip:
+                grown = 0
+        if grown > 0 and code is not None:
+            self.allocated += grown
+            key = (code.co_filename, code_line(code, state[2]))
+            self.lines[key] = self.lines.get(key, 0) + grown
+        grown = None
+        if event == "return":
+            state[1] = None  # 返回后回到调用方的下一条指令，帧对象的释放不算在任何指令上
+        else:
+            state[1] = frame.f_code
+            state[2] = frame.f_lasti
+        state[0] = _traced_memory()[0]
+        return self.step
+
+
+def scan(code):
+    """返回 (for 循环头 range() 调用的指令偏移, 创建容器的指令偏移)"""
+    skip = set()
+    build = set()
+    for ins in dis.get_instructions(code):
+        if ins.opname in BUILD_OPS:
+            build.add(ins.offset)
+        elif ins.opname in RANGE_OPS and ins.positions.lineno is not None:
+            line = linecache.getline(code.co_filename, ins.positions.lineno).strip()
+            if line.startswith("for ") and " in range(" in line:
+                skip.add(ins.offset)
+    return skip, build
+
+
+def code_line(code, offset):
+    for start, end, line in code.co_lines():
+        if start <= offset < end:
+            return line
+    return code.co_firstlineno
+
+
+class HostGC:
+    """给 mem_budget 用的 gc：mem_alloc 为上次回收后的常驻内存 + 此后累计分配"""
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+        self.live = 0
+        self.mark = 0
+
+    def collect(self):
+        gc.collect()
+        self.live = firmware_alloc()
+        self.mark = self.tracer.allocated
+
+    def mem_alloc(self):
+        return self.live + self.tracer.allocated - self.mark
+
+    def mem_free(self):
+        return gc.mem_free()
+
+    def disable(self):
+        pass
+
+    def enable(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在模拟环境中运行固件内存预算测试")
+    parser.add_argument("--iterations", type=int, default=None, help="每个子系统执行次数（默认取 config.MEM_BUDGET_ITERATIONS）")
+    parser.add_argument("--where", action="store_true", help="列出有分配的代码行")
+    args = parser.parse_args()
+
+    machine, bluetooth = install(VirtualClock())
+    tracer = AllocTracer()
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            import config
+            import main as firmware_main
+            import mem_budget
+            touch_controller, button_control = firmware_main.setup()
+            ble = bluetooth.BLE.instances[-1]
+            ble.notify_hook = lambda value: None  # 不保存通知内容，避免模拟层本身占用内存
+            ble.connect()
+            # 遥测用的累计计数从大于256的值开始，避免它们在测量中途越过小整数范围被计为常驻内存增长
+            touch_controller.ble_hid.reports_sent = 1000
+            touch_controller.display.page_flushes = 1000
+            # 初始化完成后开始统计（启动时的一次性分配不计入）
+            tracemalloc.start()
+            mem_budget.gc = HostGC(tracer)
+            iterations = args.iterations or config.MEM_BUDGET_ITERATIONS
+            sys.settrace(tracer.trace)
+            try:
+                # 预热期间同样开启跟踪，首次跟踪时的一次性分配留在预热中
+                ok = mem_budget.run(touch_controller, button_control, iterations, warmup=50)
+            finally:
+                sys.settrace(None)
+        finally:
+            os.chdir(cwd)
+            tracemalloc.stop()
+    if args.where and tracer.lines:
+        print("有分配的代码行（含预热）:")
+        for (path, line), size in sorted(tracer.lines.items(), key=lambda item: -item[1]):
+            print(f"  {os.path.relpath(path, FIRMWARE_DIR)}:{line}  {size} 字节")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+"""
+电脑端 MicroPython 硬件模拟（供 soak_runner.py 等工具使用）
+
+- VirtualClock: 虚拟时钟，休眠立即返回并推进虚拟时间；ticks_* 与 MicroPython 一样按 2^30 回绕
+- install(): 在 sys.modules 中放入模拟的 machine / bluetooth / framebuf / micropython 模块，
+  给 gc 补上 mem_free/mem_alloc（开启 tracemalloc 时按已跟踪的分配计算），
+  并把固件的 clock 模块换成虚拟时钟。必须在导入固件模块之前调用。
+
+模拟只覆盖固件用到的接口：I2C 写入只计数，BLE 通知记录到 BLE.notified，
+WDT 记录最长的喂狗间隔而不会真正复位。
+"""
+import gc
+import heapq
+import os
+import sys
+import tracemalloc
+import types
+
+FIRMWARE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "esp32c3mini"))
+
+SIM_HEAP_BYTES = 320 * 1024  # 模拟的可用堆大小（ESP32-C3 上 MicroPython 的典型值）
+TICKS_PERIOD = 1 << 30
+TICKS_MASK = TICKS_PERIOD - 1
+TICKS_HALF = TICKS_PERIOD // 2
+
+
+class VirtualClock:
+    def __init__(self, start_ms=0):
+        self.now_us = start_ms * 1000
+        self.events = []  # [(触发时刻us, 序号, 回调)]
+        self.seq = 0
+        self.sleeps = 0
+
+    # ---- MicroPython time 接口 ----
+    def ticks_ms(self):
+        return (self.now_us // 1000) & TICKS_MASK
+
+    def ticks_us(self):
+        return self.now_us & TICKS_MASK
+
+    @staticmethod
+    def ticks_diff(a, b):
+        return ((a - b + TICKS_HALF) & TICKS_MASK) - TICKS_HALF
+
+    @staticmethod
+    def ticks_add(a, delta):
+        return (a + delta) & TICKS_MASK
+
+    def sleep_ms(self, ms):
+        self.sleeps += 1
+        self.advance(int(ms) * 1000)
+
+    def sleep_us(self, us):
+        self.sleeps += 1
+        self.advance(int(us))
+
+    def sleep_cancellable(self, ms, slice_ms, token):
+        """
+        与 clock.sleep_cancellable 行为一致，但直接跳到下一个事件而不逐片推进：
+        事件中请求取消时，推进到当前切片结束（开发板上在该时刻发现）后返回 True
+        """
+        self.sleeps += 1
+        start = self.now_us
+        target = start + int(ms) * 1000
+        events = self.events
+        while events and events[0][0] <= target:
+            at, _, callback = heapq.heappop(events)
+            if at > self.now_us:
+                self.now_us = at
+            callback(self)
+            if token.requested:
+                slice_us = slice_ms * 1000
+                end = start + ((self.now_us - start) // slice_us + 1) * slice_us
+                self.advance(min(end, target) - self.now_us)
+                return True
+        self.now_us = target
+        return False
+
+    # ---- 模拟控制 ----
+    def advance(self, us):
+        """推进虚拟时间；期间到期的回调在其到期时刻执行"""
+        target = self.now_us + max(0, us)
+        events = self.events
+        while events and events[0][0] <= target:
+            at, _, callback = heapq.heappop(events)
+            if at > self.now_us:
+                self.now_us = at
+            callback(self)
+        self.now_us = target
+
+    def call_at(self, at_us, callback):
+        """在虚拟时刻 at_us 调用 callback(clock)"""
+        self.seq += 1
+        heapq.heappush(self.events, (at_us, self.seq, callback))
+
+    def call_later(self, delay_us, callback):
+        self.call_at(self.now_us + delay_us, callback)
+
+
+class _Pin:
+    IN = 1
+    OUT = 3
+    PULL_UP = 1
+    IRQ_FALLING = 2
+    IRQ_RISING = 1
+
+    def __init__(self, pin_id, mode=None, pull=None):
+        self.id = pin_id
+        self._value = 1
+        self.handler = None
+
+    def irq(self, trigger=None, handler=None):
+        self.handler = handler
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = v
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def press(self):
+        """模拟按下（下降沿触发中断）"""
+        if self.handler is not None:
+            self.handler(self)
+
+
+class _I2C:
+    clock = None  # install() 设置；传输按总线频率消耗虚拟时间
+
+    def __init__(self, *args, **kwargs):
+        self.freq = kwargs.get("freq", 400000)
+        self.bytes_written = 0
+        self.transfers = 0
+
+    def _transfer(self, nbytes):
+        self.bytes_written += nbytes
+        self.transfers += 1
+        if self.clock is not None:
+            # 地址字节 + 数据字节，每字节9个时钟
+            self.clock.advance((nbytes + 1) * 9 * 1000000 // self.freq)
+
+    def writeto(self, addr, buf, stop=True):
+        # 与 MicroPython 一致：返回收到的 ACK 数
+        self._transfer(len(buf))
+        return len(buf)
+
+    def writevto(self, addr, bufs, stop=True):
+        nbytes = sum(len(buf) for buf in bufs)
+        self._transfer(nbytes)
+        return nbytes
+
+    def scan(self):
+        return [0x3C]
+
+    def init(self, *args, **kwargs):
+        self.freq = kwargs.get("freq", self.freq)
+
+
+def _make_machine(clock):
+    machine = types.ModuleType("machine")
+    machine.PWRON_RESET = 1
+    machine.HARD_RESET = 2
+    machine.WDT_RESET = 3
+    machine.DEEPSLEEP_RESET = 4
+    machine.SOFT_RESET = 5
+    machine.Pin = _Pin
+    machine.I2C = _I2C
+    machine.SoftI2C = _I2C
+    machine.reset_cause = lambda: machine.PWRON_RESET
+    machine.freq = lambda *a: 160000000
+
+    rtc_memory = bytearray()
+
+    class RTC:
+        def memory(self, data=None):
+            if data is None:
+                return bytes(rtc_memory)
+            rtc_memory[:] = data
+
+    class WDT:
+        def __init__(self, id=0, timeout=5000):
+            self.timeout_ms = timeout
+            self.last_feed = clock.now_us
+            self.max_gap_us = 0
+            self.expired = 0
+            machine.wdt = self
+
+        def feed(self):
+            gap = clock.now_us - self.last_feed
+            if gap > self.max_gap_us:
+                self.max_gap_us = gap
+            if gap > self.timeout_ms * 1000:
+                self.expired += 1
+            self.last_feed = clock.now_us
+
+    class Timer:
+        ONE_SHOT = 0
+        PERIODIC = 1
+
+        def __init__(self, id=0):
+            pass
+
+        def init(self, mode=0, period=0, callback=None):
+            if callback is not None:
+                clock.call_later(period * 1000, lambda c: callback(self))
+
+        def deinit(self):
+            pass
+
+    machine.RTC = RTC
+    machine.WDT = WDT
+    machine.Timer = Timer
+    machine.wdt = None
+    return machine
+
+
+def _make_bluetooth():
+    bluetooth = types.ModuleType("bluetooth")
+    bluetooth.FLAG_READ = 0x0002
+    bluetooth.FLAG_WRITE_NO_RESPONSE = 0x0004
+    bluetooth.FLAG_WRITE = 0x0008
+    bluetooth.FLAG_NOTIFY = 0x0010
+    bluetooth.UUID = lambda value: ("uuid", value)
+
+    class BLE:
+        instances = []
+
+        def __init__(self):
+            self.handler = None
+            self.values = {}
+            self.notified = []     # 每次通知的报告内容
+            self.notify_hook = None
+            self.fail_notify = False
+            self.updated = {}      # gatts_write(send_update=True) 最近一次写入的值（句柄 -> 内容）
+            BLE.instances.append(self)
+
+        def active(self, *args):
+            return True
+
+        def irq(self, handler):
+            self.handler = handler
+
+        def config(self, *args, **kwargs):
+            return None
+
+        def gatts_register_services(self, services):
+            handle = 1
+            result = []
+            for _, chars in services:
+                handles = []
+                for _ in chars:
+                    handles.append(handle)
+                    handle += 1
+                result.append(tuple(handles))
+            return tuple(result)
+
+        def gatts_write(self, handle, data, send_update=False):
+            self.values[handle] = bytes(data)
+            if send_update:
+                self.updated[handle] = self.values[handle]
+
+        def gatts_read(self, handle):
+            return self.values.get(handle, b"")
+
+        def gatts_notify(self, conn_handle, handle, data=None):
+            if self.fail_notify:
+                raise OSError(128)
+            value = bytes(data) if data is not None else self.values.get(handle, b"")
+            if self.notify_hook is not None:
+                self.notify_hook(value)
+            else:
+                self.notified.append(value)
+
+        def gap_advertise(self, interval_us, adv_data=None, **kwargs):
+            pass
+
+        def connect(self, addr=b"\x11\x22\x33\x44\x55\x66", conn_handle=0, addr_type=0):
+            """模拟手机连接（addr_type: 0 公共地址, 1 随机地址）"""
+            self.handler(1, (conn_handle, addr_type, addr))
+
+        def disconnect(self, conn_handle=0):
+            self.handler(2, (conn_handle, 0, b"\x00" * 6))
+
+    bluetooth.BLE = BLE
+    return bluetooth
+
+
+def _make_framebuf():
+    framebuf = types.ModuleType("framebuf")
+    framebuf.MONO_VLSB = 0
+    framebuf.MVLSB = 0
+    framebuf.MONO_HLSB = 3
+
+    class FrameBuffer:
+        # 只保留接口，不真正绘制（浸泡测试不关心像素内容）
+        def __init__(self, buf, width, height, fmt, stride=None):
+            self.buf = buf
+            self.width = width
+            self.height = height
+
+        def fill(self, c):
+            pass
+
+        def fill_rect(self, x, y, w, h, c):
+            pass
+
+        def text(self, s, x, y, c=1):
+            pass
+
+        def pixel(self, x, y, c=None):
+            return 0
+
+        def blit(self, fb, x, y, key=-1, palette=None):
+            pass
+
+        def scroll(self, dx, dy):
+            pass
+
+        def hline(self, x, y, w, c):
+            pass
+
+        def rect(self, x, y, w, h, c, f=False):
+            pass
+
+    framebuf.FrameBuffer = FrameBuffer
+    return framebuf
+
+
+def _make_micropython():
+    micropython = types.ModuleType("micropython")
+    micropython.const = lambda x: x
+    micropython.kbd_intr = lambda c: None
+    micropython.mem_info = lambda *a: None
+    # 不提供 native/viper，hotpath 使用纯Python实现
+    return micropython
+
+
+def _mem_alloc():
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+def install(clock):
+    """安装模拟模块和虚拟时钟，返回 (machine, bluetooth) 模拟模块"""
+    if FIRMWARE_DIR not in sys.path:
+        sys.path.insert(0, FIRMWARE_DIR)
+    machine = _make_machine(clock)
+    _I2C.clock = clock
+    bluetooth = _make_bluetooth()
+    sys.modules["machine"] = machine
+    sys.modules["bluetooth"] = bluetooth
+    sys.modules["framebuf"] = _make_framebuf()
+    sys.modules["micropython"] = _make_micropython()
+    gc.mem_alloc = _mem_alloc
+    gc.mem_free = lambda: max(0, SIM_HEAP_BYTES - _mem_alloc())
+
+    import clock as firmware_clock
+    firmware_clock.install(clock)
+    return machine, bluetooth
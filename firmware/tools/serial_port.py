@@ -0,0 +1,51 @@
+"""
+串口辅助函数（在电脑上运行，仅依赖标准库 termios，不需要 pyserial）
+"""
+import os
+import termios
+import tty
+
+_BAUD_RATES = {
+    9600: termios.B9600,
+    57600: termios.B57600,
+    115200: termios.B115200,
+    230400: termios.B230400,
+}
+
+
+def open_serial(path, baud=115200):
+    """以原始模式打开串口，返回非阻塞文件描述符"""
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    if os.isatty(fd):
+        tty.setraw(fd)
+        attrs = termios.tcgetattr(fd)
+        speed = _BAUD_RATES.get(baud, termios.B115200)
+        attrs[4] = speed
+        attrs[5] = speed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    return fd
+
+
+def write_all(fd, data):
+    """写入全部数据（非阻塞描述符上重试）"""
+    view = memoryview(data)
+    while view:
+        try:
+            n = os.write(fd, view)
+        except BlockingIOError:
+            n = 0
+        view = view[n:]
+
+
+def read_available(fd):
+    """读取当前已到达的全部字节，没有数据时返回 b''"""
+    chunks = []
+    while True:
+        try:
+            data = os.read(fd, 4096)
+        except BlockingIOError:
+            break
+        if not data:
+            break
+        chunks.append(data)
+    return b"".join(chunks)
@@ -0,0 +1,260 @@
+"""
+加速浸泡测试（在电脑上运行）
+
+在虚拟时钟上运行完整固件（main.setup() + main.run() 主循环，按钮中断、蓝牙连接均为模拟），
+休眠不占用真实时间，一周的运行约一分钟即可跑完（内存采样会慢数倍，可用 --no-heap 关闭）。按设定周期模拟按钮启动/停止场景，
+结束时报告:
+- 滑动/点击次数、报告数、发送失败次数
+- 等待时长偏差（实际等待 - 设定等待）
+- 停止到触摸释放的延迟（每次模拟的停止都必须释放触摸，且延迟不超过 config.STOP_LATENCY_MAX_MS，否则返回码为1）
+- 内存增长（tracemalloc，只统计固件代码分配的内存，每个模拟小时采样一次）
+- 看门狗最长喂狗间隔
+- 蓝牙断线次数（--drop-hours 设定周期断开30秒后重连，运行中的场景应暂停并继续）
+
+用法示例:
+    python soak_runner.py --profile "Long Video" --days 7
+    python soak_runner.py --profile "Mixed Feed" --days 2 --cycle-hours 6 --start-ms 1073000000
+    python soak_runner.py --profile "Short Video" --days 1 --drop-hours 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from mpsim import FIRMWARE_DIR, VirtualClock, install
+
+US_PER_HOUR = 3600 * 1000000
+DROP_US = 30 * 1000000  # 模拟断线的时长
+
+
+class SoakDone(BaseException):
+    """结束模拟（继承 BaseException，不会被固件中的 except Exception 捕获）"""
+
+
+class _Output:
+    """收集固件输出：统计警告/错误行，保留最后若干行"""
+    def __init__(self, keep=20):
+        self.lines = 0
+        self.warnings = 0
+        self.errors = 0
+        self.tail = []
+        self.keep = keep
+        self._partial = ""
+
+    def write(self, s):
+        data = self._partial + s
+        parts = data.split("\n")
+        self._partial = parts.pop()
+        for line in parts:
+            self.lines += 1
+            if "] W " in line:
+                self.warnings += 1
+            elif "] E " in line or "Error" in line:
+                self.errors += 1
+            self.tail.append(line)
+            if len(self.tail) > self.keep:
+                self.tail.pop(0)
+        return len(s)
+
+    def flush(self):
+        pass
+
+
+class SoakRunner:
+    def __init__(self, profile, days, cycle_hours, start_ms, heap, drop_hours=0):
+        self.clock = VirtualClock(start_ms)
+        self.start_us = self.clock.now_us
+        self.machine, self.bluetooth = install(self.clock)
+        self.profile = profile
+        self.end_us = self.clock.now_us + int(days * 24 * US_PER_HOUR)
+        self.cycle_us = int(cycle_hours * US_PER_HOUR)
+        self.heap = heap
+        self.drop_us = int(drop_hours * US_PER_HOUR)
+        self.drops = 0
+
+        self.reports = 0
+        self.strokes = 0
+        self._tip = 0
+        self.wait_drift_ms = []
+        self.stop_latency_us = []
+        self.missed_stops = 0  # 停止请求后没有释放触摸的次数
+        self._stops_before = 0
+        self.heap_samples = []
+        self.cycles = 0
+
+    # ---- 固件接入 ----
+    def boot(self):
+        import main
+        import config
+        if self.profile not in config.PRESET_PROFILES:
+            raise SystemExit(f"未知场景: {self.profile} (可选: {', '.join(config.PRESET_PROFILES)})")
+        self.main = main
+        self.stop_bound_us = config.STOP_LATENCY_MAX_MS * 1000
+        self.touch, self.buttons = main.setup()
+        ble = self.bluetooth.BLE.instances[-1]
+        ble.notify_hook = self._on_report
+        self.ble = ble
+
+        # 记录每次等待的设定时长与实际时长
+        wait = self.touch.wait_with_stop_check
+        clock = self.clock
+
+        def timed_wait(wait_ms, *args):
+            start = clock.now_us
+            stopped = wait(wait_ms, *args)
+            if not stopped:
+                self.wait_drift_ms.append((clock.now_us - start) / 1000 - wait_ms)
+            return stopped
+        self.touch.wait_with_stop_check = timed_wait
+
+    def _on_report(self, value):
+        self.reports += 1
+        tip = value[-5] & 1  # 两种报告布局的触摸状态都在倒数第5字节（见 hid_report.py）
+        if tip and not self._tip:
+            self.strokes += 1
+        self._tip = tip
+
+    # ---- 模拟事件 ----
+    def _press(self, pin):
+        pin.press()
+
+    def _select_and_start(self, clock):
+        """按钮1切换到目标场景，再单击按钮2启动"""
+        display = self.touch.display
+        target = display.profiles.index(self.profile)
+        steps = (target - display.current_index) % len(display.profiles)
+        delay = 0
+        for _ in range(steps):
+            delay += 300000
+            clock.call_later(delay, lambda c: self._press(self.buttons.btn1))
+        clock.call_later(delay + 300000, lambda c: self._press(self.buttons.btn2))
+        clock.call_later(self.cycle_us, self._stop)
+
+    def _stop(self, clock):
+        """双击按钮2立即停止，稍后重新启动"""
+        self._stops_before = self.touch.cancel.count
+        self._press(self.buttons.btn2)
+        clock.call_later(250000, lambda c: self._press(self.buttons.btn2))
+        clock.call_later(2000000, self._record_stop)
+
+    def _record_stop(self, clock):
+        cancel = self.touch.cancel
+        if cancel.count > self._stops_before and not self.touch.is_running():
+            self.stop_latency_us.append(cancel.last_latency_us)
+        else:
+            self.missed_stops += 1
+        self.cycles += 1
+        if clock.now_us + 5000000 < self.end_us:
+            clock.call_later(1000000, self._select_and_start)
+
+    def _sample(self, clock):
+        if self.heap:
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(True, os.path.join(FIRMWARE_DIR, "*"))])
+            self.heap_samples.append(sum(stat.size for stat in snapshot.statistics("filename")))
+        clock.call_later(US_PER_HOUR, self._sample)
+
+    def _drop(self, clock):
+        """断开蓝牙，DROP_US 后重连"""
+        self.drops += 1
+        self.ble.disconnect()
+        clock.call_later(DROP_US, lambda c: self.ble.connect())
+        clock.call_later(self.drop_us, self._drop)
+
+    def _finish(self, clock):
+        raise SoakDone()
+
+    # ---- 运行 ----
+    def run(self):
+        output = _Output()
+        real_stdout = sys.stdout
+        wall = time.monotonic()
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            sys.stdout = output
+            try:
+                self.boot()
+                clock = self.clock
+                clock.call_later(1000000, lambda c: self.ble.connect())
+                clock.call_later(2000000, self._select_and_start)
+                if self.heap:
+                    tracemalloc.start()
+                # 第一个小时作为预热，之后开始采样内存
+                clock.call_later(US_PER_HOUR, self._sample)
+                if self.drop_us:
+                    clock.call_later(self.drop_us, self._drop)
+                clock.call_at(self.end_us, self._finish)
+                try:
+                    self.main.run(self.touch, self.buttons)
+                except SoakDone:
+                    pass
+                self.touch.stats.flush()
+            finally:
+                sys.stdout = real_stdout
+                os.chdir(cwd)
+                if self.heap:
+                    tracemalloc.stop()
+        self.wall_s = time.monotonic() - wall
+        self.output = output
+        return self
+
+    def report(self):
+        stats = self.touch.stats
+        wdt = self.machine.wdt
+        print(f"=== 浸泡测试: {self.profile} ===")
+        print(f"模拟时长 {(self.clock.now_us - self.start_us) / US_PER_HOUR:.1f} 小时, 实际耗时 {self.wall_s:.1f} 秒, "
+              f"休眠调用 {self.clock.sleeps}")
+        print(f"启停周期 {self.cycles}, 触摸报告 {self.reports}, 按下次数 {self.strokes}")
+        print(f"统计日志: 记录 {stats.seq} 条")
+        if self.drops:
+            print(f"蓝牙断线 {self.drops} 次")
+        if self.wait_drift_ms:
+            drift = self.wait_drift_ms
+            print(f"等待偏差: 平均 {sum(drift) / len(drift):+.1f}ms 最小 {min(drift):+.1f}ms "
+                  f"最大 {max(drift):+.1f}ms 累计 {sum(drift) / 1000:+.1f}s ({len(drift)} 次)")
+        else:
+            print("等待偏差: 无（该场景不使用固定间隔等待）")
+        over_bound = 0
+        if self.stop_latency_us:
+            lat = self.stop_latency_us
+            over_bound = sum(1 for us in lat if us > self.stop_bound_us)
+            print(f"停止到释放: 最大 {max(lat) / 1000:.1f}ms 平均 {sum(lat) / len(lat) / 1000:.1f}ms ({len(lat)} 次), "
+                  f"上限 {self.stop_bound_us // 1000}ms")
+            if over_bound:
+                print(f"停止延迟超出上限: {over_bound} 次")
+        if self.missed_stops:
+            print(f"停止未生效: {self.missed_stops} 次（停止请求后场景仍在运行或触摸未释放）")
+        if len(self.heap_samples) >= 2:
+            first, last = self.heap_samples[0], self.heap_samples[-1]
+            print(f"内存: 首次采样 {first} B, 最后 {last} B, 增长 {last - first:+d} B, 峰值 {max(self.heap_samples)} B")
+        if wdt is not None:
+            print(f"看门狗: 最长喂狗间隔 {wdt.max_gap_us / 1000:.0f}ms (超时 {wdt.timeout_ms}ms), 超时次数 {wdt.expired}")
+        out = self.output
+        print(f"固件输出 {out.lines} 行, 警告 {out.warnings}, 错误 {out.errors}")
+        if out.errors:
+            print("--- 最后的输出 ---")
+            for line in out.tail:
+                print(line)
+        return 1 if out.errors or self.missed_stops or over_bound or (wdt is not None and wdt.expired) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="加速浸泡测试（虚拟时钟）")
+    parser.add_argument("--profile", default="Long Video", help="场景名称 (config.PRESET_PROFILES)")
+    parser.add_argument("--days", type=float, default=7, help="模拟天数")
+    parser.add_argument("--cycle-hours", type=float, default=24, help="每隔多少小时模拟一次停止并重新启动")
+    parser.add_argument("--start-ms", type=int, default=0,
+                        help="虚拟时钟起始 ticks_ms（接近 2^30 可测试计时回绕）")
+    parser.add_argument("--no-heap", action="store_true", help="不跟踪内存（运行更快）")
+    parser.add_argument("--drop-hours", type=float, default=0, help="每隔多少小时模拟一次蓝牙断线（0为不断线）")
+    args = parser.parse_args(argv)
+
+    runner = SoakRunner(args.profile, args.days, args.cycle_hours, args.start_ms, not args.no_heap, args.drop_hours)
+    return runner.run().report()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
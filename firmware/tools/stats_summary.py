@@ -0,0 +1,50 @@
+"""
+运行统计汇总工具（在电脑上运行）
+
+汇总从开发板取回的统计日志（格式见 esp32c3mini/stats_log.py）。
+
+用法示例:
+    mpremote cp :stats.log :stats.log.old .
+    python stats_summary.py stats.log.old stats.log
+    python stats_summary.py stats.log --per-boot
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "esp32c3mini"))
+
+from stats_log import read_records, summarize  # noqa: E402
+
+
+def per_boot(paths):
+    """按启动序号分组汇总"""
+    boots = {}
+    for path in paths:
+        for rec in read_records(path):
+            entry = boots.setdefault(rec["boot"], {"uptime_s": 0, "run_s": 0, "swipes": 0, "taps": 0,
+                                                   "failed": 0, "disconnects": 0})
+            entry["uptime_s"] = max(entry["uptime_s"], rec["uptime_s"])
+            for key in ("run_s", "swipes", "taps", "failed", "disconnects"):
+                entry[key] += rec[key]
+    print(f"{'启动':>6} {'运行时长(h)':>10} {'场景(h)':>8} {'滑动':>8} {'点击':>8} {'失败':>6} {'断开':>6}")
+    for boot in sorted(boots):
+        e = boots[boot]
+        print(f"{boot:>6} {e['uptime_s'] / 3600:>10.1f} {e['run_s'] / 3600:>8.1f} {e['swipes']:>8} "
+              f"{e['taps']:>8} {e['failed']:>6} {e['disconnects']:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="运行统计汇总")
+    parser.add_argument("files", nargs="+", help="统计日志文件（按时间先后排列）")
+    parser.add_argument("--per-boot", action="store_true", help="按每次启动分别汇总")
+    args = parser.parse_args(argv)
+
+    summarize(args.files)
+    if args.per_boot:
+        per_boot(args.files)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
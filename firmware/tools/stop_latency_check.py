@@ -0,0 +1,137 @@
+"""
+停止延迟检查（在电脑上运行，mpsim 虚拟时钟）
+
+用完整固件（main.setup() + 按钮2启动场景）逐个运行场景，在手势进行中模拟按下停止：
+触摸按下的报告发出后随机等待 0 ~ --max-delay-ms 再停止，停止方式在
+按钮1单击（request_stop）和按钮2双击（stop_immediately）之间交替。
+每次停止后检查:
+- 场景已停止、触摸已释放（最后一个通知为抬起）
+- 停止到释放的延迟（CancelToken 按 ticks_us 测得）不超过 config.STOP_LATENCY_MAX_MS
+
+虚拟时钟上报告发送不耗时，测得的是等待切片和代码路径本身的延迟；
+某个等待循环不检查停止请求时延迟会达到整段等待的长度，这里就会失败。
+
+用法:
+    python stop_latency_check.py
+    python stop_latency_check.py --profile "Short Video" --trials 50
+返回码: 0 通过, 1 有停止未生效或延迟超出上限
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+from mpsim import VirtualClock, install
+
+DOUBLE_CLICK_US = 250000  # 按钮2双击的两次按下间隔
+
+
+class StopLatencyCheck:
+    def __init__(self, trials, max_delay_ms, seed):
+        self.trials = trials
+        self.max_delay_us = max_delay_ms * 1000
+        self.rng = random.Random(seed)
+        self.clock = VirtualClock()
+        _, self.bluetooth = install(self.clock)
+        self.failures = []
+        self.latencies = []
+        self.touching_at_stop = 0
+
+    def boot(self):
+        import config
+        import main
+        self.bound_us = config.STOP_LATENCY_MAX_MS * 1000
+        self.profiles = list(config.PRESET_PROFILES)
+        self.touch, self.buttons = main.setup()
+        ble = self.bluetooth.BLE.instances[-1]
+        ble.notify_hook = self._on_report
+        ble.connect()
+        self.ble = ble
+
+    def _on_report(self, value):
+        tip = value[-5] & 1  # 两种报告布局的触摸状态都在倒数第5字节（见 hid_report.py）
+        self.last_tip = tip
+        if tip and not self.armed:
+            self.armed = True
+            self.clock.call_later(self.rng.randint(0, self.max_delay_us), self._stop)
+
+    def _stop(self, clock):
+        if self.touch.is_touching:
+            self.touching_at_stop += 1
+        # 按钮消抖：距上次按下至少间隔消抖时间
+        clock.advance(self.buttons.debounce_delay * 1000 + 1000)
+        if self.use_button2:
+            self.buttons.btn2.press()
+            clock.call_later(DOUBLE_CLICK_US, lambda c: self.buttons.btn2.press())
+        else:
+            self.buttons.btn1.press()
+
+    def run_trial(self, profile, index):
+        touch = self.touch
+        display = touch.display
+        stops_before = touch.cancel.count
+        self.armed = False
+        self.last_tip = 0
+        self.use_button2 = index % 2 == 1
+        display.current_index = display.profiles.index(profile)
+        display.set_profile(None)
+        self.buttons.btn2_short_press()  # 启动场景，停止后返回
+        how = "按钮2双击" if self.use_button2 else "按钮1单击"
+        if touch.cancel.count == stops_before:
+            self.failures.append(f"{profile} #{index} ({how}): 停止后没有释放触摸")
+        elif touch.is_running() or touch.is_touching or self.last_tip:
+            self.failures.append(f"{profile} #{index} ({how}): 停止后场景仍在运行或触摸未抬起")
+        else:
+            latency = touch.cancel.last_latency_us
+            self.latencies.append(latency)
+            if latency > self.bound_us:
+                self.failures.append(f"{profile} #{index} ({how}): 停止到释放 {latency / 1000:.1f}ms "
+                                     f"超过上限 {self.bound_us // 1000}ms")
+
+    def run(self, profiles):
+        stdout = sys.stdout
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            sys.stdout = open(os.devnull, "w")
+            try:
+                self.boot()
+                for profile in profiles or self.profiles:
+                    if profile not in self.profiles:
+                        raise SystemExit(f"未知场景: {profile} (可选: {', '.join(self.profiles)})")
+                    for index in range(self.trials):
+                        self.run_trial(profile, index)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+                os.chdir(cwd)
+        return self
+
+    def report(self):
+        count = len(self.latencies) + len(self.failures)
+        print(f"停止次数 {count}, 其中手势进行中 {self.touching_at_stop} 次, 上限 {self.bound_us // 1000}ms")
+        if self.latencies:
+            lat = self.latencies
+            print(f"停止到释放: 最大 {max(lat) / 1000:.1f}ms 平均 {sum(lat) / len(lat) / 1000:.1f}ms")
+        for line in self.failures:
+            print(f"FAIL {line}")
+        if not self.touching_at_stop:
+            print("FAIL 没有一次停止发生在手势进行中，检查无效")
+        ok = not self.failures and self.touching_at_stop > 0
+        print("通过" if ok else "未通过")
+        return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="停止到触摸释放的延迟检查（虚拟时钟）")
+    parser.add_argument("--profile", action="append", help="检查的场景（可重复，默认全部场景）")
+    parser.add_argument("--trials", type=int, default=10, help="每个场景停止的次数")
+    parser.add_argument("--max-delay-ms", type=int, default=600, help="按下后最多等待多久再停止(毫秒)")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    args = parser.parse_args(argv)
+    return StopLatencyCheck(args.trials, args.max_delay_ms, args.seed).run(args.profile).report()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+触摸日志转换工具（在电脑上运行）
+
+把录制的触摸日志转换为固件可回放的轨迹文件（格式见 esp32c3mini/touch_trace.py）。
+
+支持的输入格式:
+- getevent: 安卓 `adb shell getevent -lt /dev/input/eventX` 的输出
+- csv:      每行 `t_ms,x,y,contact`（contact 为 1 按下 / 0 抬起，# 开头为注释）
+
+用法示例:
+    adb shell getevent -lt /dev/input/event2 > swipe.log
+    python trace_convert.py swipe.log swipe.trc --width 1080 --height 2168 \\
+        --raw-max-x 4095 --raw-max-y 4095
+
+触摸面板的原始坐标范围与屏幕像素不同时必须指定 --raw-max-x/--raw-max-y（可用 `getevent -lp` 查看
+ABS_MT_POSITION_X/Y 的 max）；换算后的坐标超出 --width/--height 时报错退出，不生成文件。
+
+生成的文件上传到开发板后，在场景配置中设置 "trace": "/swipe.trc" 即可回放。
+"""
+import argparse
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "esp32c3mini"))
+
+from touch_trace import TraceError, TraceWriter  # noqa: E402
+
+_GETEVENT_RE = re.compile(r"\[\s*(\d+\.\d+)\]\s+(?:\S+:\s+)?(\w+)\s+(\w+)\s+(\w+)")
+
+
+def parse_getevent(lines, raw_max_x=None, raw_max_y=None, width=None, height=None):
+    """解析 getevent -lt 输出，按 SYN_REPORT 产生 (t_ms, x, y, contact) 采样（只跟踪单点）"""
+    x = y = 0
+    contact = 0
+    dirty = False
+    for line in lines:
+        m = _GETEVENT_RE.search(line)
+        if not m:
+            continue
+        ts, ev_type, code, value = m.groups()
+        if ev_type == "EV_ABS":
+            if code in ("ABS_MT_POSITION_X", "ABS_X"):
+                x = int(value, 16)
+                dirty = True
+            elif code in ("ABS_MT_POSITION_Y", "ABS_Y"):
+                y = int(value, 16)
+                dirty = True
+            elif code == "ABS_MT_TRACKING_ID":
+                contact = 0 if value.lower() == "ffffffff" else 1
+                dirty = True
+        elif ev_type == "EV_KEY" and code == "BTN_TOUCH":
+            contact = 1 if value == "DOWN" else 0
+            dirty = True
+        elif ev_type == "EV_SYN" and code == "SYN_REPORT" and dirty:
+            dirty = False
+            # 原始坐标 0..raw_max 映射到像素 0..width-1
+            sx = x * width // (raw_max_x + 1) if raw_max_x and width else x
+            sy = y * height // (raw_max_y + 1) if raw_max_y and height else y
+            yield int(float(ts) * 1000), sx, sy, contact
+
+
+def parse_csv(lines):
+    """解析 t_ms,x,y,contact 格式"""
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        t_ms, x, y, contact = (int(float(v)) for v in line.split(",")[:4])
+        yield t_ms, x, y, 1 if contact else 0
+
+
+def detect_format(path):
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            if _GETEVENT_RE.search(line):
+                return "getevent"
+            if line.strip() and not line.startswith("#"):
+                return "csv"
+    return "csv"
+
+
+def convert(src, dst, fmt, width, height, raw_max_x=None, raw_max_y=None):
+    """转换日志文件，返回写入的记录数"""
+    if fmt == "auto":
+        fmt = detect_format(src)
+    with open(src, "r", errors="replace") as f_in, open(dst, "wb") as f_out:
+        if fmt == "getevent":
+            samples = parse_getevent(f_in, raw_max_x, raw_max_y, width, height)
+        else:
+            samples = parse_csv(f_in)
+        writer = TraceWriter(f_out, width, height)
+        last_contact = 0
+        for t_ms, x, y, contact in samples:
+            if not (0 <= x < width and 0 <= y < height):
+                hint = "，getevent 原始坐标与像素不同时请指定 --raw-max-x/--raw-max-y" if fmt == "getevent" else ""
+                raise TraceError(f"第 {writer.count + 1} 个采样的坐标 ({x}, {y}) 超出屏幕 {width}x{height}{hint}")
+            writer.add(t_ms, x, y, contact)
+            last_contact = contact
+        # 保证轨迹以抬起结束
+        if last_contact and writer.last_t is not None:
+            writer.add(writer.last_t, writer.last_x, writer.last_y, 0)
+    return writer.count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="触摸日志 -> 轨迹文件转换")
+    parser.add_argument("src", help="输入日志文件")
+    parser.add_argument("dst", help="输出轨迹文件(.trc)")
+    parser.add_argument("--format", choices=("auto", "getevent", "csv"), default="auto")
+    parser.add_argument("--width", type=int, default=1080, help="录制设备屏幕宽度(像素)")
+    parser.add_argument("--height", type=int, default=2168, help="录制设备屏幕高度(像素)")
+    parser.add_argument("--raw-max-x", type=int, help="getevent 原始X最大值（触摸面板坐标与像素不同时使用）")
+    parser.add_argument("--raw-max-y", type=int, help="getevent 原始Y最大值")
+    args = parser.parse_args(argv)
+
+    try:
+        count = convert(args.src, args.dst, args.format, args.width, args.height,
+                        args.raw_max_x, args.raw_max_y)
+    except (TraceError, ValueError) as e:
+        if os.path.exists(args.dst):
+            os.remove(args.dst)
+        parser.exit(1, f"转换失败: {e}\n")
+    size = os.path.getsize(args.dst)
+    print(f"已写入 {count} 条记录, {size} 字节 -> {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
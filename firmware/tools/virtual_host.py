@@ -0,0 +1,471 @@
+"""
+虚拟HID主机：解析报告描述符、按时间解码通知、重建触摸笔画并评估手势保真度（在电脑上运行）
+
+默认在 mpsim 虚拟时钟上运行完整固件，启动一个场景直到发出 --strokes 次按下/抬起，
+从模拟的GATT服务中读出固件实际提供的报告描述符（Report Map），按描述符解析每个通知。
+通知经过模拟的蓝牙链路后才"到达手机":
+- 连接间隔（--interval-ms）：通知在下一个连接事件发出，同时通过连接参数更新告知固件
+- 每个连接事件最多发送 --per-event 个包，多出的排到下一个事件
+- --loss：每次发送失败的概率，链路层在之后的连接事件重传（不丢失，只是延迟/扎堆）
+- --drop：通知整个丢失的概率（模拟协议栈缓冲溢出等），用来检验丢帧统计
+
+也可以用 --capture 分析抓包得到的通知（每行 t_us,hex 或 t_us,seq,hex，无发送端参照时不计算保真度）。
+
+每个笔画（按下到抬起）的指标:
+- 时长、路径长度（像素）、速度曲线（按时间五等分的平均速度，像素/毫秒）
+- 报告间隔的平均值/标准差（抖动）/最大值
+- 重复帧（笔画内连续两个完全相同的报告）、丢帧（发送端参照中未到达的报告）
+- 触点状态错误：按下时触点数为0、笔画中触点ID变化、字段超出逻辑范围、最后没有抬起
+
+保真度评分（0-100，与发送端同一笔画对比）:
+    100 - 40*min(1, |时长误差|/发送时长) - min(30, 10*丢帧) - 20*min(1, 额外抖动/连接间隔) - 50*(有触点状态错误)
+额外抖动 = 接收端间隔标准差 - 发送端间隔标准差（拟人化的速度变化不计入）
+
+用法示例:
+    python virtual_host.py --profile "Short Video" --strokes 30
+    python virtual_host.py --profile Clicker --strokes 200 --interval-ms 30 --loss 0.1
+    python virtual_host.py --layout compact --drop 0.02 --save rx.csv
+    python virtual_host.py --capture rx.csv --layout compact
+返回码: 0 正常, 1 有触点状态错误或平均分低于 --min-score
+"""
+import argparse
+import collections
+import os
+import random
+import sys
+import tempfile
+
+from mpsim import FIRMWARE_DIR, VirtualClock, install
+
+sys.path.insert(0, FIRMWARE_DIR)
+
+import hid_report  # noqa: E402
+
+PAGE_GENERIC_DESKTOP = 0x01
+PAGE_DIGITIZER = 0x0D
+USAGE_NAMES = {
+    (PAGE_DIGITIZER, 0x42): "tip",
+    (PAGE_DIGITIZER, 0x54): "count",
+    (PAGE_DIGITIZER, 0x51): "contact_id",
+    (PAGE_GENERIC_DESKTOP, 0x30): "x",
+    (PAGE_GENERIC_DESKTOP, 0x31): "y",
+}
+PROFILE_BUCKETS = 5
+PACKET_OVERHEAD_BYTES = 21  # 每个通知的空口开销，与 bench.NOTIFY_OVERHEAD_BYTES 相同
+PACKET_GAP_US = 150 * 2 + 80  # 两次帧间隔 + 空的应答包
+
+
+# ---- 报告描述符 ----
+
+def parse_descriptor(desc):
+    """解析报告描述符，返回 (输入字段列表, 报告字节数)
+
+    字段为字典: name(未知用途为None), page, usage, offset(位), size(位), min, max, const
+    支持短条目的 Usage Page / Usage / Usage Minimum/Maximum / Logical Min/Max /
+    Report Size/Count/ID / Push / Pop 和 Input；Output/Feature 不属于输入报告，跳过。
+    """
+    state = {"page": 0, "min": 0, "max": 0, "size": 0, "count": 0, "report_id": None}
+    stack = []
+    usages = []
+    usage_min = None
+    fields = []
+    offset = 0
+    i = 0
+    while i < len(desc):
+        prefix = desc[i]
+        if prefix == 0xFE:  # 长条目
+            i += 3 + desc[i + 1]
+            continue
+        size = (0, 1, 2, 4)[prefix & 3]
+        data = bytes(desc[i + 1:i + 1 + size])
+        if len(data) < size:
+            raise ValueError("描述符在偏移 %d 处被截断" % i)
+        value = int.from_bytes(data, "little")
+        signed = int.from_bytes(data, "little", signed=True) if size else 0
+        i += 1 + size
+        kind = (prefix >> 2) & 3
+        tag = prefix & 0xFC
+        if kind == 0:  # Main
+            if tag == 0x80:  # Input
+                for k in range(state["count"]):
+                    usage = usages[min(k, len(usages) - 1)] if usages else None
+                    page, code = (usage if isinstance(usage, tuple) else (state["page"], usage))
+                    fields.append({
+                        "name": None if value & 1 else USAGE_NAMES.get((page, code)),
+                        "page": page, "usage": code, "offset": offset, "size": state["size"],
+                        "min": state["min"], "max": state["max"], "const": bool(value & 1),
+                    })
+                    offset += state["size"]
+            usages = []
+        elif kind == 1:  # Global
+            if tag == 0x04:
+                state["page"] = value
+            elif tag == 0x14:
+                state["min"] = signed
+            elif tag == 0x24:
+                # 逻辑最小值非负时最大值按无符号解释
+                state["max"] = value if state["min"] >= 0 else signed
+            elif tag == 0x74:
+                state["size"] = value
+            elif tag == 0x84:
+                state["report_id"] = value
+            elif tag == 0x94:
+                state["count"] = value
+            elif tag == 0xA4:
+                stack.append(dict(state))
+            elif tag == 0xB4 and stack:
+                state = stack.pop()
+        elif kind == 2:  # Local
+            usage = (value >> 16, value & 0xFFFF) if size == 4 else value
+            if tag == 0x08:
+                usages.append(usage)
+            elif tag == 0x18:
+                usage_min = value
+            elif tag == 0x28 and usage_min is not None:
+                usages.extend(range(usage_min, value + 1))
+                usage_min = None
+    size_bytes = (offset + 7) // 8
+    if state["report_id"] is not None:
+        size_bytes += 1
+        for field in fields:
+            field["offset"] += 8
+    return fields, size_bytes
+
+
+class ReportDecoder:
+    def __init__(self, desc):
+        self.fields, self.size = parse_descriptor(desc)
+        self.named = [f for f in self.fields if f["name"] is not None]
+        missing = {"tip", "x", "y"} - {f["name"] for f in self.named}
+        if missing:
+            raise ValueError("描述符缺少触摸字段: %s" % ", ".join(sorted(missing)))
+
+    def decode(self, data):
+        """返回 (字段字典, 超出逻辑范围的字段名列表)"""
+        if len(data) != self.size:
+            raise ValueError("报告长度 %d 与描述符的 %d 字节不符" % (len(data), self.size))
+        bits = int.from_bytes(data, "little")
+        values = {}
+        out_of_range = []
+        for f in self.named:
+            v = (bits >> f["offset"]) & ((1 << f["size"]) - 1)
+            if f["min"] < 0 and v & (1 << (f["size"] - 1)):
+                v -= 1 << f["size"]
+            values[f["name"]] = v
+            if not f["min"] <= v <= f["max"]:
+                out_of_range.append(f["name"])
+        return values, out_of_range
+
+    def logical_max(self, name):
+        for f in self.named:
+            if f["name"] == name:
+                return f["max"]
+        return hid_report.HID_MAX
+
+
+# ---- 模拟链路 ----
+
+class VirtualLink:
+    """按连接事件投递通知: sent 为 [(发送时刻us, 数据)]，返回 ([(到达时刻us, 序号, 数据)], 丢失的序号集合)"""
+    def __init__(self, interval_us, per_event, loss, drop, seed):
+        self.interval_us = interval_us
+        self.per_event = per_event
+        self.loss = loss
+        self.drop = drop
+        self.rng = random.Random(seed)
+
+    def deliver(self, sent):
+        received = []
+        dropped = set()
+        if not sent:
+            return received, dropped
+        anchor = sent[0][0]
+        queue = collections.deque()
+        i = 0
+        event = anchor
+        while i < len(sent) or queue:
+            if not queue and i < len(sent) and sent[i][0] > event:
+                # 空闲时跳到下一条通知之后的第一个连接事件
+                event = anchor + -(-(sent[i][0] - anchor) // self.interval_us) * self.interval_us
+            while i < len(sent) and sent[i][0] <= event:
+                if self.rng.random() < self.drop:
+                    dropped.add(i)
+                else:
+                    queue.append(i)
+                i += 1
+            t = event
+            for _ in range(self.per_event):
+                if not queue:
+                    break
+                if self.rng.random() < self.loss:
+                    break  # 没有收到应答，本连接事件结束，下一个事件重传
+                seq = queue.popleft()
+                data = sent[seq][1]
+                t += (len(data) + PACKET_OVERHEAD_BYTES) * 8  # 1M PHY 每字节 8us
+                received.append((t, seq, data))
+                t += PACKET_GAP_US
+            event += self.interval_us
+        return received, dropped
+
+
+# ---- 笔画重建与指标 ----
+
+def build_strokes(decoder, reports):
+    """reports: [(时刻us, 序号或None, 数据)]，返回 (笔画列表, 触点状态错误列表)
+
+    笔画为字典: points [(时刻us, 序号, x, y)]（最后一个是抬起报告，没有抬起时缺失）, released, errors
+    """
+    strokes = []
+    errors = []
+    current = None
+    for t, seq, data in reports:
+        values, out_of_range = decoder.decode(data)
+        problems = ["字段超出逻辑范围 (%s)" % ",".join(out_of_range)] if out_of_range else []
+        tip = values["tip"]
+        if tip and values.get("count", 1) == 0:
+            problems.append("按下时触点数为0")
+        point = (t, seq, values["x"], values["y"])
+        if tip:
+            if current is None:
+                current = {"points": [], "released": False, "errors": [], "contact_id": values.get("contact_id")}
+                strokes.append(current)
+            elif values.get("contact_id") != current["contact_id"]:
+                problems.append("笔画中触点ID变化")
+                current["contact_id"] = values.get("contact_id")
+            current["points"].append(point)
+        elif current is not None:
+            current["points"].append(point)
+            current["released"] = True
+            current = None
+        for problem in problems:
+            errors.append((t, seq, problem))
+            if current is not None or (strokes and strokes[-1]["points"][-1] is point):
+                strokes[-1]["errors"].append(problem)
+    if current is not None:
+        current["errors"].append("最后没有抬起")
+        errors.append((reports[-1][0], reports[-1][1], "最后没有抬起"))
+    return strokes, errors
+
+
+def _stdev(values):
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return (sum((v - mean) ** 2 for v in values) / (len(values) - 1)) ** 0.5
+
+
+def stroke_metrics(stroke, scale_x, scale_y):
+    """返回指标字典（时间单位毫秒，距离单位像素）"""
+    points = stroke["points"]
+    times = [p[0] / 1000 for p in points]
+    intervals = [b - a for a, b in zip(times, times[1:])]
+    duration = times[-1] - times[0]
+    length = 0.0
+    buckets = [0.0] * PROFILE_BUCKETS
+    duplicates = 0
+    for (t0, _, x0, y0), (t1, _, x1, y1) in zip(points, points[1:]):
+        dist = (((x1 - x0) * scale_x) ** 2 + ((y1 - y0) * scale_y) ** 2) ** 0.5
+        length += dist
+        if duration > 0:
+            mid = ((t0 + t1) / 2000 - times[0]) / duration
+            buckets[min(PROFILE_BUCKETS - 1, int(mid * PROFILE_BUCKETS))] += dist
+    down = points[:-1] if stroke["released"] else points
+    for a, b in zip(down, down[1:]):
+        if a[2:] == b[2:]:
+            duplicates += 1
+    bucket_ms = duration / PROFILE_BUCKETS
+    return {
+        "start_ms": times[0],
+        "duration_ms": duration,
+        "length_px": length,
+        "reports": len(points),
+        "interval_ms": sum(intervals) / len(intervals) if intervals else 0.0,
+        "jitter_ms": _stdev(intervals),
+        "max_interval_ms": max(intervals) if intervals else 0.0,
+        "profile": [d / bucket_ms if bucket_ms else 0.0 for d in buckets],
+        "duplicates": duplicates,
+        "seqs": [p[1] for p in points],
+    }
+
+
+def fidelity(rx, ref, dropped, interval_ms, contact_error):
+    """与发送端同一笔画对比的保真度评分 (0-100)"""
+    score = 100.0
+    if ref["duration_ms"] > 0:
+        score -= 40 * min(1.0, abs(rx["duration_ms"] - ref["duration_ms"]) / ref["duration_ms"])
+    score -= min(30, 10 * dropped)
+    if interval_ms > 0:
+        score -= 20 * min(1.0, max(0.0, rx["jitter_ms"] - ref["jitter_ms"]) / interval_ms)
+    if contact_error:
+        score -= 50
+    return max(0, round(score))
+
+
+# ---- 数据来源 ----
+
+def run_firmware(args):
+    """在虚拟时钟上运行固件，返回 (报告描述符, [(发送时刻us, 数据)], 屏幕宽, 高, 连接间隔us)"""
+    clock = VirtualClock()
+    _, bluetooth = install(clock)
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            import config
+            if args.layout:
+                config.HID_REPORT_LAYOUT = args.layout
+            if args.profile not in config.PRESET_PROFILES:
+                raise SystemExit(f"未知场景: {args.profile} (可选: {', '.join(config.PRESET_PROFILES)})")
+            import main
+            tc, bc = main.setup()
+            ble = bluetooth.BLE.instances[-1]
+            sent = []
+            state = {"tip": 0, "strokes": 0}
+
+            def on_notify(value):
+                sent.append((clock.now_us, value))
+                tip = value[-5] & 1  # 两种布局的触摸状态都在倒数第5字节
+                if state["tip"] and not tip:
+                    state["strokes"] += 1
+                    if state["strokes"] >= args.strokes:
+                        tc.cancel.cancel()
+                state["tip"] = tip
+            ble.notify_hook = on_notify
+            ble.connect()
+            # 连接参数更新（单位1.25ms），固件按实际连接间隔安排报告节奏
+            units = max(6, round(args.interval_ms / 1.25))
+            ble.handler(27, (0, units, 0, 400, 0))
+            desc = ble.values[tc.ble_hid.hid_service[1]]
+            display = tc.display
+            display.current_index = display.profiles.index(args.profile)
+            bc.btn2_short_press()
+            return desc, sent, tc.screen_width, tc.screen_height, tc.ble_hid.conn_interval_us
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.chdir(cwd)
+
+
+def load_capture(path):
+    """读取抓包文件，返回 [(时刻us, 序号或None, 数据)]"""
+    reports = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split(",")
+            seq = int(parts[1]) if len(parts) > 2 else None
+            reports.append((int(parts[0]), seq, bytes.fromhex(parts[-1])))
+    return reports
+
+
+def save_capture(path, reports):
+    with open(path, "w") as f:
+        f.write("# t_us,seq,hex\n")
+        for t, seq, data in reports:
+            f.write(f"{t},{seq},{data.hex()}\n")
+
+
+# ---- 报告 ----
+
+def report(args, decoder, received, sent, dropped, width, height, interval_us):
+    scale_x = width / decoder.logical_max("x")
+    scale_y = height / decoder.logical_max("y")
+    interval_ms = interval_us / 1000
+    strokes, errors = build_strokes(decoder, received)
+    rx = [stroke_metrics(s, scale_x, scale_y) for s in strokes]
+
+    # 发送端参照：按序号找到接收笔画的第一个报告所在的发送笔画
+    ref_by_seq = {}
+    ref = []
+    if sent is not None:
+        ref_strokes, _ = build_strokes(decoder, [(t, i, d) for i, (t, d) in enumerate(sent)])
+        for s in ref_strokes:
+            m = stroke_metrics(s, scale_x, scale_y)
+            ref.append(m)
+            for seq in m["seqs"]:
+                ref_by_seq[seq] = m
+
+    print(f"=== 虚拟HID主机: 报告 {decoder.size} 字节, 连接间隔 {interval_ms:.2f}ms ===")
+    print(f"{'#':>4} {'开始(s)':>9} {'时长ms':>7} {'路径px':>7} {'报告':>4} {'间隔ms':>6} {'抖动':>5} {'最大':>6} "
+          f"{'重复':>4} {'丢帧':>4} {'评分':>4}  速度曲线(px/ms)")
+    scores = []
+    total_dropped = 0
+    for index, (s, m) in enumerate(zip(strokes, rx)):
+        ref_m = ref_by_seq.get(m["seqs"][0]) if sent is not None else None
+        lost = 0
+        score = None
+        if ref_m is not None:
+            lost = sum(1 for seq in range(ref_m["seqs"][0], ref_m["seqs"][-1] + 1) if seq in dropped)
+            score = fidelity(m, ref_m, lost, interval_ms, bool(s["errors"]))
+            scores.append(score)
+        total_dropped += lost
+        if index < args.show:
+            profile = " ".join(f"{v:.2f}" for v in m["profile"])
+            print(f"{index:>4} {m['start_ms'] / 1000:>9.2f} {m['duration_ms']:>7.1f} {m['length_px']:>7.0f} "
+                  f"{m['reports']:>4} {m['interval_ms']:>6.1f} {m['jitter_ms']:>5.1f} {m['max_interval_ms']:>6.1f} "
+                  f"{m['duplicates']:>4} {lost:>4} {'-' if score is None else score:>4}  {profile}")
+    if len(strokes) > args.show:
+        print(f"... 共 {len(strokes)} 个笔画（--show 调整显示数量）")
+
+    print("--- 汇总 ---")
+    if sent is not None:
+        print(f"发送 {len(sent)} 个报告 / {len(ref)} 个笔画, 到达 {len(received)} 个报告 / {len(strokes)} 个笔画, "
+              f"丢失 {len(dropped)}")
+    else:
+        print(f"到达 {len(received)} 个报告 / {len(strokes)} 个笔画")
+    if rx:
+        intervals = sorted(b[0] / 1000 - a[0] / 1000 for s in strokes for a, b in zip(s["points"], s["points"][1:]))
+        if intervals:
+            print(f"报告间隔: 中位 {intervals[len(intervals) // 2]:.1f}ms P95 {intervals[int(len(intervals) * 0.95)]:.1f}ms "
+                  f"最大 {intervals[-1]:.1f}ms, 平均抖动 {sum(m['jitter_ms'] for m in rx) / len(rx):.2f}ms")
+        print(f"重复帧 {sum(m['duplicates'] for m in rx)}, 笔画内丢帧 {total_dropped}")
+    if scores:
+        print(f"保真度: 平均 {sum(scores) / len(scores):.1f} 最低 {min(scores)}")
+    print(f"触点状态错误 {len(errors)}")
+    for t, seq, problem in errors[:10]:
+        print(f"  {t / 1000000:.3f}s #{seq}: {problem}")
+    failed = bool(errors) or (scores and sum(scores) / len(scores) < args.min_score)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="虚拟HID主机（解码通知、重建笔画、评估保真度）")
+    parser.add_argument("--profile", default="Short Video", help="运行的场景 (config.PRESET_PROFILES)")
+    parser.add_argument("--strokes", type=int, default=20, help="运行到发出多少个笔画后停止")
+    parser.add_argument("--layout", choices=sorted(hid_report.REPORT_SIZES), help="报告布局（默认取 config）")
+    parser.add_argument("--interval-ms", type=float, default=15, help="连接间隔(毫秒)")
+    parser.add_argument("--per-event", type=int, default=4, help="每个连接事件最多发送的包数")
+    parser.add_argument("--loss", type=float, default=0.0, help="每次发送失败（下个事件重传）的概率")
+    parser.add_argument("--drop", type=float, default=0.0, help="通知整个丢失的概率")
+    parser.add_argument("--seed", type=int, default=1, help="链路模拟随机种子")
+    parser.add_argument("--capture", help="分析抓包文件（t_us,hex 或 t_us,seq,hex）代替运行固件")
+    parser.add_argument("--width", type=int, default=1080, help="抓包分析时的屏幕宽度(像素)")
+    parser.add_argument("--height", type=int, default=2168, help="抓包分析时的屏幕高度(像素)")
+    parser.add_argument("--save", help="把到达的通知保存为抓包文件")
+    parser.add_argument("--show", type=int, default=10, help="逐个显示的笔画数")
+    parser.add_argument("--min-score", type=float, default=0, help="平均保真度低于该值时返回1")
+    args = parser.parse_args(argv)
+
+    if args.capture:
+        desc = hid_report.descriptor(args.layout or hid_report.STANDARD)
+        received = load_capture(args.capture)
+        sent = None
+        dropped = set()
+        width, height = args.width, args.height
+        interval_us = int(args.interval_ms * 1000)
+    else:
+        desc, sent, width, height, interval_us = run_firmware(args)
+        link = VirtualLink(interval_us, args.per_event, args.loss, args.drop, args.seed)
+        received, dropped = link.deliver(sent)
+    decoder = ReportDecoder(desc)
+    if args.save:
+        save_capture(args.save, received)
+    return report(args, decoder, received, sent, dropped, width, height, interval_us)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
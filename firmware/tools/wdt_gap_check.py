@@ -0,0 +1,107 @@
+"""
+看门狗喂狗间隔检查（在电脑上运行，mpsim 虚拟时钟）
+
+用完整固件（main.setup()）执行几种单次等待很长的操作，检查硬件看门狗在等待期间持续被喂:
+- 轨迹回放: 按下后保持 12 秒、抬起后间隔 40 秒（超过 32767ms，拆成多条记录）的轨迹，
+  分别按 100% 和 50% 速度回放（50% 时间隔拉长一倍）
+- 长按 12 秒
+- 1次/秒连点 12 次（整次连点超过看门狗超时）
+每项检查: 看门狗没有超时、最长喂狗间隔不超过 config.WDT_FEED_SLICE_MS 加一个等待切片，
+且回放/长按总时长与设定一致（分段等待不累积误差）。
+
+用法:
+    python wdt_gap_check.py
+返回码: 0 通过, 1 有检查项未通过
+"""
+import os
+import sys
+import tempfile
+
+from mpsim import VirtualClock, install
+
+TRACE_FILE = "gap.trc"
+HOLD_MS = 12000       # 轨迹中按下保持的时长
+IDLE_GAP_MS = 40000   # 轨迹中抬起后的间隔
+TIMING_TOLERANCE_MS = 50
+
+
+class WdtGapCheck:
+    def __init__(self):
+        self.clock = VirtualClock()
+        self.machine, self.bluetooth = install(self.clock)
+        self.results = []
+
+    def boot(self):
+        import config
+        import main
+        from touch_trace import TraceWriter
+        self.config = config
+        self.touch, _ = main.setup()
+        self.bluetooth.BLE.instances[-1].connect()
+        with open(TRACE_FILE, "wb") as f:
+            writer = TraceWriter(f, config.SCREEN_WIDTH, config.SCREEN_HEIGHT)
+            writer.add(0, 500, 1500, 1)
+            writer.add(HOLD_MS, 500, 1000, 1)
+            writer.add(HOLD_MS + 10, 500, 1000, 0)
+            writer.add(HOLD_MS + 10 + IDLE_GAP_MS, 500, 1000, 1)
+            writer.add(HOLD_MS + 20 + IDLE_GAP_MS, 500, 1000, 0)
+        self.trace_ms = HOLD_MS + 20 + IDLE_GAP_MS
+
+    def check(self, name, action, expected_ms=None):
+        wdt = self.machine.wdt
+        wdt.feed()
+        wdt.max_gap_us = 0
+        expired = wdt.expired
+        self.touch.cancel.reset()
+        start_us = self.clock.now_us
+        ok = action()
+        elapsed_ms = (self.clock.now_us - start_us) // 1000
+        problems = []
+        if not ok:
+            problems.append("操作返回失败")
+        if wdt.expired != expired:
+            problems.append(f"看门狗超时 {wdt.expired - expired} 次")
+        limit_us = (self.config.WDT_FEED_SLICE_MS + self.config.CANCEL_SLICE_MS) * 1000
+        if wdt.max_gap_us > limit_us:
+            problems.append(f"最长喂狗间隔 {wdt.max_gap_us // 1000}ms 超过 {limit_us // 1000}ms")
+        if expected_ms is not None and abs(elapsed_ms - expected_ms) > TIMING_TOLERANCE_MS:
+            problems.append(f"耗时 {elapsed_ms}ms, 应为 {expected_ms}ms")
+        self.results.append((name, elapsed_ms, wdt.max_gap_us // 1000, problems))
+
+    def run(self):
+        stdout = sys.stdout
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            sys.stdout = open(os.devnull, "w")
+            try:
+                self.boot()
+                touch = self.touch
+                self.check("轨迹回放 100%", lambda: touch.play_trace(TRACE_FILE), self.trace_ms)
+                self.check("轨迹回放 50%", lambda: touch.play_trace(TRACE_FILE, 50), self.trace_ms * 2)
+                self.check("长按 12s", lambda: touch.long_press(500, 1000, HOLD_MS))
+                self.check("连点 1次/秒", lambda: touch.tap_burst(500, 1000, 1, 12))
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+                os.chdir(cwd)
+        return self
+
+    def report(self):
+        print(f"看门狗超时 {self.config.WDT_TIMEOUT_MS}ms, 分段喂狗 {self.config.WDT_FEED_SLICE_MS}ms")
+        failed = 0
+        for name, elapsed_ms, gap_ms, problems in self.results:
+            print(f"{name:12s} 耗时 {elapsed_ms:6d}ms 最长喂狗间隔 {gap_ms:5d}ms {'FAIL' if problems else 'OK'}")
+            for line in problems:
+                print(f"    {line}")
+            failed += bool(problems)
+        print("通过" if not failed else "未通过")
+        return 1 if failed else 0
+
+
+def main():
+    return WdtGapCheck().run().report()
+
+
+if __name__ == "__main__":
+    sys.exit(main())